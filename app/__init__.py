@@ -1,8 +1,14 @@
-from flask import Flask
+import time
+
 from .config import *
 
 
-def create_app():
+def create_app(push=True):
+    # Flask só é importado aqui: os processos filhos (câmeras, escrita de
+    # clips) importam o pacote `app` sem carregar o servidor web
+    from flask import Flask
+
+    start = time.time()
     app = Flask(__name__)
 
     # Configurações da aplicação
@@ -12,4 +18,21 @@ def create_app():
     from app.templates.routes import main
     app.register_blueprint(main)
 
+    # Canal de push (estado, transições de queda e estatísticas); o modo
+    # ASGI (app/asgi.py) tem o seu próprio servidor Socket.IO
+    if push:
+        from app.templates.sockets import init_push
+        init_push(app)
+
+    if app.config['CAMERA_SETTINGS']['MODE'] == 'processes':
+        # Um processo de deteção por câmera registada
+        from app.detection.supervisor import get_supervisor
+        get_supervisor()
+    elif app.config['MODEL_SETTINGS'].get('WARMUP_ON_START'):
+        # Modelos carregados em segundo plano; /ready indica quando terminam
+        from app.detection import get_fall_detector
+        get_fall_detector().warmup()
+
+    app.config['STARTUP_SECONDS'] = time.time() - start
+    print(f"App created in {app.config['STARTUP_SECONDS']:.2f}s")
     return app
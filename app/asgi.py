@@ -0,0 +1,208 @@
+"""Modo de serviço ASGI: streams, estado e push num único event loop
+
+Com o servidor Flask em modo 'threading' cada cliente de /video_feed
+ocupa uma thread (bloqueada em `wait_for_frame`) durante toda a ligação.
+Aqui /video_feed, /status e o canal Socket.IO são tarefas asyncio: por
+câmera há uma só espera bloqueante (numa thread do executor) que acorda
+todos os clientes, e centenas de viewers não acrescentam threads. A
+captura, a deteção e a codificação continuam nas suas threads/processos,
+fora do event loop. As restantes rotas são servidas pela app Flask
+através de um adaptador WSGI.
+
+Requer `pip install starlette uvicorn a2wsgi`.
+"""
+import asyncio
+import contextlib
+import time
+
+import socketio
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from app import create_app
+from app.detection.cameras import default_camera_id, get_camera, get_cameras
+from app.detection.events import get_event_bus
+from app.detection.stream import mjpeg_part
+from app.templates.sockets import camera_room, stats_deltas
+from config import PUSH_SETTINGS, STREAM_SETTINGS
+
+
+class AsyncFrameFeed:
+    """Frames de uma câmera para os clientes asyncio
+
+    Uma única tarefa espera pelo frame seguinte numa thread do executor e
+    acorda todos os clientes da câmera; termina quando a câmera fica sem
+    clientes e volta a arrancar com o próximo.
+    """
+
+    def __init__(self, camera):
+        self.camera = camera
+        self.seq = 0
+        self.frame = None
+        self._condition = asyncio.Condition()
+        self._task = None
+
+    def ensure_started(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self.camera.clients and self.camera.running:
+                seq, frame = await loop.run_in_executor(
+                    None, self.camera.wait_for_frame, self.seq, 1.0)
+                if frame is None:
+                    continue
+                async with self._condition:
+                    self.seq, self.frame = seq, frame
+                    self._condition.notify_all()
+        finally:
+            async with self._condition:
+                self._condition.notify_all()
+
+    async def next_frame(self, last_seq):
+        """(seq, frame) mais recente que `last_seq`; frame None se parou"""
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: self.seq > last_seq or self._task.done())
+            if self.seq > last_seq:
+                return self.seq, self.frame
+            return last_seq, None
+
+
+_feeds = {}
+
+
+def get_feed(camera_id):
+    """Feed asyncio da câmera (só usado dentro do event loop)"""
+    camera = get_camera(camera_id)
+    feed = _feeds.get(camera_id)
+    if feed is None or feed.camera is not camera:
+        feed = _feeds[camera_id] = AsyncFrameFeed(camera)
+    return feed
+
+
+async def mjpeg_stream(feed, tier=None, max_fps=None):
+    """Versão asyncio de `FrameSlot.frames` (drop-to-latest, tiers, ?fps=)"""
+    camera = feed.camera
+    tier = camera.add_client(tier)
+    feed.ensure_started()
+    interval = 1.0 / max_fps if max_fps else 0.0
+    try:
+        seq = 0
+        next_send = 0.0
+        while camera.running:
+            if interval:
+                wait = next_send - time.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            new_seq, frame = await feed.next_frame(seq)
+            if frame is None:
+                feed.ensure_started()
+                continue
+            if seq:
+                camera.count_skipped(new_seq - seq - 1, bool(interval))
+            seq = new_seq
+            # Tiers pedidos chegam já codificados pela thread de saída; os
+            # restantes codificam-se fora do event loop
+            jpeg = frame.cached(tier)
+            if jpeg is None:
+                jpeg = await asyncio.to_thread(frame.jpeg, tier)
+            if jpeg is None:
+                continue
+            next_send = time.time() + interval
+            yield mjpeg_part(jpeg)
+    finally:
+        camera.remove_client(tier)
+
+
+def camera_id_or_404(request):
+    camera_id = request.path_params.get('camera_id') or default_camera_id()
+    if camera_id not in get_cameras():
+        raise HTTPException(404, f"Unknown camera '{camera_id}'")
+    return camera_id
+
+
+async def video_feed(request):
+    camera_id = camera_id_or_404(request)
+    tier = request.query_params.get('tier')
+    if tier is not None and tier not in STREAM_SETTINGS['TIERS']:
+        raise HTTPException(400, f"Unknown tier '{tier}'")
+    max_fps = request.query_params.get('fps')
+    if max_fps is not None:
+        try:
+            max_fps = float(max_fps)
+        except ValueError:
+            max_fps = 0
+        if max_fps <= 0:
+            raise HTTPException(
+                400, f"Invalid fps '{request.query_params['fps']}'")
+        max_fps = min(max_fps, STREAM_SETTINGS['MAX_CLIENT_FPS'])
+    return StreamingResponse(
+        mjpeg_stream(get_feed(camera_id), tier, max_fps),
+        media_type='multipart/x-mixed-replace; boundary=frame')
+
+
+async def status(request):
+    return JSONResponse(get_camera(camera_id_or_404(request)).status())
+
+
+sio = socketio.AsyncServer(async_mode='asgi')
+
+
+@sio.on('subscribe')
+async def subscribe(sid, data=None):
+    # Mesma semântica do canal Flask-SocketIO (app/templates/sockets.py)
+    camera_id = str((data or {}).get('camera_id') or default_camera_id())
+    if camera_id not in get_cameras():
+        await sio.emit('error', {'message': f"Unknown camera '{camera_id}'"},
+                       to=sid)
+        return
+    for other in get_cameras():
+        await sio.leave_room(sid, camera_room(other))
+    await sio.enter_room(sid, camera_room(camera_id))
+    camera = get_camera(camera_id)
+    await sio.emit('status', camera.status(), to=sid)
+    await sio.emit('stats', await asyncio.to_thread(camera.stats), to=sid)
+
+
+async def stats_loop():
+    """Diferenças de estatísticas, recolhidas fora do event loop"""
+    last = {}
+    while True:
+        await asyncio.sleep(PUSH_SETTINGS['STATS_INTERVAL'])
+        deltas = await asyncio.to_thread(lambda: list(stats_deltas(last)))
+        for camera_id, delta in deltas:
+            await sio.emit('stats', delta, to=camera_room(camera_id))
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    loop = asyncio.get_running_loop()
+
+    def emit_event(event, data):
+        # Chamado pela thread do barramento de eventos
+        asyncio.run_coroutine_threadsafe(
+            sio.emit(event, data, to=camera_room(data['camera_id'])), loop)
+
+    get_event_bus().subscribe(emit_event)
+    task = loop.create_task(stats_loop())
+    yield
+    task.cancel()
+
+
+def create_asgi_app():
+    """App ASGI: rotas asyncio, Socket.IO e o resto da app Flask"""
+    flask_app = create_app(push=False)
+    app = Starlette(routes=[
+        Route('/video_feed', video_feed),
+        Route('/video_feed/{camera_id}', video_feed),
+        Route('/status', status),
+        Route('/status/{camera_id}', status),
+        Mount('/', WSGIMiddleware(flask_app))
+    ], lifespan=lifespan)
+    return socketio.ASGIApp(sio, other_asgi_app=app)
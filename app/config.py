@@ -1,4 +1,3 @@
-import cv2
 import os
 # from dotenv import load_dotenv
 
@@ -34,17 +33,9 @@ VIDEO_SETTINGS = {
     'FALLBACK_SOURCE': 0  # câmera integrada como fallback
 }
 
-# Modificar a parte de detecção da câmera
+# A câmera é escolhida pela camada de captura (ver get_video_capture),
+# que tenta SOURCE e, se falhar, FALLBACK_SOURCE
 VIDEO_SOURCE = VIDEO_SETTINGS['SOURCE']
-try:
-    cap = cv2.VideoCapture(VIDEO_SOURCE)
-    if not cap.isOpened():
-        print(f"External camera not found, falling back to internal camera")
-        VIDEO_SOURCE = VIDEO_SETTINGS['FALLBACK_SOURCE']
-    cap.release()
-except Exception:
-    print(f"Error accessing external camera, falling back to internal camera")
-    VIDEO_SOURCE = VIDEO_SETTINGS['FALLBACK_SOURCE']
 
 VIDEO_DIR = 'fall_detection/videos'
 VIDEO_OUTPUT = 'falldown.mp4'
@@ -1,5 +1,7 @@
-from .utils import process_frame, fall_detector
+from .utils import process_frame, get_fall_detector
 from .alert import send_alert
 from .video import get_video_capture
+from .stream import FrameBroadcaster, get_broadcaster
 
-__all__ = ['process_frame', 'fall_detector', 'send_alert', 'get_video_capture']
+__all__ = ['process_frame', 'get_fall_detector', 'send_alert', 'get_video_capture',
+           'FrameBroadcaster', 'get_broadcaster']
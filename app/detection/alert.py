@@ -1,9 +1,312 @@
-def send_alert(message=None):
+import heapq
+import itertools
+import json
+import threading
+import time
+import urllib.request
+from collections import deque, namedtuple
+
+from config import ALERT_SETTINGS
+from .metrics import ALERT_DISPATCH_SECONDS, QUEUE_DEPTH, stage_timer
+from .store import record_event
+
+Alert = namedtuple('Alert', 'message camera_id person_id created')
+
+
+class ConsoleSink:
+    """Imprime o alerta (comportamento original)"""
+
+    name = 'console'
+
+    def __init__(self, settings):
+        pass
+
+    def send(self, alert):
+        print(f"ALERT: {alert.message}")
+
+
+class WebhookSink:
+    """POST JSON para ALERT_SETTINGS['WEBHOOK_URL']"""
+
+    name = 'webhook'
+
+    def __init__(self, settings):
+        self.url = settings['WEBHOOK_URL']
+        self.timeout = settings['WEBHOOK_TIMEOUT']
+        if not self.url:
+            raise ValueError("Webhook sink needs ALERT_SETTINGS['WEBHOOK_URL']")
+
+    def send(self, alert):
+        body = json.dumps(alert._asdict()).encode()
+        request = urllib.request.Request(
+            self.url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"Webhook returned {response.status}")
+
+
+class TwilioSink:
+    """Mensagem WhatsApp/SMS via Twilio (credenciais em app/config.py)"""
+
+    name = 'twilio'
+
+    def __init__(self, settings):
+        from twilio.rest import Client
+        from ..config import (TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN,
+                              TWILIO_FROM, TWILIO_TO)
+
+        self.client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        self.from_ = TWILIO_FROM
+        self.to = TWILIO_TO
+
+    def send(self, alert):
+        self.client.messages.create(body=alert.message, from_=self.from_,
+                                    to=self.to)
+
+
+class FakeSink:
+    """Sink local para testes de carga: regista alertas, simula atraso/falhas"""
+
+    name = 'fake'
+
+    def __init__(self, settings):
+        self.delay = settings.get('FAKE_DELAY', 0.0)
+        self.failure_rate = settings.get('FAKE_FAILURE_RATE', 0.0)
+        self.sent = []
+        self.attempts = 0
+        self._lock = threading.Lock()
+
+    def send(self, alert):
+        with self._lock:
+            self.attempts += 1
+            # Falhas determinísticas: uma em cada 1/failure_rate tentativas
+            fail = (self.failure_rate and
+                    self.attempts % round(1 / self.failure_rate) == 0)
+        time.sleep(self.delay)
+        if fail:
+            raise RuntimeError("Simulated delivery failure")
+        with self._lock:
+            self.sent.append((alert, time.time()))
+
+
+SINK_CLASSES = {
+    'console': ConsoleSink,
+    'webhook': WebhookSink,
+    'twilio': TwilioSink,
+    'fake': FakeSink
+}
+
+
+class AlertDispatcher:
+    """Entrega de alertas fora do ciclo de deteção
+
+    `dispatch` só filtra e enfileira (nunca bloqueia). Cada alerta gera uma
+    entrega por sink; threads de trabalho fazem uma tentativa de cada vez
+    e uma tentativa falhada volta à fila com backoff exponencial, em vez de
+    a thread dormir, pelo que um sink em baixo não atrasa os restantes nem
+    os outros alertas. Alertas repetidos da mesma pessoa/câmera dentro de
+    DEDUP_WINDOW são descartados, e cada câmera está limitada a
+    CAMERA_RATE_LIMIT alertas por RATE_WINDOW segundos; só contam os
+    alertas que chegaram a entrar na fila.
+    """
+
+    def __init__(self, settings=None, sinks=None):
+        self.settings = dict(ALERT_SETTINGS, **(settings or {}))
+        self.sinks = sinks if sinks is not None else [
+            SINK_CLASSES[name](self.settings)
+            for name in self.settings['SINKS']]
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        # Entregas por ordem de instante: (quando, n, entrega, sink, tentativa)
+        self._jobs = []
+        self._job_ids = itertools.count()
+        # Alertas na fila ou em entrega (limitados a QUEUE_SIZE)
+        self._pending = 0
+        self._last_alert = {}
+        self._camera_alerts = {}
+        self._latencies = deque(maxlen=1000)
+        self.counters = {
+            'enqueued': 0, 'delivered': 0, 'failed': 0, 'retries': 0,
+            'deduplicated': 0, 'rate_limited': 0, 'dropped': 0
+        }
+        QUEUE_DEPTH.track(lambda: self._pending, queue='alerts')
+        self._running = True
+        self._workers = [
+            threading.Thread(target=self._run, name=f'alert-worker-{i}',
+                             daemon=True)
+            for i in range(self.settings['WORKERS'])]
+        for worker in self._workers:
+            worker.start()
+
+    def _admit(self, camera_id, person_id, now):
+        """Deduplicação por pessoa e limite de taxa por câmera (com o lock)"""
+        last = self._last_alert.get((camera_id, person_id))
+        if (person_id is not None and last is not None and
+                now - last < self.settings['DEDUP_WINDOW']):
+            self.counters['deduplicated'] += 1
+            return False
+
+        recent = self._camera_alerts.setdefault(camera_id, deque())
+        while recent and now - recent[0] >= self.settings['RATE_WINDOW']:
+            recent.popleft()
+        if len(recent) >= self.settings['CAMERA_RATE_LIMIT']:
+            self.counters['rate_limited'] += 1
+            return False
+        return True
+
+    def _remember(self, camera_id, person_id, now):
+        """Regista um alerta aceite (com o lock)"""
+        self._camera_alerts[camera_id].append(now)
+        key = (camera_id, person_id)
+        # Reinserir mantém o dicionário por ordem de instante: as entradas
+        # fora da janela de deduplicação estão sempre no início
+        self._last_alert.pop(key, None)
+        self._last_alert[key] = now
+        window = self.settings['DEDUP_WINDOW']
+        while self._last_alert:
+            oldest, last = next(iter(self._last_alert.items()))
+            if now - last < window:
+                break
+            del self._last_alert[oldest]
+
+    def dispatch(self, message, camera_id=None, person_id=None):
+        """Enfileira um alerta; retorna False se foi filtrado ou descartado"""
+        with stage_timer(camera_id, 'alert_enqueue'):
+            return self._enqueue(message, camera_id, person_id)
+
+    def _enqueue(self, message, camera_id, person_id):
+        now = time.time()
+        with self._ready:
+            if not self._admit(camera_id, person_id, now):
+                return False
+            full = self._pending >= self.settings['QUEUE_SIZE']
+            if full:
+                self.counters['dropped'] += 1
+            else:
+                # Só um alerta enfileirado conta para deduplicação e taxa
+                self._remember(camera_id, person_id, now)
+                self.counters['enqueued'] += 1
+                self._pending += 1
+                delivery = [Alert(message, camera_id, person_id, now),
+                            len(self.sinks), True]
+                for sink in self.sinks:
+                    heapq.heappush(self._jobs, (now, next(self._job_ids),
+                                                delivery, sink, 0))
+                self._ready.notify(len(self.sinks))
+        if full:
+            print(f"Alert queue full, dropping: {message}")
+            return False
+        if not self.sinks:
+            self._finish(delivery, True)
+        return True
+
+    def _next_job(self):
+        """Próxima entrega cujo instante já chegou; None ao parar"""
+        with self._ready:
+            while self._running:
+                now = time.time()
+                if self._jobs and self._jobs[0][0] <= now:
+                    return heapq.heappop(self._jobs)[2:]
+                self._ready.wait(
+                    min(self._jobs[0][0] - now, 0.5) if self._jobs else 0.5)
+            return None
+
+    def _attempt(self, delivery, sink, attempt):
+        """Uma tentativa de entrega; se falhar, reagenda-a com backoff"""
+        alert = delivery[0]
+        start = time.perf_counter()
+        try:
+            sink.send(alert)
+            ALERT_DISPATCH_SECONDS.observe(time.perf_counter() - start,
+                                           sink=sink.name, outcome='ok')
+            self._finish(delivery, True)
+        except Exception as e:
+            ALERT_DISPATCH_SECONDS.observe(time.perf_counter() - start,
+                                           sink=sink.name, outcome='error')
+            if attempt == self.settings['MAX_RETRIES']:
+                print(f"Alert sink {sink.name} failed after "
+                      f"{attempt + 1} attempts: {e}")
+                self._finish(delivery, False)
+                return
+            retry_at = time.time() + \
+                self.settings['RETRY_BACKOFF'] * 2 ** attempt
+            with self._ready:
+                self.counters['retries'] += 1
+                heapq.heappush(self._jobs, (retry_at, next(self._job_ids),
+                                            delivery, sink, attempt + 1))
+                self._ready.notify()
+
+    def _finish(self, delivery, ok):
+        """Fim da entrega a um sink; o alerta termina com o último"""
+        with self._lock:
+            delivery[1] -= 1
+            delivery[2] = delivery[2] and ok
+            if delivery[1] > 0:
+                return
+            delivered = delivery[2]
+            self.counters['delivered' if delivered else 'failed'] += 1
+            self._pending -= 1
+        alert = delivery[0]
+        if self.settings['RECORD_EVENTS']:
+            record_event('alert', alert.camera_id, alert.person_id,
+                         alert.message, 1.0 if delivered else 0.0)
+        self._latencies.append(time.time() - alert.created)
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._attempt(*job)
+
+    def join(self, timeout=None):
+        """Espera que todos os alertas sejam entregues (testes de carga)"""
+        deadline = time.time() + timeout if timeout else None
+        while self._pending:
+            if deadline and time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self):
+        with self._ready:
+            self._running = False
+            self._ready.notify_all()
+        for worker in self._workers:
+            worker.join(timeout=2)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['queue_depth'] = self._pending
+        latencies = sorted(self._latencies)
+        stats.update({
+            'sinks': [sink.name for sink in self.sinks],
+            'delivery_ms_p95': (
+                round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1)
+                if latencies else None)
+        })
+        return stats
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_alert_dispatcher():
+    """Dispatcher partilhado (workers arrancam na primeira chamada)"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = AlertDispatcher()
+        return _dispatcher
+
+
+def send_alert(message=None, camera_id=None, person_id=None):
     """
-    Função simplificada de alerta que apenas imprime a mensagem
+    Enfileira um alerta para entrega assíncrona (não bloqueia a deteção)
     """
     if message is None:
         message = "ALERT: Fall detected! Person needs help!"
 
-    print(f"ALERT: {message}")
-    return True
+    return get_alert_dispatcher().dispatch(message, camera_id, person_id)
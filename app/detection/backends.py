@@ -0,0 +1,334 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+from config import MODEL_SETTINGS
+
+# Tiers disponíveis do YOLO11, do mais leve ao mais pesado
+MODEL_TIERS = ('n', 's', 'm', 'l', 'x')
+BACKENDS = ('ultralytics', 'onnxruntime', 'openvino')
+PRECISIONS = ('fp32', 'int8')
+
+
+def model_path(backend, tier, precision='fp32', export_dir=None):
+    """Caminho dos pesos de um backend/tier/precisão
+
+    ultralytics usa o checkpoint PyTorch; os restantes usam os grafos
+    gerados por scripts/export_models.py em MODEL_SETTINGS['EXPORT_DIR'].
+    """
+    if tier not in MODEL_TIERS:
+        raise ValueError(f"Unknown model tier '{tier}'")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}'")
+
+    name = f"yolo11{tier}"
+    export_dir = export_dir or MODEL_SETTINGS['EXPORT_DIR']
+    suffix = '' if precision == 'fp32' else f'_{precision}'
+    if backend == 'ultralytics':
+        if precision != 'fp32':
+            raise ValueError("ultralytics backend only supports fp32")
+        return f"{name}.pt"
+    if backend == 'onnxruntime':
+        return os.path.join(export_dir, f"{name}{suffix}.onnx")
+    if backend == 'openvino':
+        return os.path.join(export_dir, f"{name}{suffix}_openvino_model",
+                            f"{name}.xml")
+    raise ValueError(f"Unknown backend '{backend}'")
+
+
+def letterbox(frame, size):
+    """Redimensiona mantendo o aspeto e preenche até size x size
+
+    Retorna a imagem, a escala e o deslocamento (dx, dy) aplicados.
+    """
+    height, width = frame.shape[:2]
+    scale = min(size / width, size / height)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    dx, dy = (size - new_w) // 2, (size - new_h) // 2
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[dy:dy + new_h, dx:dx + new_w] = resized
+    return canvas, scale, (dx, dy)
+
+
+def empty_detections():
+    return (np.zeros((0, 4), dtype=np.float32),
+            np.zeros(0, dtype=np.float32),
+            np.zeros(0, dtype=np.int64))
+
+
+class DetectorBackend:
+    """Interface comum dos detetores de pessoas/móveis
+
+    `predict` retorna (xyxy, conf, cls) em coordenadas do frame original:
+    caixas float32 (N, 4), confianças float32 (N,) e classes COCO int64 (N,).
+    `imgsz` substitui o tamanho de entrada numa chamada (p.ex. recortes
+    pequenos no modo ROI) quando o modelo o permite.
+    """
+
+    name = None
+    # Os pesos podem ser carregados uma vez e partilhados com outros
+    # processos (ver `share_memory`)
+    shareable = False
+
+    def __init__(self, path, imgsz=640, conf=0.25, iou=0.7):
+        self.path = path
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+
+    def predict(self, frame, imgsz=None):
+        return self.predict_batch([frame], imgsz)[0]
+
+    def share_memory(self):
+        """Prepara os pesos para serem enviados a processos filhos"""
+        raise NotImplementedError
+
+    def predict_batch(self, frames, imgsz=None):
+        raise NotImplementedError
+
+
+class UltralyticsBackend(DetectorBackend):
+    """Checkpoint PyTorch executado pelo ultralytics (modo eager)"""
+
+    name = 'ultralytics'
+    shareable = True
+
+    def __init__(self, path, **kwargs):
+        super().__init__(path, **kwargs)
+        from ultralytics import YOLO
+        self.model = YOLO(path)
+
+    def share_memory(self):
+        """Funde conv+bn e move os tensores para memória partilhada
+
+        Enviado depois como argumento de um processo (spawn), o backend
+        chega ao filho com os tensores mapeados na mesma memória em vez de
+        uma cópia por processo. A fusão é feita aqui porque, feita no
+        primeiro predict de cada filho, criaria pesos novos em cada um.
+        """
+        # Regista no pickle do multiprocessing a partilha de tensores
+        import torch.multiprocessing  # noqa: F401
+
+        self.model.fuse()
+        self.model.model.share_memory()
+
+    def predict_batch(self, frames, imgsz=None):
+        results = self.model(list(frames), imgsz=imgsz or self.imgsz,
+                             conf=self.conf, iou=self.iou, verbose=False)
+        detections = []
+        for result in results:
+            boxes = result.boxes
+            if boxes is None or len(boxes) == 0:
+                detections.append(empty_detections())
+                continue
+            detections.append((
+                boxes.xyxy.cpu().numpy().astype(np.float32),
+                boxes.conf.cpu().numpy().astype(np.float32),
+                boxes.cls.cpu().numpy().astype(np.int64)))
+        return detections
+
+
+class ExportedGraphBackend(DetectorBackend):
+    """Base dos grafos exportados: letterbox, NCHW e NMS em NumPy/OpenCV"""
+
+    fixed_batch = True
+    # Grafos exportados sem --dynamic só aceitam IMGSZ x IMGSZ
+    fixed_size = True
+
+    def preprocess(self, frames, imgsz=None):
+        size = self.imgsz if self.fixed_size else (imgsz or self.imgsz)
+        batch, meta = [], []
+        for frame in frames:
+            image, scale, offset = letterbox(frame, size)
+            batch.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+            meta.append((scale, offset, frame.shape[:2]))
+        tensor = np.stack(batch).transpose(0, 3, 1, 2)
+        return np.ascontiguousarray(tensor, dtype=np.float32) / 255.0, meta
+
+    def postprocess(self, output, meta):
+        """Converte a saída (B, 4 + classes, anchors) do YOLO11 em caixas"""
+        detections = []
+        for prediction, (scale, (dx, dy), (height, width)) in zip(output, meta):
+            prediction = prediction.T
+            scores = prediction[:, 4:]
+            cls = scores.argmax(axis=1)
+            conf = scores[np.arange(len(scores)), cls]
+            keep = conf > self.conf
+            if not np.any(keep):
+                detections.append(empty_detections())
+                continue
+
+            cx, cy, w, h = prediction[keep, :4].T
+            xyxy = np.stack([cx - w / 2, cy - h / 2,
+                             cx + w / 2, cy + h / 2], axis=1)
+            conf, cls = conf[keep], cls[keep]
+
+            # NMS por classe: deslocar as caixas de cada classe
+            offset_boxes = xyxy + (cls[:, None] * 4096.0)
+            nms_boxes = np.column_stack([
+                offset_boxes[:, :2], offset_boxes[:, 2:] - offset_boxes[:, :2]])
+            indices = cv2.dnn.NMSBoxes(nms_boxes.tolist(), conf.tolist(),
+                                       self.conf, self.iou)
+            indices = np.array(indices, dtype=np.int64).reshape(-1)
+
+            # Desfazer o letterbox
+            xyxy = xyxy[indices]
+            xyxy[:, [0, 2]] = np.clip((xyxy[:, [0, 2]] - dx) / scale, 0, width)
+            xyxy[:, [1, 3]] = np.clip((xyxy[:, [1, 3]] - dy) / scale, 0, height)
+            detections.append((xyxy.astype(np.float32),
+                               conf[indices].astype(np.float32),
+                               cls[indices].astype(np.int64)))
+        return detections
+
+    def run(self, tensor):
+        raise NotImplementedError
+
+    def predict_batch(self, frames, imgsz=None):
+        tensor, meta = self.preprocess(frames, imgsz)
+        # Grafos exportados com batch fixo: executar frame a frame
+        if self.fixed_batch:
+            output = np.concatenate([self.run(t[None]) for t in tensor])
+        else:
+            output = self.run(tensor)
+        return self.postprocess(output, meta)
+
+
+class OnnxRuntimeBackend(ExportedGraphBackend):
+    """Grafo ONNX executado pelo ONNX Runtime no CPU"""
+
+    name = 'onnxruntime'
+
+    def __init__(self, path, threads=0, **kwargs):
+        super().__init__(path, **kwargs)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = \
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            path, options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.fixed_batch = isinstance(model_input.shape[0], int)
+        self.fixed_size = isinstance(model_input.shape[2], int)
+
+    def run(self, tensor):
+        return self.session.run(None, {self.input_name: tensor})[0]
+
+
+class OpenVinoBackend(ExportedGraphBackend):
+    """Grafo OpenVINO IR compilado para o CPU"""
+
+    name = 'openvino'
+
+    def __init__(self, path, threads=0, **kwargs):
+        super().__init__(path, **kwargs)
+        import openvino as ov
+
+        core = ov.Core()
+        # Pesos do IR (.bin) mapeados do ficheiro: processos que carregam o
+        # mesmo modelo partilham as páginas na cache do sistema
+        core.set_property({'ENABLE_MMAP': MODEL_SETTINGS['SHARE_WEIGHTS']})
+        config = {'PERFORMANCE_HINT': 'LATENCY'}
+        if threads:
+            config['INFERENCE_NUM_THREADS'] = threads
+        model = core.read_model(path)
+        shape = model.input(0).get_partial_shape()
+        self.fixed_batch = shape[0].is_static
+        self.fixed_size = shape[2].is_static
+        self.compiled = core.compile_model(model, 'CPU', config)
+        self.output = self.compiled.output(0)
+
+    def run(self, tensor):
+        return self.compiled(tensor)[self.output]
+
+
+BACKEND_CLASSES = {
+    'ultralytics': UltralyticsBackend,
+    'onnxruntime': OnnxRuntimeBackend,
+    'openvino': OpenVinoBackend
+}
+
+
+def create_backend(settings=None):
+    """Cria o backend configurado em MODEL_SETTINGS (ou em `settings`)"""
+    settings = dict(MODEL_SETTINGS, **(settings or {}))
+    backend = settings['BACKEND']
+    if backend not in BACKEND_CLASSES:
+        raise ValueError(f"Unknown backend '{backend}'")
+
+    path = settings.get('WEIGHTS') or model_path(
+        backend, settings['TIER'], settings['PRECISION'],
+        settings['EXPORT_DIR'])
+    kwargs = {'imgsz': settings['IMGSZ']}
+    if backend != 'ultralytics':
+        kwargs['threads'] = settings.get('THREADS', 0)
+
+    print(f"Loading {backend} detector ({path})")
+    return BACKEND_CLASSES[backend](path, **kwargs)
+
+
+def create_shared_backend(settings=None):
+    """Backend carregado uma vez para os processos das câmeras, ou None
+
+    Só para backends `shareable` com SHARE_WEIGHTS; os restantes são
+    carregados por cada processo (OpenVINO mapeia os pesos do ficheiro).
+    """
+    settings = dict(MODEL_SETTINGS, **(settings or {}))
+    backend_class = BACKEND_CLASSES.get(settings['BACKEND'])
+    if not settings['SHARE_WEIGHTS'] or backend_class is None or \
+            not backend_class.shareable:
+        return None
+    backend = create_backend(settings)
+    backend.share_memory()
+    return backend
+
+
+class SharedBackend:
+    """Um backend usado por todas as câmeras do processo
+
+    Em modo 'threads' as câmeras partilham um só modelo em memória em vez
+    de um por câmera. As chamadas são serializadas (disputariam o mesmo
+    CPU/GPU de qualquer forma; `INFERENCE_SETTINGS['BATCHING']` agrupa-as
+    em lotes). `swap` troca o modelo (p.ex. de tier) sem que as câmeras
+    mudem de objeto.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.users = 0
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self.backend.name
+
+    def predict(self, frame, imgsz=None):
+        with self._lock:
+            return self.backend.predict(frame, imgsz)
+
+    def predict_batch(self, frames, imgsz=None):
+        with self._lock:
+            return self.backend.predict_batch(frames, imgsz)
+
+    def swap(self, backend):
+        with self._lock:
+            self.backend = backend
+
+
+_shared_backend = None
+_shared_backend_lock = threading.Lock()
+
+
+def get_shared_backend():
+    """Backend do processo (carregado na primeira chamada); conta quem o usa"""
+    global _shared_backend
+    with _shared_backend_lock:
+        if _shared_backend is None:
+            _shared_backend = SharedBackend(create_backend())
+        _shared_backend.users += 1
+        return _shared_backend
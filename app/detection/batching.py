@@ -0,0 +1,145 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+from config import INFERENCE_SETTINGS
+from .backends import create_backend
+from .metrics import QUEUE_DEPTH
+
+
+class InferenceServer:
+    """Serviço de inferência em micro-lotes partilhado pelos pipelines
+
+    Cada câmera chama `predict(frame)` como faria com um backend; os
+    pedidos de todas as câmeras são agrupados até `MAX_BATCH_SIZE` frames
+    ou até `MAX_WAIT_MS` após o primeiro pedido, corridos numa única
+    passagem `predict_batch` e devolvidos a quem os pediu.
+    """
+
+    def __init__(self, backend=None, settings=None):
+        self.settings = dict(INFERENCE_SETTINGS, **(settings or {}))
+        self.backend = backend or create_backend()
+        self.max_batch_size = self.settings['MAX_BATCH_SIZE']
+        self.max_wait = self.settings['MAX_WAIT_MS'] / 1000.0
+        self._queue = queue.Queue()
+        QUEUE_DEPTH.track(self._queue.qsize, queue='inference')
+        self._running = True
+
+        # Métricas (janela dos últimos lotes/pedidos)
+        self.batches = 0
+        self.frames = 0
+        self._batch_sizes = deque(maxlen=200)
+        self._queue_waits = deque(maxlen=1000)
+        self._latencies = deque(maxlen=1000)
+
+        self._thread = threading.Thread(
+            target=self._run, name='inference-server', daemon=True)
+        self._thread.start()
+
+    def submit(self, frame, imgsz=None):
+        """Enfileira um frame; retorna um Future com (xyxy, conf, cls)"""
+        future = Future()
+        self._queue.put((frame, future, time.perf_counter(), imgsz))
+        return future
+
+    def predict(self, frame, imgsz=None):
+        return self.submit(frame, imgsz).result()
+
+    def predict_batch(self, frames, imgsz=None):
+        futures = [self.submit(frame, imgsz) for frame in frames]
+        return [future.result() for future in futures]
+
+    def _collect(self):
+        """Primeiro pedido bloqueante; os seguintes até ao prazo do lote"""
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while self._running:
+            batch = self._collect()
+            if not batch:
+                continue
+
+            # Frames inteiros e recortes ROI têm tamanhos de entrada distintos
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[3], []).append(item)
+            for imgsz, items in groups.items():
+                self._run_group(imgsz, items)
+
+            self.batches += 1
+            self.frames += len(batch)
+            self._batch_sizes.append(len(batch))
+
+    def _run_group(self, imgsz, items):
+        started = time.perf_counter()
+        frames = [frame for frame, _, _, _ in items]
+        try:
+            results = self.backend.predict_batch(frames, imgsz)
+        except Exception as e:
+            for _, future, _, _ in items:
+                future.set_exception(e)
+            return
+        finished = time.perf_counter()
+
+        for (_, future, submitted, _), result in zip(items, results):
+            self._queue_waits.append(started - submitted)
+            self._latencies.append(finished - submitted)
+            future.set_result(result)
+
+    def stop(self):
+        self._running = False
+        self._thread.join(timeout=2)
+
+    def metrics(self):
+        """Ocupação dos lotes, espera na fila e latência por frame (ms)"""
+        def summary(values):
+            values = np.array(values) * 1000
+            if not len(values):
+                return {'mean': None, 'p95': None}
+            return {'mean': round(float(values.mean()), 2),
+                    'p95': round(float(np.percentile(values, 95)), 2)}
+
+        sizes = np.array(self._batch_sizes)
+        return {
+            'backend': self.backend.name,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.settings['MAX_WAIT_MS'],
+            'batches': self.batches,
+            'frames': self.frames,
+            'queue_depth': self._queue.qsize(),
+            'mean_batch_size': (round(float(sizes.mean()), 2)
+                                if len(sizes) else None),
+            'batch_fill': (round(float(sizes.mean()) / self.max_batch_size, 3)
+                           if len(sizes) else None),
+            'queue_wait_ms': summary(self._queue_waits),
+            'latency_ms': summary(self._latencies)
+        }
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_inference_server():
+    """Serviço de inferência do processo (um modelo para todas as câmeras)"""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = InferenceServer()
+        return _server
@@ -0,0 +1,68 @@
+import json
+import os
+
+from config import CAMERA_SETTINGS
+
+DEFAULT_CAMERA_ID = 'default'
+
+
+def load_cameras(settings=None):
+    """Lê o registo de câmeras: ficheiro JSON se existir, senão o config
+
+    O ficheiro tem o mesmo formato de CAMERA_SETTINGS['CAMERAS']:
+        [{"ID": "quarto-12", "SOURCE": "rtsp://...", "DETECTION_FPS": 5}]
+    Retorna um dicionário ID -> câmera, pela ordem do registo.
+    """
+    settings = dict(CAMERA_SETTINGS, **(settings or {}))
+    cameras = settings['CAMERAS']
+    path = settings.get('FILE')
+    if path and os.path.exists(path):
+        with open(path) as f:
+            cameras = json.load(f)
+
+    registry = {}
+    for camera in cameras:
+        if 'ID' not in camera or 'SOURCE' not in camera:
+            raise ValueError(f"Camera entry needs ID and SOURCE: {camera}")
+        camera_id = str(camera['ID'])
+        if camera_id in registry:
+            raise ValueError(f"Duplicate camera ID '{camera_id}'")
+        registry[camera_id] = dict(camera, ID=camera_id)
+    return registry
+
+
+_registry = None
+
+
+def get_cameras():
+    """Registo de câmeras (carregado uma vez)"""
+    global _registry
+    if _registry is None:
+        _registry = load_cameras()
+    return _registry
+
+
+def default_camera_id():
+    cameras = get_cameras()
+    return next(iter(cameras)) if cameras else DEFAULT_CAMERA_ID
+
+
+def get_camera_config(camera_id=None):
+    """Configuração de uma câmera; KeyError se não estiver registada"""
+    camera_id = default_camera_id() if camera_id is None else str(camera_id)
+    return get_cameras()[camera_id]
+
+
+def get_camera(camera_id=None):
+    """Pipeline de uma câmera, conforme CAMERA_SETTINGS['MODE']
+
+    Em 'threads' corre no processo atual (FrameBroadcaster); em
+    'processes' corre num processo filho gerido pelo supervisor
+    (RemoteCamera). Ambos expõem frames(), status() e stats().
+    """
+    if CAMERA_SETTINGS['MODE'] == 'processes':
+        from .supervisor import get_supervisor
+        return get_supervisor().get(get_camera_config(camera_id)['ID'])
+
+    from .stream import get_broadcaster
+    return get_broadcaster(camera_id)
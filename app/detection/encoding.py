@@ -0,0 +1,119 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+from config import STREAM_SETTINGS
+from .metrics import observe_stage
+
+try:
+    from turbojpeg import TJPF_BGR, TurboJPEG
+except ImportError:  # PyTurboJPEG é opcional: usa-se o cv2.imencode
+    TurboJPEG = None
+
+
+class JpegEncoder:
+    """Codificação JPEG com libjpeg-turbo (PyTurboJPEG) quando disponível"""
+
+    def __init__(self, use_turbo=None):
+        if use_turbo is None:
+            use_turbo = STREAM_SETTINGS['TURBOJPEG']
+        self._turbo = None
+        if use_turbo and TurboJPEG is not None:
+            try:
+                self._turbo = TurboJPEG()
+            except (OSError, RuntimeError) as e:
+                # Módulo instalado mas sem a biblioteca nativa
+                print(f"TurboJPEG unavailable, using OpenCV: {e}")
+        self.name = 'turbojpeg' if self._turbo is not None else 'opencv'
+
+    def encode(self, image, quality):
+        if self._turbo is not None:
+            return self._turbo.encode(image, quality=quality,
+                                      pixel_format=TJPF_BGR)
+        ret, buffer = cv2.imencode('.jpg', image,
+                                   [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return buffer.tobytes() if ret else None
+
+    def decode(self, jpeg):
+        if self._turbo is not None:
+            return self._turbo.decode(jpeg, pixel_format=TJPF_BGR)
+        return cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def get_jpeg_encoder():
+    """Codificador partilhado pelo processo"""
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            _encoder = JpegEncoder()
+        return _encoder
+
+
+def resize_for_tier(image, width):
+    """Reduz a imagem para `width` (nunca aumenta; None = original)"""
+    height, current = image.shape[:2]
+    if not width or width >= current:
+        return image
+    size = (width, max(1, round(height * width / current)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+class StreamFrame:
+    """Um frame publicado e os seus JPEG por tier, codificados uma só vez
+
+    O tier por omissão chega já codificado pela thread de saída; os
+    restantes são codificados pelo primeiro cliente que os pede e ficam
+    em cache para os outros clientes do mesmo frame. Sem a imagem
+    original (frames vindos de outro processo), o JPEG por omissão é
+    descodificado uma vez.
+    """
+
+    __slots__ = ('camera_id', '_image', '_jpegs', '_lock')
+
+    def __init__(self, jpeg, image=None, camera_id=None):
+        self.camera_id = camera_id
+        self._image = image
+        self._jpegs = {STREAM_SETTINGS['DEFAULT_TIER']: jpeg}
+        self._lock = threading.Lock()
+
+    def cached(self, tier=None):
+        """JPEG do tier se já estiver codificado (não bloqueia)"""
+        return self._jpegs.get(tier or STREAM_SETTINGS['DEFAULT_TIER'])
+
+    def jpeg(self, tier=None):
+        tier = tier or STREAM_SETTINGS['DEFAULT_TIER']
+        jpeg = self._jpegs.get(tier)
+        if jpeg is not None:
+            return jpeg
+        with self._lock:
+            jpeg = self._jpegs.get(tier)
+            if jpeg is None:
+                start = time.perf_counter()
+                encoder = get_jpeg_encoder()
+                if self._image is None:
+                    self._image = encoder.decode(
+                        self._jpegs[STREAM_SETTINGS['DEFAULT_TIER']])
+                settings = STREAM_SETTINGS['TIERS'][tier]
+                jpeg = self._jpegs[tier] = encoder.encode(
+                    resize_for_tier(self._image, settings['WIDTH']),
+                    settings['QUALITY'])
+                observe_stage(self.camera_id, f'encode_{tier}',
+                              time.perf_counter() - start)
+            return jpeg
+
+    def release_image(self):
+        """Larga a imagem (p.ex. um buffer que vai ser reutilizado)"""
+        with self._lock:
+            self._image = None
+
+
+def encode_default_tier(image):
+    """JPEG do tier por omissão (stream, clips e slot entre processos)"""
+    settings = STREAM_SETTINGS['TIERS'][STREAM_SETTINGS['DEFAULT_TIER']]
+    return get_jpeg_encoder().encode(
+        resize_for_tier(image, settings['WIDTH']), settings['QUALITY'])
@@ -0,0 +1,66 @@
+import queue
+import threading
+
+from config import PUSH_SETTINGS
+from .metrics import QUEUE_DEPTH
+
+
+class EventBus:
+    """Barramento de eventos do processo (transições de queda, tracks, stats)
+
+    `publish` é chamado pelo ciclo de deteção e nunca bloqueia: o evento
+    entra numa fila limitada e uma única thread entrega-o aos subscritores
+    (p.ex. um emit Socket.IO para todos os clientes de uma câmera). O custo
+    no detector não depende do número de clientes ligados.
+    """
+
+    def __init__(self, maxsize=None):
+        self._queue = queue.Queue(maxsize=maxsize or PUSH_SETTINGS['QUEUE_SIZE'])
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, callback):
+        """Regista `callback(event, data)`; arranca a thread de entrega"""
+        with self._lock:
+            self._subscribers.append(callback)
+            if self._thread is None:
+                QUEUE_DEPTH.track(self._queue.qsize, queue='events')
+                self._thread = threading.Thread(
+                    target=self._run, name='event-bus', daemon=True)
+                self._thread.start()
+
+    def publish(self, event, data):
+        if not self._subscribers:
+            return False
+        try:
+            self._queue.put_nowait((event, data))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.published += 1
+        return True
+
+    def _run(self):
+        while True:
+            event, data = self._queue.get()
+            for callback in list(self._subscribers):
+                try:
+                    callback(event, data)
+                except Exception as e:
+                    print(f"Event subscriber failed on {event}: {e}")
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus():
+    """Barramento partilhado pelo processo"""
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = EventBus()
+        return _bus
@@ -0,0 +1,133 @@
+import numpy as np
+from config import FALL_DETECTION_SETTINGS
+
+# Índices dos landmarks do MediaPipe Pose (33 pontos: x, y, z, visibility)
+NUM_LANDMARKS = 33
+NOSE = 0
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+SCORED_LANDMARKS = [NOSE, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP,
+                    LEFT_ANKLE, RIGHT_ANKLE]
+# Pesos dos critérios de `score_falls` (chão x3, queda rápida, rápida e no
+# chão, horizontal, horizontal e baixo, assimetria)
+SCORE_WEIGHTS = np.array([20, 20, 20, 35, 25, 30, 25, 15], dtype=np.int32)
+
+# Móveis onde deitar/sentar não é queda
+REST_FURNITURE = ('couch', 'bed')
+
+
+class LandmarkHistory:
+    """Últimos HISTORY_SIZE conjuntos de landmarks de um track (anel fixo)"""
+
+    __slots__ = ('frames', 'count')
+
+    def __init__(self, size=None):
+        size = size or FALL_DETECTION_SETTINGS['HISTORY_SIZE']
+        self.frames = np.zeros((size, NUM_LANDMARKS, 4), dtype=np.float32)
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, len(self.frames))
+
+    def append(self, landmarks):
+        self.frames[self.count % len(self.frames)] = landmarks
+        self.count += 1
+
+    def last(self):
+        """Landmarks do frame analisado anterior, ou None"""
+        if not self.count:
+            return None
+        return self.frames[(self.count - 1) % len(self.frames)]
+
+
+def pack_landmarks(poses):
+    """Lista de PoseLandmarks -> array (tracks, 33, 4)"""
+    if not poses:
+        return np.zeros((0, NUM_LANDMARKS, 4), dtype=np.float32)
+    return np.stack([pose.to_array() for pose in poses])
+
+
+def previous_nose(histories):
+    """Altura do nariz no frame anterior de cada track (NaN sem histórico)"""
+    prev = np.full(len(histories), np.nan, dtype=np.float32)
+    for i, history in enumerate(histories):
+        last = history.last()
+        if last is not None:
+            prev[i] = last[NOSE, 1]
+    return prev
+
+
+def furniture_features(nearby_per_track, frame_height):
+    """Móveis próximos de cada track em arrays para `score_falls`
+
+    Retorna o topo normalizado dos sofás/camas de cada track (tracks, K),
+    preenchido com NaN, e se o track tem algum móvel próximo.
+    """
+    tops = [[f['box'][1] / frame_height for f in nearby
+             if f['type'] in REST_FURNITURE] for nearby in nearby_per_track]
+    width = max((len(t) for t in tops), default=0)
+    rest_tops = np.full((len(tops), width), np.nan, dtype=np.float32)
+    for i, track_tops in enumerate(tops):
+        rest_tops[i, :len(track_tops)] = track_tops
+    has_furniture = np.array([bool(nearby) for nearby in nearby_per_track],
+                             dtype=bool)
+    return rest_tops, has_furniture
+
+
+def score_falls(landmarks, prev_nose=None, rest_tops=None, has_furniture=None):
+    """Pontuação de queda de todos os tracks numa única chamada
+
+    `landmarks` (tracks, 33, 4) normalizados ao frame; `prev_nose` (tracks,)
+    com a altura do nariz no frame anterior (NaN sem histórico);
+    `rest_tops` (tracks, K) com o topo normalizado dos sofás/camas
+    próximos (NaN = nenhum) e `has_furniture` (tracks,) se há algum móvel
+    próximo. Retorna (is_fall, ground_score), ambos (tracks,).
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    n = len(landmarks)
+    if prev_nose is None:
+        prev_nose = np.full(n, np.nan, dtype=np.float32)
+    if has_furniture is None:
+        has_furniture = np.zeros(n, dtype=bool)
+
+    # Alturas dos 7 landmarks usados, numa única indexação
+    nose, l_shoulder, r_shoulder, l_hip, r_hip, l_ankle, r_ankle = \
+        landmarks[:, SCORED_LANDMARKS, 1].T
+    mid_shoulder = (l_shoulder + r_shoulder) / 2
+    mid_hip = (l_hip + r_hip) / 2
+    mid_ankle = (l_ankle + r_ankle) / 2
+    # NaN sem frame anterior: as comparações com NaN dão sempre False
+    movement = np.abs(nose - prev_nose)
+    if rest_tops is None or not rest_tops.shape[1]:
+        near_rest = on_rest = np.zeros(n, dtype=bool)
+    else:
+        near_rest = (np.abs(mid_hip[:, None] - rest_tops) < 0.2).any(axis=1)
+        on_rest = ~np.isnan(rest_tops[:, 0])
+
+    # Critérios de cada track (tracks, 8); a pontuação é a soma ponderada
+    head_to_ankle = np.abs(nose - mid_ankle)
+    near_head = head_to_ankle < 0.3
+    fast = (movement > 0.05) & ~on_rest          # queda rápida fora de móveis
+    horizontal = (np.abs(mid_shoulder - mid_hip) < 0.15) & ~has_furniture
+    criteria = np.stack([
+        near_head,                                # nariz perto do chão
+        np.abs(l_shoulder - mid_ankle) < 0.3,     # ombros perto do chão
+        np.abs(r_shoulder - mid_ankle) < 0.3,
+        fast,
+        fast & near_head,
+        horizontal,                               # corpo na horizontal...
+        horizontal & ((mid_shoulder + mid_hip) / 2 - mid_ankle < 0.2),
+        (np.abs(l_shoulder - r_shoulder) > 0.1) |  # quedas são assimétricas
+        (np.abs(l_hip - r_hip) > 0.1)
+    ], axis=1)
+    score = criteria @ SCORE_WEIGHTS
+    near_ground = criteria[:, :3].sum(axis=1)
+
+    is_fall = ((score > 70) & (near_ground >= 2) & ~on_rest & near_head)
+
+    # Na altura de um sofá/cama e sem movimento brusco: deitar/sentar
+    resting = near_rest & ~(movement >= 0.04)
+    is_fall &= ~resting
+    score[resting] = 0
+    return is_fall, score
@@ -0,0 +1,56 @@
+import psutil
+
+MB = 1024 * 1024
+
+
+def process_memory(pid=None):
+    """Memória de um processo em MB
+
+    RSS conta as páginas partilhadas em cada processo que as mapeia; PSS
+    divide-as pelos processos que as partilham (a soma dos PSS é a RAM
+    realmente ocupada) e USS é só a memória privada do processo. PSS e
+    USS só existem no Linux; noutros sistemas ficam a None.
+    """
+    process = psutil.Process(pid)
+    try:
+        info = process.memory_full_info()
+    except (psutil.AccessDenied, psutil.ZombieProcess):
+        info = process.memory_info()
+    pss = getattr(info, 'pss', None)
+    uss = getattr(info, 'uss', None)
+    shared = getattr(info, 'shared', None)
+    return {
+        'pid': process.pid,
+        'rss_mb': round(info.rss / MB, 1),
+        'pss_mb': round(pss / MB, 1) if pss is not None else None,
+        'uss_mb': round(uss / MB, 1) if uss is not None else None,
+        'shared_mb': round(shared / MB, 1) if shared is not None else None
+    }
+
+
+def memory_report(processes):
+    """Relatório de `processes` (nome -> pid) com os totais
+
+    Processos que já terminaram ficam de fora. Com pesos partilhados, a
+    soma dos PSS cresce pouco com o número de processos e fica bem abaixo
+    da soma dos RSS.
+    """
+    report = {}
+    for name, pid in processes.items():
+        try:
+            report[name] = process_memory(pid)
+        except psutil.NoSuchProcess:
+            continue
+
+    def total(key):
+        values = [memory[key] for memory in report.values()]
+        if not values or None in values:
+            return None
+        return round(sum(values), 1)
+
+    return {
+        'processes': report,
+        'total_rss_mb': total('rss_mb'),
+        'total_pss_mb': total('pss_mb'),
+        'total_uss_mb': total('uss_mb')
+    }
@@ -0,0 +1,275 @@
+import collections
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from config import METRICS_SETTINGS
+
+
+class Metric:
+    """Família de métricas com etiquetas (formato de texto do Prometheus)"""
+
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._functions = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def track(self, function, **labels):
+        """Valor lido de `function()` a cada recolha (filas, FPS, contadores)"""
+        with self._lock:
+            self._functions[self._key(labels)] = function
+
+    def untrack(self, **labels):
+        with self._lock:
+            self._functions.pop(self._key(labels), None)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+        for key, function in functions:
+            try:
+                values[key] = float(function())
+            except Exception:
+                continue
+        return values
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=None):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets or METRICS_SETTINGS['BUCKETS'])
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            return {key: [list(counts), total, count]
+                    for key, (counts, total, count) in self._values.items()}
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def snapshot(self):
+        """Amostras de todas as famílias (serializável entre processos)"""
+        return {name: metric.samples() for name, metric in self.metrics.items()}
+
+    def render(self, snapshots=()):
+        """Texto Prometheus; `snapshots` de outros processos são somados"""
+        merged = self.snapshot()
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                target = merged.setdefault(name, {})
+                for key, value in samples.items():
+                    target[key] = merge_sample(target.get(key), value)
+
+        lines = []
+        for name, metric in self.metrics.items():
+            samples = merged.get(name)
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for key, value in sorted((samples or {}).items()):
+                labels = list(zip(metric.labelnames, key))
+                if metric.type != 'histogram':
+                    lines.append(f"{name}{format_labels(labels)} "
+                                 f"{format_value(value)}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, n in zip(metric.buckets, counts):
+                    cumulative += n
+                    lines.append(
+                        f"{name}_bucket"
+                        f"{format_labels(labels + [('le', repr(bound))])} "
+                        f"{cumulative}")
+                lines.append(f"{name}_bucket"
+                             f"{format_labels(labels + [('le', '+Inf')])} "
+                             f"{count}")
+                lines.append(f"{name}_sum{format_labels(labels)} "
+                             f"{format_value(total)}")
+                lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def merge_sample(current, value):
+    if current is None:
+        return value
+    if isinstance(value, list):
+        return [[a + b for a, b in zip(current[0], value[0])],
+                current[1] + value[1], current[2] + value[2]]
+    return current + value
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"')
+               .replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value
+                          in zip(labels, escaped)) + '}'
+
+
+def format_value(value):
+    return repr(float(value))
+
+
+REGISTRY = Registry()
+
+# Duração de cada etapa do pipeline (segundos)
+STAGE_SECONDS = Histogram(
+    'fall_stage_seconds', 'Duration of each pipeline stage',
+    ('camera', 'stage'))
+ALERT_DISPATCH_SECONDS = Histogram(
+    'fall_alert_delivery_seconds', 'Alert delivery time per sink',
+    ('sink', 'outcome'))
+FRAMES = Counter(
+    'fall_frames_total', 'Frames per camera and pipeline step',
+    ('camera', 'step'))
+PIPELINE_ERRORS = Counter(
+    'fall_pipeline_errors_total',
+    'Exceptions caught and retried in pipeline threads', ('camera', 'stage'))
+DROPPED_FRAMES = Counter(
+    'fall_dropped_frames_total',
+    'Frames skipped by the detector or by slow clients', ('camera', 'reason'))
+CAMERA_FPS = Gauge(
+    'fall_camera_fps', 'Capture and detection rate per camera',
+    ('camera', 'kind'))
+DETECTION_PASSES = Counter(
+    'fall_detection_passes_total',
+    'Detector passes on the full frame or on track crops', ('camera', 'mode'))
+MOTION_GATE = Counter(
+    'fall_motion_gate_total',
+    'Motion gate decisions (motion, forced or skipped)', ('camera', 'decision'))
+SAVED_SECONDS = Counter(
+    'fall_inference_saved_seconds_total',
+    'Estimated detector time saved by skipped frames', ('camera',))
+QUALITY_STEP = Gauge(
+    'fall_quality_step',
+    'Adaptive quality step per knob (0 = configured value)',
+    ('camera', 'knob'))
+QUALITY_CHANGES = Counter(
+    'fall_quality_changes_total', 'Adaptive quality decisions',
+    ('camera', 'knob', 'direction'))
+SOURCE_RECONNECTS = Counter(
+    'fall_source_reconnects_total',
+    'Video source reopen attempts after a failure', ('camera',))
+QUEUE_DEPTH = Gauge(
+    'fall_queue_depth', 'Items waiting in internal queues', ('queue',))
+CLIENTS = Gauge(
+    'fall_stream_clients', 'Connected MJPEG clients', ('camera',))
+
+
+def observe_stage(camera, stage, seconds):
+    if METRICS_SETTINGS['ENABLED']:
+        STAGE_SECONDS.observe(seconds, camera=camera, stage=stage)
+
+
+@contextmanager
+def stage_timer(camera, stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(camera, stage, time.perf_counter() - start)
+
+
+def sample_profile(seconds, interval=None, thread_filter=None):
+    """Perfil por amostragem de todas as threads do processo
+
+    Regista a pilha de cada thread a cada `interval` segundos durante
+    `seconds`; retorna as pilhas no formato "collapsed" (uma linha
+    `thread;f1;f2 contagem`, pronto para flamegraph) e as funções onde
+    mais amostras terminaram.
+    """
+    interval = interval or METRICS_SETTINGS['PROFILE_INTERVAL']
+    seconds = min(seconds, METRICS_SETTINGS['PROFILE_MAX_SECONDS'])
+    me = threading.get_ident()
+    names = {}
+    stacks = collections.Counter()
+    leaves = collections.Counter()
+    samples = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        names.update({t.ident: t.name for t in threading.enumerate()})
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            thread = names.get(ident, str(ident))
+            if thread_filter and thread_filter not in thread:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} "
+                             f"({code.co_filename.rsplit('/', 1)[-1]}:"
+                             f"{frame.f_lineno})")
+                frame = frame.f_back
+            if not stack:
+                continue
+            leaves[stack[0]] += 1
+            stacks[';'.join([thread] + stack[::-1])] += 1
+        samples += 1
+        time.sleep(interval)
+
+    return {
+        'seconds': seconds,
+        'samples': samples,
+        'top': [{'function': name, 'samples': count}
+                for name, count in leaves.most_common(25)],
+        'collapsed': '\n'.join(f"{stack} {count}"
+                               for stack, count in stacks.most_common())
+    }
@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+from config import MOTION_SETTINGS
+
+
+class MotionGate:
+    """Pré-etapa barata que decide se um frame precisa dos modelos
+
+    Compara uma versão pequena, em tons de cinza e desfocada do frame com
+    um fundo de média móvel. Sem movimento, o detector reaproveita as
+    deteções anteriores; uma deteção completa é forçada pelo menos a cada
+    MAX_SKIP_SECONDS para apanhar mudanças lentas.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = dict(MOTION_SETTINGS, **(settings or {}))
+        self.reset()
+
+    def reset(self):
+        self._background = None
+        self._last_full = None
+        self.last_change = 0.0
+
+    def _small_gray(self, frame):
+        height, width = frame.shape[:2]
+        small_width = self.settings['WIDTH']
+        small_height = max(1, round(height * small_width / width))
+        small = cv2.resize(frame, (small_width, small_height),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def check(self, frame, now):
+        """Retorna 'motion', 'forced' (intervalo máximo) ou None (saltar)"""
+        gray = self._small_gray(frame)
+        if self._background is None or \
+                self._background.shape != gray.shape:
+            self._background = gray.astype(np.float32)
+            self._last_full = now
+            return 'motion'
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        _, mask = cv2.threshold(diff, self.settings['PIXEL_THRESHOLD'], 255,
+                                cv2.THRESH_BINARY)
+        self.last_change = cv2.countNonZero(mask) / mask.size
+        cv2.accumulateWeighted(gray, self._background,
+                               self.settings['BACKGROUND_ALPHA'])
+
+        if self.last_change >= self.settings['AREA_THRESHOLD']:
+            self._last_full = now
+            return 'motion'
+        if now - self._last_full >= self.settings['MAX_SKIP_SECONDS']:
+            self._last_full = now
+            return 'forced'
+        return None
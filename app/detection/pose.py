@@ -0,0 +1,168 @@
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from config import POSE_SETTINGS
+
+Landmark = namedtuple('Landmark', ['x', 'y', 'z', 'visibility'])
+
+
+class PoseLandmarks:
+    """Landmarks de uma pessoa já convertidos para coordenadas do frame
+
+    Mantém a interface `landmark[idx].x/.y` dos resultados do MediaPipe;
+    `to_array` dá a linha (33, 4) usada por `features.score_falls`.
+    """
+
+    def __init__(self, landmarks):
+        self.landmark = landmarks
+
+    def to_array(self):
+        return np.array(self.landmark, dtype=np.float32)
+
+
+class PoseEstimator:
+    """Estimativa de pose por pessoa sobre o recorte YOLO de cada uma
+
+    Cada track tem a sua própria instância de `Pose`, para que o tracking
+    temporal do MediaPipe continue válido entre frames. As instâncias de
+    tracks que desaparecem voltam a um pool para serem reutilizadas.
+    """
+
+    def __init__(self, settings=None):
+        import mediapipe as mp
+
+        self.settings = dict(POSE_SETTINGS, **(settings or {}))
+        self.mp_pose = mp.solutions.pose
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.settings['MAX_WORKERS'],
+            thread_name_prefix='pose')
+        self._by_track = {}
+        self._free = []
+        self._lock = threading.Lock()
+
+    def _create_pose(self):
+        return self.mp_pose.Pose(
+            static_image_mode=False,
+            model_complexity=self.settings['MODEL_COMPLEXITY'],
+            enable_segmentation=False,
+            min_detection_confidence=self.settings['MIN_DETECTION_CONFIDENCE'],
+            min_tracking_confidence=self.settings['MIN_TRACKING_CONFIDENCE']
+        )
+
+    def _checkout(self):
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+        return self._create_pose()
+
+    def _checkin(self, pose):
+        with self._lock:
+            if len(self._free) < self.settings['MAX_IDLE_INSTANCES']:
+                # Limpar o estado de tracking antes de reutilizar
+                if hasattr(pose, 'reset'):
+                    pose.reset()
+                self._free.append(pose)
+                return
+        pose.close()
+
+    def set_complexity(self, complexity):
+        """Troca a complexidade do modelo de pose (controlo de qualidade)
+
+        As instâncias existentes são fechadas; cada track recomeça o
+        tracking do MediaPipe com uma instância nova no frame seguinte.
+        """
+        if complexity == self.settings['MODEL_COMPLEXITY']:
+            return
+        with self._lock:
+            self.settings['MODEL_COMPLEXITY'] = complexity
+            poses = list(self._by_track.values()) + self._free
+            self._by_track.clear()
+            self._free.clear()
+        for pose in poses:
+            pose.close()
+
+    def crop_region(self, box, width, height):
+        """Recorte com margem à volta da caixa, limitado ao frame"""
+        x1, y1, x2, y2 = box
+        pad_x = (x2 - x1) * self.settings['CROP_PADDING']
+        pad_y = (y2 - y1) * self.settings['CROP_PADDING']
+        cx1 = int(max(0, x1 - pad_x))
+        cy1 = int(max(0, y1 - pad_y))
+        cx2 = int(min(width, x2 + pad_x))
+        cy2 = int(min(height, y2 + pad_y))
+        return cx1, cy1, cx2, cy2
+
+    def _process_crop(self, pose, rgb_frame, region):
+        cx1, cy1, cx2, cy2 = region
+        if cx2 <= cx1 or cy2 <= cy1:
+            return None
+
+        crop = np.ascontiguousarray(rgb_frame[cy1:cy2, cx1:cx2])
+        crop.flags.writeable = False
+        results = pose.process(crop)
+        if not results.pose_landmarks:
+            return None
+
+        # Converter coordenadas do recorte para coordenadas do frame
+        height, width = rgb_frame.shape[:2]
+        crop_w, crop_h = cx2 - cx1, cy2 - cy1
+        return PoseLandmarks([
+            Landmark((cx1 + lm.x * crop_w) / width,
+                     (cy1 + lm.y * crop_h) / height,
+                     lm.z * crop_w / width,
+                     lm.visibility)
+            for lm in results.pose_landmarks.landmark
+        ])
+
+    def estimate(self, frame, boxes, track_ids):
+        """Estima a pose de todas as pessoas do frame
+
+        Retorna uma lista alinhada com `boxes` com `PoseLandmarks` ou None.
+        """
+        if len(boxes) == 0:
+            return []
+
+        # Conversão de cor feita uma única vez por frame
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        height, width = frame.shape[:2]
+
+        claimed = set()
+        borrowed = []
+        futures = []
+        for box, track_id in zip(boxes, track_ids):
+            if track_id in claimed:
+                # Duas caixas no mesmo track: usar uma instância temporária
+                pose = self._checkout()
+                borrowed.append(pose)
+            else:
+                pose = self._by_track.get(track_id)
+                if pose is None:
+                    pose = self._by_track[track_id] = self._checkout()
+                claimed.add(track_id)
+
+            region = self.crop_region(box, width, height)
+            futures.append(self.executor.submit(
+                self._process_crop, pose, rgb_frame, region))
+
+        try:
+            return [future.result() for future in futures]
+        finally:
+            for pose in borrowed:
+                self._checkin(pose)
+
+    def release_missing(self, active_ids):
+        """Devolve ao pool as instâncias de tracks que já não existem"""
+        active_ids = set(active_ids)
+        for track_id in list(self._by_track):
+            if track_id not in active_ids:
+                self._checkin(self._by_track.pop(track_id))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for pose in list(self._by_track.values()) + self._free:
+            pose.close()
+        self._by_track.clear()
+        self._free.clear()
@@ -0,0 +1,301 @@
+import time
+from collections import deque
+
+from config import MODEL_SETTINGS, POSE_SETTINGS, QUALITY_SETTINGS
+from .backends import MODEL_TIERS
+from .metrics import QUALITY_CHANGES, QUALITY_STEP
+from .store import record_event
+
+KNOBS = ('IMGSZ', 'TIER', 'POSE_COMPLEXITY', 'DETECTION_FPS')
+# Etapas de `FallDetector.last_timings` que somam o custo de um frame
+COST_STAGES = ('motion', 'detect', 'pose', 'is_falling', 'rules')
+
+
+class QualityController:
+    """Troca qualidade por velocidade para manter o FPS/latência alvo
+
+    Alimentado com as durações de cada frame analisado, baixa um degrau
+    de um knob quando o custo médio passa o orçamento (1 / TARGET_FPS) ou
+    a latência passa MAX_LATENCY durante DEGRADE_SECONDS: o tamanho de
+    entrada e o tier do YOLO se a deteção domina, a complexidade da pose
+    se for a pose. Desfaz os degraus pela ordem inversa quando o custo
+    previsto no degrau de cima (pelo ganho medido ao descer) fica com
+    folga durante UPGRADE_SECONDS. Cada mudança é seguida de COOLDOWN
+    segundos sem decisões.
+
+    O ritmo de deteção não baixa o custo de um frame, só quantos frames
+    se analisam: é julgado à parte pela fração de CPU (custo x frames
+    analisados por segundo) face a MAX_CPU_SHARE.
+
+    O degrau 0 de cada knob é o valor configurado; nunca se sobe acima.
+    """
+
+    def __init__(self, detector, camera_id=None, settings=None,
+                 detection_fps=0):
+        self.detector = detector
+        self.camera_id = camera_id
+        self.settings = dict(QUALITY_SETTINGS, **(settings or {}))
+        self.detection_fps = detection_fps
+        self._configured_fps = detection_fps
+        self.steps = None
+        self.index = dict.fromkeys(KNOBS, 0)
+        self.decisions = deque(maxlen=self.settings['HISTORY'])
+        # Degraus descidos: (knob, custo antes, custo depois)
+        self._stack = []
+        self._pending_tier = None
+        self.cost = None
+        self.latency = None
+        self.rate = None
+        self._last_frame = None
+        self._stage_cost = {'yolo': 0.0, 'pose': 0.0}
+        self._settle_until = 0.0
+        self._settled_at = 0.0
+        self._over_since = None
+        self._under_since = None
+        self._rate_over_since = None
+        self._rate_under_since = None
+
+        for knob in KNOBS:
+            QUALITY_STEP.track(lambda knob=knob: self.index[knob],
+                               camera=camera_id, knob=knob.lower())
+
+    @property
+    def budget(self):
+        return 1.0 / self.settings['TARGET_FPS']
+
+    def _build_steps(self):
+        """Valores de cada knob, do configurado ao mais barato"""
+        settings = self.settings
+        imgsz = MODEL_SETTINGS['IMGSZ']
+        tier = self.detector.tier
+        complexity = POSE_SETTINGS['MODEL_COMPLEXITY']
+        fps = self._configured_fps
+        steps = {
+            'IMGSZ': [imgsz] + [size for size in settings['IMGSZ_STEPS']
+                                if size < imgsz],
+            'TIER': [tier] + [t for t in settings['TIERS']
+                              if MODEL_TIERS.index(t) <
+                              MODEL_TIERS.index(tier)],
+            'POSE_COMPLEXITY': list(range(complexity, -1, -1)),
+            'DETECTION_FPS': [fps] + [f for f in settings['DETECTION_FPS_STEPS']
+                                      if f and (not fps or f < fps)]
+        }
+        # Grafos exportados com tamanho fixo e modelos partilhados não mudam
+        if not self.detector.can_resize:
+            steps['IMGSZ'] = steps['IMGSZ'][:1]
+        if not self.detector.can_switch_tier:
+            steps['TIER'] = steps['TIER'][:1]
+        return steps
+
+    def level(self):
+        """Valor atual de cada knob"""
+        if self.steps is None:
+            return {}
+        return {knob.lower(): self.steps[knob][self.index[knob]]
+                for knob in KNOBS}
+
+    def update(self, timings, latency, now=None):
+        """Regista um frame analisado; retorna a decisão tomada ou None"""
+        if 'detect' not in timings:
+            # Frame reaproveitado pelo filtro de movimento: não mede nada
+            return None
+        now = time.time() if now is None else now
+        if self.steps is None:
+            self.steps = self._build_steps()
+        interval = (now - self._last_frame if self._last_frame is not None
+                    else None)
+        self._last_frame = now
+        if self._pending_tier is not None:
+            if self.detector.switching_tier:
+                self._settle_until = now + self.settings['COOLDOWN']
+                return None
+            self._check_tier()
+        if now < self._settle_until:
+            return None
+
+        cost = sum(timings.get(stage, 0.0) for stage in COST_STAGES)
+        alpha = self.settings['SMOOTHING']
+        if self.cost is None:
+            self.cost, self.latency = cost, latency
+            self._settled_at = now
+        else:
+            self.cost += alpha * (cost - self.cost)
+            self.latency += alpha * (latency - self.latency)
+        if interval:
+            self.rate = 1.0 / interval if self.rate is None else \
+                self.rate + alpha * (1.0 / interval - self.rate)
+        for stage in self._stage_cost:
+            self._stage_cost[stage] += alpha * (
+                timings.get(stage, 0.0) - self._stage_cost[stage])
+        # Ganho do último degrau, medido quando a média estabiliza e nas
+        # mesmas condições de carga
+        if self._stack and self._stack[-1][2] is None and \
+                now - self._settled_at >= self.settings['DEGRADE_SECONDS']:
+            self._stack[-1][2] = self.cost
+
+        decision = self._check_rate(now)
+        if decision is not None:
+            return decision
+
+        degrade = 1 + self.settings['DEGRADE_MARGIN']
+        if self.cost > self.budget * degrade or \
+                self.latency > self.settings['MAX_LATENCY'] * degrade:
+            self._under_since = None
+            if self._over_since is None:
+                self._over_since = now
+            if now - self._over_since >= self.settings['DEGRADE_SECONDS']:
+                return self._degrade(now)
+            return None
+
+        self._over_since = None
+        if self._slack():
+            if self._under_since is None:
+                self._under_since = now
+            if now - self._under_since >= self.settings['UPGRADE_SECONDS']:
+                return self._upgrade(now)
+        else:
+            self._under_since = None
+        return None
+
+    def cpu_share(self):
+        """Fração de um núcleo gasta a analisar frames (custo x ritmo)"""
+        if self.cost is None or self.rate is None:
+            return None
+        return min(self.cost * self.rate, 1.0)
+
+    def _check_rate(self, now):
+        """Baixa ou sobe o ritmo de deteção pela fração de CPU"""
+        share = self.cpu_share()
+        if share is None:
+            return None
+        steps = self.steps['DETECTION_FPS']
+        index = self.index['DETECTION_FPS']
+        limit = self.settings['MAX_CPU_SHARE']
+        if share > limit * (1 + self.settings['DEGRADE_MARGIN']) and \
+                index + 1 < len(steps):
+            self._rate_under_since = None
+            if self._rate_over_since is None:
+                self._rate_over_since = now
+            if now - self._rate_over_since >= \
+                    self.settings['DEGRADE_SECONDS']:
+                return self._set('DETECTION_FPS', index + 1, 'down', now)
+            return None
+        self._rate_over_since = None
+
+        if index == 0:
+            return None
+        # Ritmo de cima (0 = sem limite: até um núcleo inteiro)
+        faster = steps[index - 1]
+        predicted = min(self.cost * faster, 1.0) if faster else 1.0
+        if predicted < limit * (1 - self.settings['UPGRADE_MARGIN']):
+            if self._rate_under_since is None:
+                self._rate_under_since = now
+            if now - self._rate_under_since >= \
+                    self.settings['UPGRADE_SECONDS']:
+                return self._set('DETECTION_FPS', index - 1, 'up', now)
+        else:
+            self._rate_under_since = None
+        return None
+
+    def _slack(self):
+        """O degrau de cima caberia no orçamento com folga?"""
+        if not self._stack or self._stack[-1][2] is None:
+            return False
+        _, before, after = self._stack[-1]
+        ratio = before / after if after else 1.0
+        upgrade = 1 - self.settings['UPGRADE_MARGIN']
+        return (self.cost * ratio < self.budget * upgrade and
+                self.latency * ratio < self.settings['MAX_LATENCY'] * upgrade)
+
+    def _next_knob(self):
+        """Knob a baixar: o que atua sobre a etapa mais cara primeiro"""
+        if self._stage_cost['pose'] > self._stage_cost['yolo']:
+            order = ('POSE_COMPLEXITY', 'IMGSZ', 'TIER')
+        else:
+            order = ('IMGSZ', 'TIER', 'POSE_COMPLEXITY')
+        for knob in order:
+            if self.index[knob] + 1 < len(self.steps[knob]):
+                return knob
+        return None
+
+    def _degrade(self, now):
+        knob = self._next_knob()
+        if knob is None:
+            # Já no degrau mais barato de todos os knobs
+            self._over_since = None
+            return None
+        self._stack.append([knob, self.cost, None])
+        return self._set(knob, self.index[knob] + 1, 'down', now)
+
+    def _upgrade(self, now):
+        knob = self._stack.pop()[0]
+        return self._set(knob, self.index[knob] - 1, 'up', now)
+
+    def _set(self, knob, index, direction, now):
+        previous = self.steps[knob][self.index[knob]]
+        value = self.steps[knob][index]
+        self.index[knob] = index
+        self._apply(knob, value)
+        if knob == 'TIER':
+            # O modelo novo carrega em segundo plano
+            self._pending_tier = (value, direction)
+
+        decision = {
+            'time': now,
+            'knob': knob.lower(),
+            'from': previous,
+            'to': value,
+            'direction': direction,
+            'cost_ms': round(self.cost * 1000, 1),
+            'latency_ms': round(self.latency * 1000, 1)
+        }
+        self.decisions.append(decision)
+        message = (f"{knob.lower()} {previous} -> {value} "
+                   f"(cost {decision['cost_ms']:.0f} ms, "
+                   f"latency {decision['latency_ms']:.0f} ms)")
+        print(f"Camera {self.camera_id} quality {direction}: {message}")
+        record_event('quality', self.camera_id, message=message,
+                     value=self.cost)
+        QUALITY_CHANGES.inc(camera=self.camera_id, knob=knob.lower(),
+                            direction=direction)
+
+        # Nova média depois de a mudança fazer efeito
+        self.cost = self.latency = self.rate = None
+        self._over_since = self._under_since = None
+        self._rate_over_since = self._rate_under_since = None
+        self._settle_until = now + self.settings['COOLDOWN']
+        return decision
+
+    def _apply(self, knob, value):
+        if knob == 'IMGSZ':
+            self.detector.imgsz = value
+        elif knob == 'TIER':
+            self.detector.switch_tier(value)
+        elif knob == 'POSE_COMPLEXITY':
+            self.detector.pose_estimator.set_complexity(value)
+        else:
+            self.detection_fps = value
+
+    def _check_tier(self):
+        """Fim da troca de tier; se o modelo não carregou, esquece o tier"""
+        (wanted, direction), self._pending_tier = self._pending_tier, None
+        if self.detector.tier == wanted:
+            return
+        tiers = self.steps['TIER']
+        tiers.remove(wanted)
+        self.index['TIER'] = tiers.index(self.detector.tier)
+        if direction == 'down':
+            self._stack.pop()
+
+    def stats(self):
+        return {
+            'level': self.level(),
+            'budget_ms': round(self.budget * 1000, 1),
+            'cost_ms': (round(self.cost * 1000, 1)
+                        if self.cost is not None else None),
+            'latency_ms': (round(self.latency * 1000, 1)
+                           if self.latency is not None else None),
+            'cpu_share': (round(self.cpu_share(), 2)
+                          if self.cpu_share() is not None else None),
+            'decisions': list(self.decisions)[-5:]
+        }
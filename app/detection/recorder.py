@@ -0,0 +1,196 @@
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from config import CAMERA_SETTINGS, RECORDING_SETTINGS
+from ..config import VIDEO_CODEC, VIDEO_DIR, VIDEO_FPS, VIDEO_OUTPUT
+from .metrics import QUEUE_DEPTH
+from .store import record_event
+
+
+def run_clip_writer(jobs):
+    """Processo de escrita: descodifica os JPEG e grava cada clip
+
+    Alvo mínimo do processo filho: importar este módulo não cria a app,
+    não carrega modelos nem arranca threads (o ponto de entrada só cria a
+    app em `__main__`), pelo que o processo fica com o OpenCV e pouco mais.
+    """
+    import cv2
+    import numpy as np
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        path, fps, frames = job
+        writer = None
+        try:
+            for jpeg in frames:
+                frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8),
+                                     cv2.IMREAD_COLOR)
+                if frame is None:
+                    continue
+                if writer is None:
+                    height, width = frame.shape[:2]
+                    writer = cv2.VideoWriter(
+                        path, cv2.VideoWriter_fourcc(*VIDEO_CODEC), fps,
+                        (width, height))
+                writer.write(frame)
+            print(f"Clip saved: {path} ({len(frames)} frames)")
+        except Exception as e:
+            print(f"Error writing clip {path}: {e}")
+        finally:
+            if writer is not None:
+                writer.release()
+
+
+class ClipWriter:
+    """Processo filho partilhado pelas câmeras do processo atual"""
+
+    def __init__(self):
+        ctx = mp.get_context(CAMERA_SETTINGS['START_METHOD'])
+        self.jobs = ctx.Queue(maxsize=RECORDING_SETTINGS['MAX_PENDING_CLIPS'])
+        self.process = ctx.Process(target=run_clip_writer, args=(self.jobs,),
+                                   name='clip-writer', daemon=True)
+        self.process.start()
+        QUEUE_DEPTH.track(self.jobs.qsize, queue='clips')
+
+    def submit(self, path, fps, frames):
+        """Não bloqueia: a serialização para o processo corre noutra thread"""
+        try:
+            self.jobs.put_nowait((path, fps, frames))
+            return True
+        except queue.Full:
+            print(f"Clip writer busy, dropping {path}")
+            return False
+
+    def stop(self, timeout=10):
+        """Grava os clips pendentes e termina o processo"""
+        try:
+            self.jobs.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_clip_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.process.is_alive():
+            _writer = ClipWriter()
+        return _writer
+
+
+def stop_clip_writer(timeout=10):
+    """Termina o processo de escrita, se existir, sem perder clips"""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop(timeout)
+
+
+class ClipRecorder:
+    """Anel de frames JPEG de uma câmera para clips antes/depois da queda
+
+    Guarda os JPEG já codificados para o stream (sem nova codificação nem
+    cópia), amostrados a no máximo MAX_FPS, limitados a PRE_SECONDS e a
+    MAX_MB por câmera. `trigger` marca o instante da queda; ao fim de
+    POST_SECONDS o clip completo é entregue ao processo de escrita.
+    """
+
+    def __init__(self, camera_id, settings=None):
+        self.camera_id = camera_id
+        self.settings = dict(RECORDING_SETTINGS, **(settings or {}))
+        self.max_fps = self.settings['MAX_FPS'] or VIDEO_FPS
+        self.max_bytes = int(self.settings['MAX_MB'] * 1024 * 1024)
+        self._ring = deque(maxlen=int(self.settings['PRE_SECONDS'] *
+                                      self.max_fps))
+        self._ring_bytes = 0
+        self._last_time = 0.0
+        self._clip = None
+        self._lock = threading.Lock()
+        self.clips = 0
+
+    @property
+    def enabled(self):
+        return self.settings['ENABLED']
+
+    def add(self, timestamp, jpeg):
+        """Chamado pela thread de saída com cada frame publicado"""
+        if timestamp - self._last_time < 1.0 / self.max_fps:
+            return
+        self._last_time = timestamp
+
+        with self._lock:
+            if len(self._ring) == self._ring.maxlen:
+                self._ring_bytes -= len(self._ring[0][1])
+            self._ring.append((timestamp, jpeg))
+            self._ring_bytes += len(jpeg)
+            while self._ring_bytes > self.max_bytes and len(self._ring) > 1:
+                self._ring_bytes -= len(self._ring.popleft()[1])
+
+            clip = self._clip
+            if clip is None:
+                return
+            clip['frames'].append((timestamp, jpeg))
+            if timestamp < clip['until']:
+                return
+            self._clip = None
+        self._submit(clip)
+
+    def trigger(self, person_id=None):
+        """Queda confirmada: congela o anel e continua a gravar POST_SECONDS"""
+        with self._lock:
+            if self._clip is not None:
+                # Quedas durante um clip em curso ficam no mesmo clip
+                self._clip['people'].add(person_id)
+                return
+            now = time.time()
+            self._clip = {
+                'started': now,
+                'until': now + self.settings['POST_SECONDS'],
+                'people': {person_id},
+                'frames': list(self._ring)
+            }
+
+    def _submit(self, clip):
+        frames = clip['frames']
+        if len(frames) < 2:
+            return
+        duration = frames[-1][0] - frames[0][0]
+        # FPS real da amostragem, para o clip durar o mesmo que a cena
+        fps = min(self.max_fps, (len(frames) - 1) / duration) \
+            if duration > 0 else self.max_fps
+        stamp = time.strftime('%Y%m%d-%H%M%S',
+                              time.localtime(clip['started']))
+        os.makedirs(VIDEO_DIR, exist_ok=True)
+        path = os.path.join(VIDEO_DIR,
+                            f"{self.camera_id}_{stamp}_{VIDEO_OUTPUT}")
+        if get_clip_writer().submit(path, fps,
+                                    [jpeg for _, jpeg in frames]):
+            self.clips += 1
+            people = ', '.join(str(p) for p in sorted(
+                clip['people'], key=str) if p is not None)
+            record_event('clip', self.camera_id, message=path,
+                         value=round(duration, 1))
+            print(f"Clip queued for camera {self.camera_id} "
+                  f"(people: {people or '-'}): {path}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'frames': len(self._ring),
+                'bytes': self._ring_bytes,
+                'recording': self._clip is not None,
+                'clips': self.clips
+            }
@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+
+# Cor (BGR) de cada estado de queda
+STATE_COLORS = {
+    'monitoring': (0, 255, 0),
+    'possible_fall': (0, 255, 255),
+    'fallen': (0, 0, 255)
+}
+FURNITURE_COLOR = (255, 255, 0)
+
+
+def draw_overlay(image, result):
+    """Desenha um `DetectionResult` diretamente em `image`
+
+    Cada móvel é desenhado uma vez, mesmo que esteja perto de várias
+    pessoas; as pessoas ficam por cima dos móveis.
+    """
+    for box, kind in result.furniture:
+        cv2.rectangle(image, box[:2], box[2:], FURNITURE_COLOR, 1)
+        cv2.putText(image, kind, (box[0], box[1] - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, FURNITURE_COLOR, 1)
+    for track in result.tracks:
+        color = STATE_COLORS[track.state]
+        x1, y1 = track.box[:2]
+        cv2.rectangle(image, track.box[:2], track.box[2:], color, 2)
+        cv2.putText(image, track.label, (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
+    if not result.people:
+        cv2.putText(image, "No people detected", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, STATE_COLORS['monitoring'],
+                    2)
+    return image
+
+
+class OverlayRenderer:
+    """Sobrepõe o último resultado a cada frame num buffer pré-alocado
+
+    O frame capturado nunca é alterado (o detector, o gravador e outros
+    consumidores veem sempre a imagem original) e não há uma alocação
+    nova por frame. O buffer devolvido só é válido até à chamada seguinte.
+    """
+
+    def __init__(self):
+        self._buffer = None
+
+    def render(self, frame, result):
+        if self._buffer is None or self._buffer.shape != frame.shape:
+            self._buffer = np.empty_like(frame)
+        np.copyto(self._buffer, frame)
+        return draw_overlay(self._buffer, result)
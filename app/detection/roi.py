@@ -0,0 +1,62 @@
+import numpy as np
+from config import ROI_SETTINGS
+from .backends import empty_detections
+
+
+def plan_regions(boxes, width, height, settings=None):
+    """Recortes à volta das caixas seguidas, com margem e fundidos
+
+    Recortes que se sobrepõem são unidos, para que a mesma pessoa não
+    seja detetada duas vezes. Retorna uma lista de (x1, y1, x2, y2)
+    inteiros, ou None quando os recortes cobrem quase todo o frame e uma
+    passagem completa sai mais barata.
+    """
+    settings = dict(ROI_SETTINGS, **(settings or {}))
+    padding = settings['PADDING']
+    min_size = settings['MIN_SIZE']
+
+    regions = []
+    for x1, y1, x2, y2 in boxes:
+        pad_x = max((x2 - x1) * padding, (min_size - (x2 - x1)) / 2)
+        pad_y = max((y2 - y1) * padding, (min_size - (y2 - y1)) / 2)
+        regions.append([int(max(0, x1 - pad_x)), int(max(0, y1 - pad_y)),
+                        int(min(width, x2 + pad_x)),
+                        int(min(height, y2 + pad_y))])
+
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                a, b = regions[i], regions[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    regions[i] = [min(a[0], b[0]), min(a[1], b[1]),
+                                  max(a[2], b[2]), max(a[3], b[3])]
+                    del regions[j]
+                    merged = True
+                    break
+            if merged:
+                break
+
+    regions = [tuple(r) for r in regions if r[2] > r[0] and r[3] > r[1]]
+    area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions)
+    if not regions or area > settings['MAX_COVERAGE'] * width * height:
+        return None
+    return regions
+
+
+def detect_regions(model, frame, regions, imgsz=None):
+    """Deteta todos os recortes numa única passagem em lote
+
+    As caixas voltam a coordenadas do frame e são concatenadas como se
+    viessem de uma inferência sobre o frame inteiro.
+    """
+    crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in regions]
+    results = model.predict_batch(crops, imgsz)
+    empty_boxes, empty_conf, empty_cls = empty_detections()
+    boxes, confs, classes = [empty_boxes], [empty_conf], [empty_cls]
+    for (x1, y1, _, _), (xyxy, conf, cls) in zip(regions, results):
+        boxes.append(xyxy + np.array([x1, y1, x1, y1], dtype=np.float32))
+        confs.append(conf)
+        classes.append(cls)
+    return np.concatenate(boxes), np.concatenate(confs), np.concatenate(classes)
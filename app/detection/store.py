@@ -0,0 +1,338 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque, namedtuple
+
+from config import CAMERA_SETTINGS, STORE_SETTINGS
+from .metrics import QUEUE_DEPTH
+
+Event = namedtuple('Event', 'time camera_id type person_id message value id')
+
+EVENT_TYPES = ('fall', 'recovery', 'alert', 'fps', 'clip', 'quality')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time REAL NOT NULL,
+    camera_id TEXT,
+    type TEXT NOT NULL,
+    person_id INTEGER,
+    message TEXT,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS events_time ON events (time);
+CREATE INDEX IF NOT EXISTS events_camera_type_time
+    ON events (camera_id, type, time);
+CREATE TABLE IF NOT EXISTS hourly (
+    hour INTEGER NOT NULL,
+    camera_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    value_sum REAL NOT NULL,
+    PRIMARY KEY (hour, camera_id, type)
+) WITHOUT ROWID;
+"""
+
+
+class EventStore:
+    """Eventos de deteção: anel em memória + SQLite com índice temporal
+
+    `record` só acrescenta ao anel e à fila de escrita (não bloqueia a
+    deteção); uma thread grava em lotes numa única transação e mantém os
+    totais por hora em `hourly`, para que "deteções por hora nas últimas
+    24h" leia no máximo 24 linhas por câmera pela chave primária. A
+    retenção apaga eventos antigos e, mais tarde, os totais por hora.
+    """
+
+    def __init__(self, path=None, settings=None, single_writer=None):
+        self.settings = dict(STORE_SETTINGS, **(settings or {}))
+        self.path = path or self.settings['PATH']
+        # Com um único processo a escrever, o anel contém todos os eventos
+        # recentes e pode responder sozinho à primeira página de consultas
+        if single_writer is None:
+            single_writer = CAMERA_SETTINGS['MODE'] != 'processes'
+        self.single_writer = single_writer
+
+        self._ring = deque(maxlen=self.settings['RING_SIZE'])
+        self._ring_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=self.settings['QUEUE_SIZE'])
+        self.dropped = 0
+        QUEUE_DEPTH.track(self._queue.qsize, queue='store')
+
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False,
+                                   timeout=10)
+        self._db_lock = threading.Lock()
+        with self._db_lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.executescript(SCHEMA)
+        # Os ids são dados já no `record` (os eventos do anel servem de
+        # cursor antes de gravados), de um bloco reservado por este processo
+        self._next_id = self._id_limit = 0
+        self._last_compact = 0.0
+
+        self._thread = threading.Thread(
+            target=self._run, name='event-store', daemon=True)
+        self._thread.start()
+
+    def record(self, type, camera_id=None, person_id=None, message=None,
+               value=None):
+        with self._ring_lock:
+            if self._next_id >= self._id_limit:
+                self._reserve_ids()
+            self._next_id += 1
+            event_id = self._next_id
+            event = Event(time.time(), camera_id, type, person_id, message,
+                          value, event_id)
+            self._ring.append(event)
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+        return event
+
+    def _reserve_ids(self):
+        """Reserva os próximos ID_BLOCK ids da tabela para este processo
+
+        Vários processos (câmeras, scripts) gravam na mesma base: cada bloco
+        é tirado da sequência do AUTOINCREMENT numa transação exclusiva, pelo
+        que dois processos nunca dão o mesmo id (e os ids que o SQLite atribui
+        sozinho ficam acima de todos os blocos).
+        """
+        block = self.settings['ID_BLOCK']
+        with self._db_lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._db.execute(
+                    "SELECT seq FROM sqlite_sequence WHERE name = 'events'"
+                ).fetchone()
+                top = self._db.execute(
+                    'SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+                start = max(row[0] if row else 0, top)
+                if row:
+                    self._db.execute(
+                        "UPDATE sqlite_sequence SET seq = ? "
+                        "WHERE name = 'events'", (start + block,))
+                else:
+                    self._db.execute(
+                        "INSERT INTO sqlite_sequence (name, seq) "
+                        "VALUES ('events', ?)", (start + block,))
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+        self._next_id, self._id_limit = start, start + block
+
+    def _run(self):
+        interval = self.settings['FLUSH_INTERVAL']
+        while True:
+            try:
+                batch = [self._queue.get(timeout=interval)]
+            except queue.Empty:
+                batch = []
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self._write(batch)
+                if time.time() - self._last_compact > \
+                        self.settings['COMPACT_INTERVAL']:
+                    self.compact()
+            except sqlite3.Error as e:
+                print(f"Event store write failed: {e}")
+
+    def _write(self, events):
+        with self._db_lock, self._db:
+            self._db.executemany(
+                'INSERT INTO events (time, camera_id, type, person_id, '
+                'message, value, id) VALUES (?, ?, ?, ?, ?, ?, ?)', events)
+            self._db.executemany(
+                'INSERT INTO hourly VALUES (?, ?, ?, 1, ?) '
+                'ON CONFLICT (hour, camera_id, type) DO UPDATE SET '
+                'count = count + 1, value_sum = value_sum + excluded.value_sum',
+                [(int(e.time // 3600), e.camera_id or '', e.type,
+                  e.value or 0.0) for e in events])
+
+    def compact(self, now=None):
+        """Aplica a política de retenção"""
+        now = now or time.time()
+        day = 24 * 3600
+        with self._db_lock, self._db:
+            self._db.execute(
+                "DELETE FROM events WHERE time < ?",
+                (now - self.settings['RETENTION_DAYS'] * day,))
+            # Amostras de FPS ficam só nos totais por hora
+            self._db.execute(
+                "DELETE FROM events WHERE type = 'fps' AND time < ?",
+                (now - self.settings['FPS_RETENTION_HOURS'] * 3600,))
+            self._db.execute(
+                "DELETE FROM hourly WHERE hour < ?",
+                (int((now - self.settings['HOURLY_RETENTION_DAYS'] * day)
+                     // 3600),))
+        self._last_compact = now
+
+    def _from_ring(self, camera_id, types, since, limit):
+        """Primeira página a partir do anel, se este a cobrir por completo"""
+        if not self.single_writer:
+            return None
+        with self._ring_lock:
+            ring = list(self._ring)
+        matches = []
+        for event in reversed(ring):
+            if since is not None and event.time < since:
+                return matches
+            if ((camera_id is None or event.camera_id == camera_id) and
+                    (types is None or event.type in types)):
+                matches.append(event)
+                if len(matches) == limit:
+                    return matches
+        # Anel esgotado: só completo se nada mais antigo foi descartado
+        if len(ring) < self._ring.maxlen and not self._has_older(ring):
+            return matches
+        return None
+
+    def _has_older(self, ring):
+        oldest = ring[0].time if ring else time.time()
+        with self._db_lock:
+            row = self._db.execute(
+                'SELECT 1 FROM events WHERE time < ? LIMIT 1',
+                (oldest,)).fetchone()
+        return row is not None
+
+    def query(self, camera_id=None, types=None, since=None, until=None,
+              cursor=None, limit=50):
+        """Eventos do mais recente para o mais antigo, paginados
+
+        `cursor` é o 'next_cursor' da página anterior: o (instante, id) do
+        último evento, em texto (ver `parse_cursor`). O id desempata os
+        eventos com o mesmo instante (rajadas de várias câmeras ou escritos
+        no mesmo lote), que assim nunca são saltados entre páginas.
+        Retorna {'events': [...], 'next_cursor': texto|None}.
+        """
+        limit = max(1, min(int(limit), self.settings['MAX_PAGE_SIZE']))
+        if isinstance(cursor, str):
+            cursor = parse_cursor(cursor)
+        events = None
+        if cursor is None and until is None:
+            events = self._from_ring(camera_id, types, since, limit)
+
+        if events is None:
+            clauses, params = [], []
+            if camera_id is not None:
+                clauses.append('camera_id = ?')
+                params.append(camera_id)
+            if types:
+                clauses.append(f"type IN ({', '.join('?' * len(types))})")
+                params.extend(types)
+            if since is not None:
+                clauses.append('time >= ?')
+                params.append(since)
+            if until is not None:
+                clauses.append('time < ?')
+                params.append(until)
+            if cursor is not None:
+                clauses.append('(time < ? OR (time = ? AND id < ?))')
+                params.extend([cursor[0], cursor[0], cursor[1]])
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+            with self._db_lock:
+                rows = self._db.execute(
+                    'SELECT time, camera_id, type, person_id, message, value, '
+                    f'id FROM events {where} ORDER BY time DESC, id DESC '
+                    'LIMIT ?', params + [limit]).fetchall()
+            events = [Event(*row) for row in rows]
+
+        next_cursor = None
+        if len(events) == limit:
+            next_cursor = format_cursor(events[-1].time, events[-1].id)
+        return {
+            'events': [e._asdict() for e in events],
+            'next_cursor': next_cursor
+        }
+
+    def per_hour(self, type, hours=24, camera_id=None, now=None):
+        """Contagem e média de valor por hora, incluindo horas vazias"""
+        now = now or time.time()
+        last_hour = int(now // 3600)
+        first_hour = last_hour - hours + 1
+        params = [first_hour, type]
+        camera_clause = ''
+        if camera_id is not None:
+            camera_clause = 'AND camera_id = ?'
+            params.append(camera_id)
+        with self._db_lock:
+            rows = self._db.execute(
+                'SELECT hour, SUM(count), SUM(value_sum) FROM hourly '
+                f'WHERE hour >= ? AND type = ? {camera_clause} '
+                'GROUP BY hour', params).fetchall()
+        totals = {hour: (count, value_sum) for hour, count, value_sum in rows}
+
+        result = []
+        for hour in range(first_hour, last_hour + 1):
+            count, value_sum = totals.get(hour, (0, 0.0))
+            result.append({
+                'hour': time.strftime('%H:00', time.localtime(hour * 3600)),
+                'count': count,
+                'mean': round(value_sum / count, 2) if count else None
+            })
+        return result
+
+    def count_since(self, type, since, camera_id=None):
+        """Total de eventos desde `since`
+
+        As horas completas vêm dos totais por hora; a fração da primeira
+        hora (de `since` até à hora seguinte) é contada nos eventos, pelo
+        que só entram eventos a partir de `since`. Se essa hora já saiu da
+        retenção de eventos, essa fração fica por contar.
+        """
+        first_hour = -int(-since // 3600)
+        camera_clause = ''
+        camera_params = []
+        if camera_id is not None:
+            camera_clause = 'AND camera_id = ?'
+            camera_params.append(camera_id)
+        with self._db_lock:
+            hourly = self._db.execute(
+                'SELECT COALESCE(SUM(count), 0) FROM hourly '
+                f'WHERE hour >= ? AND type = ? {camera_clause}',
+                [first_hour, type] + camera_params).fetchone()[0]
+            partial = self._db.execute(
+                'SELECT COUNT(*) FROM events WHERE time >= ? AND time < ? '
+                f'AND type = ? {camera_clause}',
+                [since, first_hour * 3600, type] + camera_params).fetchone()[0]
+        return hourly + partial
+
+
+def format_cursor(time, event_id):
+    """Cursor de paginação opaco: instante e id do último evento"""
+    return f"{time!r}:{event_id}"
+
+
+def parse_cursor(cursor):
+    """(instante, id) de um cursor de `format_cursor`; ValueError se inválido"""
+    time, _, event_id = cursor.rpartition(':')
+    return float(time), int(event_id)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_event_store():
+    """Store do processo (a base SQLite é partilhada entre processos)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EventStore()
+        return _store
+
+
+def record_event(type, camera_id=None, person_id=None, message=None,
+                 value=None):
+    return get_event_store().record(type, camera_id, person_id, message,
+                                    value)
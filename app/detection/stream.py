@@ -0,0 +1,468 @@
+import threading
+import time
+from collections import Counter, deque
+
+import numpy as np
+from config import (QUALITY_SETTINGS, STORE_SETTINGS, STREAM_SETTINGS,
+                    VIDEO_SETTINGS, VIDEO_SOURCE)
+from .cameras import (DEFAULT_CAMERA_ID, default_camera_id,
+                      get_camera_config)
+from .encoding import StreamFrame, encode_default_tier
+from .metrics import (CAMERA_FPS, CLIENTS, DROPPED_FRAMES, FRAMES,
+                      PIPELINE_ERRORS, observe_stage)
+from .quality import QualityController
+from .recorder import ClipRecorder
+from .render import OverlayRenderer
+from .store import record_event
+from .utils import FallDetector, get_fall_detector
+from .video import FrameGrabber, create_source
+
+
+def _rate(timestamps):
+    """Frequência média (Hz) de uma janela de instantes"""
+    if len(timestamps) < 2 or timestamps[-1] <= timestamps[0]:
+        return 0.0
+    return (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+
+
+def mjpeg_part(jpeg):
+    """Uma parte do stream multipart/x-mixed-replace"""
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+
+
+class FrameSlot:
+    """Slot com o frame mais recente partilhado por vários clientes MJPEG
+
+    Os clientes esperam pelo próximo número de sequência e saltam os
+    frames que perderam (drop-to-latest): um cliente numa ligação lenta
+    fica bloqueado a escrever e recebe apenas os frames que consegue
+    consumir. Cada frame guarda os JPEG por tier (`StreamFrame`), para
+    que clientes com o mesmo tier partilhem uma única codificação.
+    """
+
+    def __init__(self, camera_id=None):
+        self.camera_id = camera_id
+        self._condition = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._running = False
+        self.clients = 0
+        # Clientes ligados por tier (os tiers pedidos são codificados à saída)
+        self._tier_clients = Counter()
+        # Frames que clientes lentos saltaram (drop-to-latest)
+        self.client_dropped = 0
+        # Frames saltados por clientes com limite de FPS (?fps=)
+        self.client_throttled = 0
+
+    def track_metrics(self, camera_id):
+        """Expõe clientes e frames saltados deste slot em /metrics"""
+        CLIENTS.track(lambda: self.clients, camera=camera_id)
+        DROPPED_FRAMES.track(lambda: self.client_dropped, camera=camera_id,
+                             reason='clients')
+        DROPPED_FRAMES.track(lambda: self.client_throttled, camera=camera_id,
+                             reason='throttled')
+
+    def start(self):
+        with self._condition:
+            self._running = True
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+    def publish(self, jpeg, image=None):
+        """Substitui o frame mais recente e acorda os clientes
+
+        `jpeg` é o tier por omissão; com `image` (o frame desenhado), os
+        outros tiers com clientes são codificados já, sem descodificar o
+        JPEG. A imagem não é guardada: pode ser um buffer reutilizado.
+        """
+        frame = StreamFrame(jpeg, image, self.camera_id)
+        if image is not None:
+            # Cópia com o lock: add_client/remove_client alteram o Counter
+            with self._condition:
+                tiers = [tier for tier, count in self._tier_clients.items()
+                         if count]
+            for tier in tiers:
+                frame.jpeg(tier)
+            frame.release_image()
+        with self._condition:
+            self._frame = frame
+            self._seq += 1
+            self._condition.notify_all()
+
+    @property
+    def running(self):
+        return self._running
+
+    def wait_for_frame(self, last_seq=0, timeout=5.0):
+        """Bloqueia até existir um frame mais recente que `last_seq`
+
+        Retorna (seq, frame); frame (`StreamFrame`) é None se expirar o
+        timeout.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._seq > last_seq or not self._running, timeout)
+            if self._seq > last_seq:
+                return self._seq, self._frame
+            return last_seq, None
+
+    def add_client(self, tier=None):
+        """Regista um cliente do stream; retorna o tier efetivo"""
+        self.start()
+        tier = tier or STREAM_SETTINGS['DEFAULT_TIER']
+        with self._condition:
+            self.clients += 1
+            self._tier_clients[tier] += 1
+        return tier
+
+    def remove_client(self, tier):
+        with self._condition:
+            self.clients -= 1
+            self._tier_clients[tier] -= 1
+
+    def count_skipped(self, skipped, throttled=False):
+        """Frames que um cliente não recebeu (lento ou com limite de FPS)"""
+        if throttled:
+            self.client_throttled += skipped
+        else:
+            self.client_dropped += skipped
+
+    def frames(self, tier=None, max_fps=None):
+        """Gerador MJPEG de um cliente, sempre com o frame mais recente
+
+        `tier` escolhe resolução/qualidade (STREAM_SETTINGS['TIERS']) e
+        `max_fps` limita o ritmo de envio deste cliente.
+        """
+        tier = self.add_client(tier)
+        interval = 1.0 / max_fps if max_fps else 0.0
+        try:
+            seq = 0
+            next_send = 0.0
+            while self._running:
+                if interval:
+                    wait = next_send - time.time()
+                    if wait > 0:
+                        time.sleep(wait)
+                new_seq, frame = self.wait_for_frame(seq)
+                if frame is None:
+                    continue
+                if seq:
+                    self.count_skipped(new_seq - seq - 1, bool(interval))
+                seq = new_seq
+                jpeg = frame.jpeg(tier)
+                if jpeg is None:
+                    continue
+                next_send = time.time() + interval
+                yield mjpeg_part(jpeg)
+        finally:
+            self.remove_client(tier)
+
+
+class FrameBroadcaster(FrameSlot):
+    """Pipeline único por câmera partilhado por todos os clientes MJPEG
+
+    Três estágios desacoplados:
+      * um `FrameGrabber` que guarda apenas o frame mais recente;
+      * uma thread de inferência que deteta sobre o frame mais recente ao
+        ritmo que o hardware aguentar (ou `DETECTION_FPS`);
+      * uma thread de saída que desenha o último resultado conhecido sobre
+        cada frame capturado, codifica-o uma vez e publica-o num slot.
+        O gravador recebe sempre o frame original, codificado à parte do
+        frame desenhado para os clientes. Sem clientes a ver o stream nada
+        é desenhado e, sem gravador, nem sequer é codificado; câmeras com
+        `overlay=False` nunca desenham e usam um só JPEG para ambos.
+    Os clientes leem do slot e saltam os frames que perderam, pelo que um
+    browser lento nunca atrasa a deteção e o número de clientes não altera
+    a carga de CPU.
+    """
+
+    def __init__(self, camera_id=DEFAULT_CAMERA_ID, source=VIDEO_SOURCE,
+                 capture_factory=None, detector=None, detection_fps=None,
+                 reconnect_delay=1.0, recording=None, overlay=True,
+                 quality=None, capture=None):
+        super().__init__(camera_id)
+        self.source = source
+        # Fábrica de `VideoSource`; `capture` substitui CAPTURE_SETTINGS
+        self.capture_factory = capture_factory or (
+            lambda: create_source(source, capture))
+        self.detector = detector or get_fall_detector()
+        if detection_fps is None:
+            detection_fps = VIDEO_SETTINGS.get('DETECTION_FPS', 0)
+        self.detection_fps = detection_fps
+        self.reconnect_delay = reconnect_delay
+        self.overlay = overlay
+        self.renderer = OverlayRenderer()
+        # Controlo adaptativo de qualidade (tamanho, tier, pose, ritmo)
+        quality = dict(QUALITY_SETTINGS, **(quality or {}))
+        self.quality = (QualityController(self.detector, camera_id, quality,
+                                          detection_fps)
+                        if quality['ENABLED'] else None)
+
+        # Anel de JPEG para o clip de cada queda confirmada
+        self.recorder = ClipRecorder(camera_id, recording)
+        if self.recorder.enabled:
+            self.detector.fall_listeners.append(self.recorder.trigger)
+
+        self._threads = []
+        self._grabber = None
+
+        # Estatísticas do pipeline
+        self.skipped_frames = 0
+        self.inference_errors = 0
+        self.output_errors = 0
+        self._capture_times = deque(maxlen=100)
+        self._detection_times = deque(maxlen=100)
+        # Frames reaproveitados pelo filtro de movimento (sem modelos)
+        self._gated_times = deque(maxlen=100)
+        self._latencies = deque(maxlen=100)
+
+        self.track_metrics(camera_id)
+        CAMERA_FPS.track(lambda: _rate(list(self._capture_times)),
+                         camera=camera_id, kind='capture')
+        CAMERA_FPS.track(lambda: _rate(list(self._detection_times)),
+                         camera=camera_id, kind='detection')
+        CAMERA_FPS.track(lambda: _rate(list(self._gated_times)),
+                         camera=camera_id, kind='gated')
+        DROPPED_FRAMES.track(lambda: self.skipped_frames, camera=camera_id,
+                             reason='detector')
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._threads = [
+                threading.Thread(target=self._run, daemon=True,
+                                 name=f'broadcaster-{self.camera_id}'),
+                threading.Thread(target=self._infer, daemon=True,
+                                 name=f'inference-{self.camera_id}')
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self):
+        super().stop()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def watched(self):
+        """Há clientes a ver o stream (e portanto a ver as anotações)"""
+        return self.clients > 0
+
+    def _open(self):
+        try:
+            return self.capture_factory()
+        except Exception as e:
+            print(f"Camera {self.camera_id} unavailable: {e}")
+            return None
+
+    def _run(self):
+        """Saída: anota cada frame capturado com os últimos tracks"""
+        grabber = None
+        seq = 0
+        failures = 0
+        try:
+            while self._running:
+                if grabber is None:
+                    source = self._open()
+                    if source is None:
+                        time.sleep(self.reconnect_delay)
+                        continue
+                    # O grabber abre a fonte e reconecta-a com backoff
+                    grabber = self._grabber = FrameGrabber(
+                        source, self.camera_id)
+                    seq = 0
+
+                seq, frame, timestamp = grabber.read(seq)
+                if frame is None:
+                    if grabber.failed:
+                        # Fonte terminada: o stream mantém o último frame
+                        time.sleep(self.reconnect_delay)
+                    continue
+
+                self._capture_times.append(timestamp)
+                FRAMES.inc(camera=self.camera_id, step='captured')
+                try:
+                    self._output(frame, timestamp)
+                except Exception as e:
+                    # Codificação, desenho ou gravação a falhar não podem
+                    # parar o stream de uma câmera que continua a capturar
+                    failures += 1
+                    self.output_errors += 1
+                    self._backoff('output', e, failures)
+                    continue
+                failures = 0
+        finally:
+            self._grabber = None
+            if grabber is not None:
+                grabber.release()
+
+    def _output(self, frame, timestamp):
+        """Desenha, codifica, grava e publica um frame capturado"""
+        watched = self.watched()
+        if not watched and not self.recorder.enabled:
+            return
+        draw = watched and self.overlay
+        # O gravador guarda sempre o frame original; sem anotações o mesmo
+        # JPEG serve o stream
+        raw = None
+        if self.recorder.enabled or not draw:
+            raw = self._encode(frame)
+            if raw is not None and self.recorder.enabled:
+                self.recorder.add(timestamp, raw)
+        if draw:
+            start = time.perf_counter()
+            image = self.renderer.render(frame, self.detector.last_result)
+            observe_stage(self.camera_id, 'draw', time.perf_counter() - start)
+            jpeg = self._encode(image)
+        else:
+            image, jpeg = frame, raw
+        if jpeg is not None:
+            self.publish(jpeg, image)
+
+    def _backoff(self, stage, error, failures):
+        """Conta e regista uma exceção e espera antes de tentar de novo"""
+        PIPELINE_ERRORS.inc(camera=self.camera_id, stage=stage)
+        delay = min(0.1 * 2 ** (failures - 1), 5.0)
+        print(f"Error in {stage} on camera {self.camera_id}: {error!r} "
+              f"(retrying in {delay:.1f}s)")
+        time.sleep(delay)
+
+    def _encode(self, image):
+        start = time.perf_counter()
+        jpeg = encode_default_tier(image)
+        observe_stage(self.camera_id, 'encode', time.perf_counter() - start)
+        return jpeg
+
+    def _infer(self):
+        """Inferência: deteta sempre sobre o frame mais recente"""
+        grabber = None
+        seq = 0
+        last_start = 0.0
+        last_sample = time.time()
+        failures = 0
+        while self._running:
+            if self._grabber is not grabber:
+                grabber, seq = self._grabber, 0
+            if grabber is None:
+                time.sleep(0.05)
+                continue
+
+            # Respeitar a taxa alvo, se configurada (ou imposta pelo
+            # controlo de qualidade)
+            detection_fps = (self.quality.detection_fps if self.quality
+                             else self.detection_fps)
+            if detection_fps:
+                wait = last_start + 1.0 / detection_fps - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+
+            new_seq, frame, timestamp = grabber.read(seq, timeout=1.0)
+            if frame is None:
+                continue
+            if seq:
+                self.skipped_frames += new_seq - seq - 1
+            seq = new_seq
+
+            last_start = time.time()
+            try:
+                self._detect(frame, timestamp)
+            except Exception as e:
+                # Um frame que rebenta o detector não pode parar a thread:
+                # o stream e o estado continuariam a parecer vivos
+                failures += 1
+                self.inference_errors += 1
+                self._backoff('inference', e, failures)
+                continue
+            failures = 0
+
+            # Amostra periódica de FPS para o histórico por hora
+            if last_start - last_sample >= \
+                    STORE_SETTINGS['FPS_SAMPLE_INTERVAL']:
+                last_sample = last_start
+                record_event('fps', self.camera_id,
+                             value=_rate(list(self._detection_times)))
+
+    def _detect(self, frame, timestamp):
+        # O detector não altera o frame: dispensa a cópia
+        self.detector.detect_fall(frame)
+        decided = time.time()
+
+        # Latência ponta a ponta: captura -> decisão de alerta. Só os frames
+        # que correram os modelos contam para o FPS de deteção
+        analysed = 'detect' in self.detector.last_timings
+        if analysed:
+            self._detection_times.append(decided)
+        else:
+            self._gated_times.append(decided)
+        self._latencies.append(decided - timestamp)
+        FRAMES.inc(camera=self.camera_id,
+                   step='detected' if analysed else 'gated')
+        observe_stage(self.camera_id, 'end_to_end', decided - timestamp)
+        if self.quality is not None:
+            self.quality.update(self.detector.last_timings,
+                                decided - timestamp, decided)
+
+    def status(self):
+        """Estado de queda das pessoas seguidas nesta câmera"""
+        # Lido do snapshot publicado pelo detector, sem tocar nos tracks
+        return dict(self.detector.get_status(), camera_id=self.camera_id)
+
+    def stats(self):
+        """Taxas de captura/deteção e latência captura -> decisão (ms)"""
+        latencies = np.array(self._latencies) * 1000
+        latency = {'last': None, 'mean': None, 'p95': None}
+        if len(latencies):
+            latency = {
+                'last': round(float(latencies[-1]), 1),
+                'mean': round(float(latencies.mean()), 1),
+                'p95': round(float(np.percentile(latencies, 95)), 1)
+            }
+        return {
+            'camera_id': self.camera_id,
+            'clients': self.clients,
+            'capture_fps': round(_rate(list(self._capture_times)), 1),
+            'detection_fps': round(_rate(list(self._detection_times)), 1),
+            'gated_fps': round(_rate(list(self._gated_times)), 1),
+            'skipped_frames': self.skipped_frames,
+            'inference_errors': self.inference_errors,
+            'output_errors': self.output_errors,
+            'client_dropped': self.client_dropped,
+            'client_throttled': self.client_throttled,
+            'latency_ms': latency,
+            'source': self._grabber.stats() if self._grabber else None,
+            'recording': self.recorder.stats(),
+            'quality': self.quality.stats() if self.quality else None
+        }
+
+
+_broadcasters = {}
+_broadcasters_lock = threading.Lock()
+
+
+def get_broadcaster(camera_id=None):
+    """Retorna o broadcaster (no processo atual) de uma câmera registada
+
+    A câmera por omissão usa o detector partilhado; as restantes têm o seu
+    próprio FallDetector, para que os tracks de câmeras diferentes nunca
+    se misturem.
+    """
+    camera = get_camera_config(camera_id)
+    with _broadcasters_lock:
+        broadcaster = _broadcasters.get(camera['ID'])
+        if broadcaster is None:
+            detector = (get_fall_detector()
+                        if camera['ID'] == default_camera_id()
+                        else FallDetector(camera['ID']))
+            broadcaster = _broadcasters[camera['ID']] = FrameBroadcaster(
+                camera['ID'], camera['SOURCE'], detector=detector,
+                detection_fps=camera.get('DETECTION_FPS'),
+                recording=camera.get('RECORDING'),
+                overlay=camera.get('OVERLAY', True),
+                quality=camera.get('QUALITY'),
+                capture=camera.get('CAPTURE'))
+        return broadcaster
@@ -0,0 +1,353 @@
+import atexit
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+from config import CAMERA_SETTINGS
+from .backends import create_shared_backend
+from .cameras import get_cameras
+from .events import get_event_bus
+from .metrics import REGISTRY
+from .recorder import stop_clip_writer
+from .stream import FrameBroadcaster, FrameSlot
+from .utils import empty_snapshot, status_dict
+
+
+class SharedFrameSlot:
+    """JPEG mais recente de uma câmera em memória partilhada
+
+    O processo da câmera escreve; o processo web lê sem copiar frames por
+    pipes. Um contador de sequência indica quando há um frame novo.
+    """
+
+    def __init__(self, ctx, size):
+        self.size = size
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.seq = ctx.Value('Q', 0, lock=False)
+        self.length = ctx.Value('Q', 0, lock=False)
+        # Clientes MJPEG no processo web (sem clientes não se desenha)
+        self.viewers = ctx.Value('I', 0, lock=False)
+        self.lock = ctx.Lock()
+        self._warned = False
+
+    def write(self, jpeg):
+        n = len(jpeg)
+        if n > self.size:
+            if not self._warned:
+                print(f"Frame of {n} bytes exceeds shared slot "
+                      f"({self.size} bytes), dropping")
+                self._warned = True
+            return
+        with self.lock:
+            self.shm.buf[:n] = jpeg
+            self.length.value = n
+            self.seq.value += 1
+
+    def read(self, last_seq, timeout=0.5):
+        """Retorna (seq, jpeg) se houver frame mais recente que `last_seq`
+
+        Se o lock não for obtido em `timeout` segundos (o processo pode ter
+        morrido a segurá-lo), retorna (last_seq, None) sem bloquear quem lê.
+        """
+        if self.seq.value == last_seq:
+            return last_seq, None
+        if not self.lock.acquire(timeout=timeout):
+            return last_seq, None
+        try:
+            seq = self.seq.value
+            jpeg = bytes(self.shm.buf[:self.length.value])
+        finally:
+            self.lock.release()
+        return seq, jpeg
+
+    def close(self, unlink=False):
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class SlotBroadcaster(FrameBroadcaster):
+    """Broadcaster do processo da câmera que publica no slot partilhado"""
+
+    def __init__(self, slot, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.slot = slot
+
+    def watched(self):
+        return self.slot.viewers.value > 0
+
+    def publish(self, jpeg, image=None):
+        self.slot.write(jpeg)
+
+
+def run_camera_worker(camera, slot, status_queue, stop_flag, interval,
+                      model=None):
+    """Ponto de entrada do processo de uma câmera
+
+    `model` é o backend carregado pelo supervisor, com os pesos em memória
+    partilhada; sem ele, o processo carrega a sua própria cópia. O processo
+    não é daemon (pode ter o seu processo de escrita de clips): termina
+    com `stop_flag` ou quando o processo web desaparece.
+    """
+    from .utils import FallDetector
+
+    def forward_event(event, data):
+        # Eventos do detector seguem pela fila de estado até ao processo web
+        try:
+            status_queue.put_nowait({'event': event, 'data': data})
+        except queue.Full:
+            pass
+
+    detector = FallDetector(camera['ID'], model=model)
+    detector.load_models()
+    get_event_bus().subscribe(forward_event)
+    broadcaster = SlotBroadcaster(
+        slot, camera['ID'], camera['SOURCE'], detector=detector,
+        detection_fps=camera.get('DETECTION_FPS'),
+        recording=camera.get('RECORDING'),
+        overlay=camera.get('OVERLAY', True),
+        quality=camera.get('QUALITY'),
+        capture=camera.get('CAPTURE'))
+    broadcaster.start()
+    print(f"Camera {camera['ID']} running in process {os.getpid()}")
+
+    parent = mp.parent_process()
+    try:
+        while not stop_flag.value and parent.is_alive():
+            time.sleep(interval)
+            try:
+                status_queue.put_nowait({
+                    'status': broadcaster.status(),
+                    'stats': broadcaster.stats(),
+                    'metrics': REGISTRY.snapshot(),
+                    'time': time.time()
+                })
+            except queue.Full:
+                pass
+    finally:
+        broadcaster.stop()
+        # Clips em curso são gravados antes de o processo sair
+        stop_clip_writer()
+        slot.close()
+
+
+class RemoteCamera(FrameSlot):
+    """Câmera a correr num processo filho, vista do processo web
+
+    Uma thread de relay copia os frames do slot partilhado para o slot
+    local (servido aos clientes MJPEG), recolhe o estado enviado pelo
+    processo e reinicia-o com backoff exponencial se morrer.
+    """
+
+    def __init__(self, camera, ctx, settings, model=None):
+        super().__init__(camera['ID'])
+        self.camera = camera
+        self.ctx = ctx
+        self.settings = settings
+        self.model = model
+        self.slot = SharedFrameSlot(ctx, settings['MAX_JPEG_BYTES'])
+        self.status_queue = ctx.Queue(maxsize=16)
+        # Flag simples em vez de Event: um processo morto com SIGKILL a
+        # meio de um wait() bloquearia Event.set() para sempre
+        self.stop_flag = ctx.Value('b', 0, lock=False)
+        self.process = None
+        self.restarts = 0
+        self._relay = None
+        self._backoff = settings['RESTART_BACKOFF']
+        self._next_start = 0.0
+        self._last_message = {}
+        self.track_metrics(self.camera_id)
+
+    def launch(self):
+        """Arranca o processo da câmera e a thread de relay (supervisor)"""
+        with self._condition:
+            if self._relay is not None:
+                return
+            self._running = True
+        self._spawn()
+        self._relay = threading.Thread(
+            target=self._run_relay, name=f'relay-{self.camera_id}',
+            daemon=True)
+        self._relay.start()
+
+    def _spawn(self, restart=False):
+        if restart:
+            # O processo anterior pode ter morrido a segurar o lock do slot
+            # ou da fila: recriá-los em vez de herdar esse estado
+            self.slot.lock = self.ctx.Lock()
+            self.status_queue = self.ctx.Queue(maxsize=16)
+        # Não daemon: processos daemon não podem criar o processo de
+        # escrita de clips. `stop` (também em atexit) termina-o
+        self.process = self.ctx.Process(
+            target=run_camera_worker,
+            args=(self.camera, self.slot, self.status_queue, self.stop_flag,
+                  self.settings['STATUS_INTERVAL'], self.model),
+            name=f'camera-{self.camera_id}')
+        self.process.start()
+
+    def _check_process(self):
+        if self.process.is_alive():
+            return
+        now = time.time()
+        if not self._next_start:
+            print(f"Camera {self.camera_id} process exited "
+                  f"(code {self.process.exitcode}), restarting in "
+                  f"{self._backoff:.0f}s")
+            self._next_start = now + self._backoff
+            self._backoff = min(self._backoff * 2,
+                                self.settings['MAX_RESTART_BACKOFF'])
+        elif now >= self._next_start:
+            self._next_start = 0.0
+            self.restarts += 1
+            self._spawn(restart=True)
+
+    def _run_relay(self):
+        seq = 0
+        while self._running:
+            self.slot.viewers.value = self.clients
+            seq, jpeg = self.slot.read(seq)
+            if jpeg is not None:
+                self.publish(jpeg)
+
+            try:
+                while True:
+                    message = self.status_queue.get_nowait()
+                    # Processo saudável: repor o backoff
+                    self._backoff = self.settings['RESTART_BACKOFF']
+                    if 'event' in message:
+                        get_event_bus().publish(message['event'],
+                                                message['data'])
+                    else:
+                        self._last_message = message
+            except queue.Empty:
+                pass
+
+            self._check_process()
+            if jpeg is None:
+                time.sleep(0.005)
+
+    def stop(self):
+        super().stop()
+        self.stop_flag.value = 1
+        if self._relay is not None:
+            self._relay.join(timeout=2)
+        if self.process is not None:
+            self.process.join(timeout=self.settings['STOP_TIMEOUT'])
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout=1)
+        self.slot.close(unlink=True)
+
+    def metrics_snapshot(self):
+        """Métricas do processo da câmera (enviadas com o estado)"""
+        return self._last_message.get('metrics') or {}
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    @property
+    def ready(self):
+        # O processo só envia estado depois de carregar os modelos
+        return self.alive and bool(self._last_message)
+
+    def status(self):
+        status = self._last_message.get('status') or status_dict(
+            empty_snapshot(self.camera_id))
+        return dict(status, camera_id=self.camera_id, alive=self.alive)
+
+    def stats(self):
+        stats = dict(self._last_message.get('stats') or {},
+                     camera_id=self.camera_id)
+        stats.update({
+            'clients': self.clients,
+            'client_dropped': self.client_dropped,
+            'client_throttled': self.client_throttled,
+            'pid': self.process.pid if self.process else None,
+            'alive': self.alive,
+            'restarts': self.restarts
+        })
+        return stats
+
+
+def load_shared_model():
+    try:
+        start = time.time()
+        model = create_shared_backend()
+    except Exception as e:
+        print(f"Could not load shared model weights, each camera process "
+              f"will load its own: {e}")
+        return None
+    if model is not None:
+        print(f"Shared model weights loaded in {time.time() - start:.1f}s")
+    return model
+
+
+class CameraSupervisor:
+    """Um processo de deteção por câmera registada"""
+
+    def __init__(self, cameras=None, settings=None):
+        self.settings = dict(CAMERA_SETTINGS, **(settings or {}))
+        self.ctx = mp.get_context(self.settings['START_METHOD'])
+        cameras = cameras if cameras is not None else get_cameras()
+        # Pesos do YOLO carregados uma vez em `start_all` e mapeados por
+        # todos os processos das câmeras (None = cada processo carrega os
+        # seus)
+        self.model = None
+        self.cameras = {
+            camera_id: RemoteCamera(camera, self.ctx, self.settings)
+            for camera_id, camera in cameras.items()
+        }
+        self._stopped = False
+        self._starter = None
+
+    def get(self, camera_id):
+        return self.cameras[camera_id]
+
+    def metrics_snapshots(self):
+        return [camera.metrics_snapshot() for camera in self.cameras.values()]
+
+    def start_all(self):
+        """Carrega os pesos partilhados e arranca as câmeras numa thread
+
+        O processo web serve pedidos enquanto o modelo carrega; até lá as
+        câmeras não estão prontas (/ready) e os clientes esperam frames.
+        """
+        self._starter = threading.Thread(
+            target=self._start_all, name='camera-supervisor', daemon=True)
+        self._starter.start()
+
+    def _start_all(self):
+        if self.cameras:
+            self.model = load_shared_model()
+        for camera in self.cameras.values():
+            if self._stopped:
+                return
+            camera.model = self.model
+            camera.launch()
+
+    def stop(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        for camera in self.cameras.values():
+            camera.stop()
+
+
+_supervisor = None
+_supervisor_lock = threading.Lock()
+
+
+def get_supervisor():
+    """Supervisor partilhado; arranca todas as câmeras na primeira chamada"""
+    global _supervisor
+    with _supervisor_lock:
+        if _supervisor is None:
+            _supervisor = CameraSupervisor()
+            _supervisor.start_all()
+            # Os processos das câmeras não são daemon: pará-los à saída
+            atexit.register(_supervisor.stop)
+        return _supervisor
@@ -0,0 +1,158 @@
+import time
+
+import numpy as np
+from config import TRACKER_SETTINGS
+from .features import LandmarkHistory
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy é opcional: usa-se associação gulosa
+    linear_sum_assignment = None
+
+
+class Track:
+    """Estado compacto de uma pessoa seguida entre frames"""
+
+    __slots__ = ('track_id', 'box', 'position', 'first_seen', 'last_seen',
+                 'fall_start_time', 'is_fallen', 'history', 'alert_sent',
+                 'on_ground')
+
+    def __init__(self, track_id, box, position, now):
+        self.track_id = track_id
+        self.box = box
+        self.position = position
+        self.first_seen = now
+        self.last_seen = now
+        self.fall_start_time = None
+        self.is_fallen = False
+        # Landmarks dos últimos frames analisados (velocidade da queda)
+        self.history = LandmarkHistory()
+        self.alert_sent = False
+        # Último resultado de is_falling (None sem pose)
+        self.on_ground = None
+
+
+def box_iou(boxes_a, boxes_b):
+    """Matriz de IoU (len(a), len(b)) entre caixas xyxy"""
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) -
+                      np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) -
+                      np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def greedy_assignment(cost):
+    """Associação gulosa pelo menor custo; cada linha/coluna usada uma vez"""
+    flat_cost = cost.ravel()
+    finite = np.flatnonzero(np.isfinite(flat_cost))
+    order = finite[np.argsort(flat_cost[finite], kind='stable')]
+    candidate_rows, candidate_cols = np.divmod(order, cost.shape[1])
+
+    rows, cols = [], []
+    used_rows, used_cols = set(), set()
+    limit = min(cost.shape)
+    for r, c in zip(candidate_rows.tolist(), candidate_cols.tolist()):
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        rows.append(r)
+        cols.append(c)
+        if len(rows) == limit:
+            break
+    return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+
+
+class Tracker:
+    """Tracker multi-pessoa com associação única por frame
+
+    O custo caixa->track combina (1 - IoU) com a distância entre centros
+    normalizados; pares acima de `MAX_DISTANCE` são proibidos. A associação
+    é resolvida pelo algoritmo húngaro (scipy) ou de forma gulosa, e os IDs
+    vêm de um contador monótono, pelo que nunca são reutilizados.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = dict(TRACKER_SETTINGS, **(settings or {}))
+        self.tracks = {}
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def clear(self):
+        self.tracks.clear()
+
+    def expire(self, now):
+        """Remove tracks não vistos há mais de `TIMEOUT` segundos"""
+        timeout = self.settings['TIMEOUT']
+        expired = [tid for tid, track in self.tracks.items()
+                   if now - track.last_seen >= timeout]
+        for tid in expired:
+            del self.tracks[tid]
+        return expired
+
+    def cost_matrix(self, boxes, centers, track_boxes, track_centers):
+        distance = np.linalg.norm(
+            centers[:, None, :] - track_centers[None, :, :], axis=2)
+        cost = (self.settings['IOU_WEIGHT'] *
+                (1.0 - box_iou(boxes, track_boxes)) +
+                self.settings['DISTANCE_WEIGHT'] * distance)
+        cost[distance >= self.settings['MAX_DISTANCE']] = np.inf
+        return cost
+
+    def assign(self, cost):
+        if cost.size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        if (self.settings['MATCHING'] == 'hungarian' and
+                linear_sum_assignment is not None):
+            # O húngaro não aceita infinitos: usar um custo proibitivo
+            finite = np.where(np.isfinite(cost), cost, 1e6)
+            rows, cols = linear_sum_assignment(finite)
+            valid = np.isfinite(cost[rows, cols])
+            return rows[valid], cols[valid]
+        return greedy_assignment(cost)
+
+    def update(self, boxes, frame_width, frame_height, now=None):
+        """Associa as caixas do frame aos tracks e retorna os IDs por caixa"""
+        now = time.time() if now is None else now
+        self.expire(now)
+
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        if len(boxes) == 0:
+            return []
+
+        scale = np.array([frame_width, frame_height], dtype=np.float32)
+        centers = (boxes[:, :2] + boxes[:, 2:]) / (2 * scale)
+
+        track_ids = list(self.tracks)
+        ids = [None] * len(boxes)
+        if track_ids:
+            track_boxes = np.stack([self.tracks[t].box for t in track_ids])
+            track_centers = np.array(
+                [self.tracks[t].position for t in track_ids], dtype=np.float32)
+            rows, cols = self.assign(self.cost_matrix(
+                boxes, centers, track_boxes, track_centers))
+            for r, c in zip(rows, cols):
+                track = self.tracks[track_ids[c]]
+                track.box = boxes[r]
+                track.position = tuple(centers[r])
+                track.last_seen = now
+                ids[r] = track.track_id
+
+        # Caixas sem track: novos IDs do contador monótono
+        for i, track_id in enumerate(ids):
+            if track_id is None:
+                track_id = self._next_id
+                self._next_id += 1
+                self.tracks[track_id] = Track(
+                    track_id, boxes[i], tuple(centers[i]), now)
+                ids[i] = track_id
+
+        return ids
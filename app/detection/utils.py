@@ -1,33 +1,73 @@
-import cv2
-import mediapipe as mp
 import numpy as np
 from .alert import send_alert
-from config import FALL_DETECTION_SETTINGS
-from datetime import datetime, timedelta
+from .backends import SharedBackend, create_backend, get_shared_backend
+from .batching import get_inference_server
+from .cameras import default_camera_id
+from .events import get_event_bus
+from .features import (furniture_features, pack_landmarks, previous_nose,
+                       score_falls)
+from .metrics import (DETECTION_PASSES, MOTION_GATE, SAVED_SECONDS,
+                      observe_stage)
+from .motion import MotionGate
+from .store import record_event
+from .pose import PoseEstimator
+from .render import draw_overlay
+from .roi import detect_regions, plan_regions
+from .tracker import Tracker
+from config import (FALL_DETECTION_SETTINGS, INFERENCE_SETTINGS,
+                    MODEL_SETTINGS, MOTION_SETTINGS, ROI_SETTINGS)
+import threading
 import time
-from ultralytics import YOLO
+from collections import deque, namedtuple
 
 
 class FallDetector:
-    def __init__(self):
-        self.people_tracking = {}  # Dicionário para rastrear cada pessoa
-        self.track_timeout = 30
+    def __init__(self, camera_id=None, live=True, model=None):
+        self.camera_id = camera_id
+        # live=False (avaliação offline): sem alertas, registo nem push
+        self.live = live
+        self.tracker = Tracker()
+        # Tracks ativos por ID (estado de cada pessoa)
+        self.people_tracking = self.tracker.tracks
         self.immobility_duration = 5.0  # 5 segundos para confirmar queda
-        self.fps_history = []
-        self.last_frame_time = time.time()
-        self.detections_history = []
-
-        # Inicializar modelos
-        print("Initializing models...")
-        self.model = YOLO("yolo11x.pt")
-        self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            enable_segmentation=False,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        # Resultado do último frame analisado (desenhado por render.py)
+        self.last_result = EMPTY_RESULT
+        # Estado publicado no último frame: imutável e trocado de uma só vez,
+        # lido por /status, /system_stats e push sem tocar nos tracks
+        self.snapshot = empty_snapshot(camera_id)
+        self._last_states = {}
+        self._frame_times = deque(maxlen=30)
+        self._last_alert = None
+        # Chamados com o ID da pessoa quando uma queda é confirmada
+        self.fall_listeners = []
+        # Duração (s) de cada etapa no último frame analisado
+        self.last_timings = {}
+
+        # Filtro de movimento: frames sem mudanças não correm os modelos
+        self.motion_gate = (MotionGate() if MOTION_SETTINGS['ENABLED']
+                            else None)
+        self._full_cost = 0.0
+
+        # Modo ROI: entre passagens completas só se deteta à volta dos tracks
+        self._last_full_frame = None
+        # Móveis da última passagem completa (não se mexem entre passagens)
+        self._furniture = (np.zeros((0, 4), dtype=np.float32),
+                           np.zeros(0, dtype=np.int64))
+
+        # Modelos carregados apenas no primeiro frame (ou em warmup);
+        # `model` é um backend já carregado (pesos partilhados entre processos)
+        self.model = None
+        self.shared_model = model
+        self.mp_pose = None
+        self.pose_estimator = None
+        self.load_seconds = None
+        self.load_error = None
+        self._load_lock = threading.Lock()
+        self._warmup_thread = None
+        # Tier e tamanho de entrada do YOLO (alterados pelo QualityController)
+        self.tier = MODEL_SETTINGS['TIER']
+        self.imgsz = None
+        self._tier_thread = None
 
         # Classes de objetos relevantes
         self.furniture_classes = {
@@ -37,296 +77,503 @@ class FallDetector:
             60: 'dining table'
         }
 
-    def get_person_id(self, box_coords, frame_width, frame_height):
-        """Gera um ID único baseado na posição relativa da pessoa"""
-        x1, y1, x2, y2 = box_coords
-        center_x = (x1 + x2) / (2 * frame_width)
-        center_y = (y1 + y2) / (2 * frame_height)
-
-        # Procurar pessoa mais próxima no rastreamento
-        min_dist = float('inf')
-        closest_id = None
-        current_time = time.time()
-
-        # Limpar rastreamentos antigos
-        self.people_tracking = {
-            pid: data for pid, data in self.people_tracking.items()
-            if current_time - data['last_seen'] < self.track_timeout
-        }
-
-        for pid, data in self.people_tracking.items():
-            dist = np.sqrt((center_x - data['position'][0])**2 +
-                           (center_y - data['position'][1])**2)
-            if dist < min_dist and dist < 0.3:  # Threshold de distância
-                min_dist = dist
-                closest_id = pid
-
-        if closest_id is None:
-            closest_id = len(self.people_tracking)
-
-        return closest_id
-
-    def is_falling(self, pose_landmarks, prev_landmarks=None, nearby_furniture=None):
+    @property
+    def is_ready(self):
+        return self.model is not None
+
+    def load_models(self):
+        """Carrega YOLO e MediaPipe na primeira chamada"""
+        if self.model is not None:
+            return
+        with self._load_lock:
+            if self.model is not None:
+                return
+            print("Initializing models...")
+            start = time.time()
+            # Imports pesados (torch, mediapipe) só quando são precisos
+            import mediapipe as mp
+
+            self.mp_pose = mp.solutions.pose
+            self.pose_estimator = PoseEstimator()
+            self.model = self.create_model()
+            self.load_seconds = time.time() - start
+            print(f"Models loaded in {self.load_seconds:.1f}s")
+
+    def create_model(self):
+        """YOLO deste detector, sempre partilhado pelas câmeras
+
+        Os pesos vindos do supervisor (memória partilhada entre processos),
+        o servidor de lotes ou o modelo do processo: N câmeras custam um
+        modelo em qualquer modo.
+        """
+        if self.shared_model is not None:
+            return self.shared_model
+        if INFERENCE_SETTINGS['BATCHING']:
+            return get_inference_server()
+        return get_shared_backend()
+
+    def warmup(self):
+        """Carrega os modelos numa thread em segundo plano"""
+        if self.is_ready or (self._warmup_thread and
+                             self._warmup_thread.is_alive()):
+            return
+
+        def load():
+            try:
+                self.load_models()
+                self.load_error = None
+            except Exception as e:
+                self.load_error = str(e)
+                print(f"Error loading models: {e}")
+
+        self._warmup_thread = threading.Thread(
+            target=load, name='model-warmup', daemon=True)
+        self._warmup_thread.start()
+
+    @property
+    def can_resize(self):
+        """O modelo aceita outro tamanho de entrada por chamada"""
+        model = getattr(self.model, 'backend', self.model)
+        return not getattr(model, 'fixed_size', False)
+
+    @property
+    def can_switch_tier(self):
+        """O YOLO só é usado por este detector e não tem pesos fixos"""
+        return not INFERENCE_SETTINGS['BATCHING'] and \
+            not MODEL_SETTINGS.get('WEIGHTS') and \
+            self.shared_model is None and \
+            getattr(self.model, 'users', 1) == 1
+
+    @property
+    def switching_tier(self):
+        return self._tier_thread is not None and self._tier_thread.is_alive()
+
+    def switch_tier(self, tier):
+        """Carrega o YOLO de outro tier em segundo plano e troca no fim
+
+        O modelo atual continua a servir frames enquanto o novo carrega;
+        se o carregamento falhar, `tier` fica inalterado.
+        """
+        if tier == self.tier or self.switching_tier or \
+                not self.can_switch_tier:
+            # Sem troca (p.ex. o modelo passou a servir outra câmera): o
+            # controlo de qualidade vê o tier inalterado e esquece-o
+            return
+
+        def load():
+            try:
+                model = create_backend({'TIER': tier})
+            except Exception as e:
+                print(f"Error loading detector tier '{tier}': {e}")
+                return
+            if isinstance(self.model, SharedBackend):
+                # Troca no modelo do processo: não fica o antigo carregado
+                self.model.swap(model)
+            else:
+                self.model = model
+            self.tier = tier
+
+        self._tier_thread = threading.Thread(
+            target=load, name=f'tier-{self.camera_id}', daemon=True)
+        self._tier_thread.start()
+
+    def get_status(self):
+        """Resumo do estado das pessoas seguidas (do último snapshot)"""
+        return status_dict(self.snapshot)
+
+    def reset(self):
+        """Esquece todos os tracks (p.ex. entre vídeos na avaliação)"""
+        self.tracker.clear()
+        self._last_states = {}
+        self._frame_times.clear()
+        self._last_alert = None
+        self.snapshot = empty_snapshot(self.camera_id)
+        self.last_result = EMPTY_RESULT
+        self._last_full_frame = None
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        if self.pose_estimator is not None:
+            self.pose_estimator.release_missing({})
+
+    def publish_changes(self, now=None, analysed=True):
+        """Publica o snapshot do frame e os eventos do que mudou
+
+        O snapshot é sempre substituído (uma única atribuição); os
+        eventos são 'fall_state' por transição de queda de um track e
+        'tracks' quando o conjunto de tracks ou os seus estados mudam.
+        O FPS do snapshot conta só os frames analisados (`analysed`), não
+        os reaproveitados pelo filtro de movimento.
+        """
+        now = time.time() if now is None else now
+        states = {person_id: track_state(track)
+                  for person_id, track in self.people_tracking.items()}
+        alert_sent = any(track.alert_sent
+                         for track in self.people_tracking.values())
+        if analysed:
+            self._frame_times.append(now)
+        times = self._frame_times
+        fps = ((len(times) - 1) / (times[-1] - times[0])
+               if len(times) > 1 and times[-1] > times[0] else 0.0)
+        self.snapshot = StatusSnapshot(
+            self.camera_id, now, len(states), 'fallen' in states.values(),
+            alert_sent, tuple(states.items()), round(fps, 1),
+            self._last_alert)
+        if states == self._last_states:
+            return
+
+        bus = get_event_bus() if self.live else None
+        for person_id in states.keys() | self._last_states.keys():
+            previous = self._last_states.get(person_id)
+            state = states.get(person_id)
+            if previous != state and (state in FALL_STATES or
+                                      previous in FALL_STATES):
+                track = self.people_tracking.get(person_id)
+                if state == 'fallen':
+                    for listener in self.fall_listeners:
+                        listener(person_id)
+                if bus is None:
+                    continue
+                if state == 'fallen':
+                    record_event('fall', self.camera_id, person_id,
+                                 f"Person {person_id} has fallen")
+                elif previous == 'fallen' and state == 'monitoring':
+                    record_event('recovery', self.camera_id, person_id,
+                                 f"Person {person_id} recovered")
+                bus.publish('fall_state', {
+                    'camera_id': self.camera_id,
+                    'person_id': person_id,
+                    'state': state or 'lost',
+                    'previous': previous,
+                    'alert_sent': bool(track and track.alert_sent),
+                    'time': now
+                })
+        self._last_states = states
+        if bus is None:
+            return
+        bus.publish('tracks', status_dict(self.snapshot))
+
+    def is_falling(self, pose_landmarks, history=None, nearby_furniture=None,
+                   frame_height=None):
+        """Avalia uma única pessoa; o ciclo de deteção usa `score_falls`"""
         if not pose_landmarks:
             return False, 0
-
-        # Extrair landmarks principais
-        landmarks = {
-            'nose': pose_landmarks.landmark[self.mp_pose.PoseLandmark.NOSE],
-            'left_shoulder': pose_landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_SHOULDER],
-            'right_shoulder': pose_landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_SHOULDER],
-            'left_hip': pose_landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_HIP],
-            'right_hip': pose_landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_HIP],
-            'left_ankle': pose_landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_ANKLE],
-            'right_ankle': pose_landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_ANKLE]
-        }
-
-        # Calcular posições médias
-        mid_shoulder = [(landmarks['left_shoulder'].x + landmarks['right_shoulder'].x)/2,
-                        (landmarks['left_shoulder'].y + landmarks['right_shoulder'].y)/2]
-        mid_hip = [(landmarks['left_hip'].x + landmarks['right_hip'].x)/2,
-                   (landmarks['left_hip'].y + landmarks['right_hip'].y)/2]
-        mid_ankle = [(landmarks['left_ankle'].x + landmarks['right_ankle'].x)/2,
-                     (landmarks['left_ankle'].y + landmarks['right_ankle'].y)/2]
-
-        ground_score = 0
-
-        # Verificar distância do chão
-        body_parts_near_ground = 0
-        for part in ['nose', 'left_shoulder', 'right_shoulder']:
-            if abs(landmarks[part].y - mid_ankle[1]) < 0.3:
-                body_parts_near_ground += 1
-                ground_score += 20
-
-        # Verificar se está em um móvel adequado para deitar/sentar
-        if nearby_furniture:
-            for furniture in nearby_furniture:
-                if furniture['type'] in ['couch', 'bed']:
-                    # Verificar se a pessoa está em posição compatível com o móvel
-                    nose_height = landmarks['nose'].y
-                    hip_height = (
-                        landmarks['left_hip'].y + landmarks['right_hip'].y) / 2
-                    furniture_top = furniture['box'][1] / \
-                        frame_height  # Normalizar altura
-
-                    # Se a pessoa está na altura do móvel
-                    if abs(hip_height - furniture_top) < 0.2:
-                        # Movimento controlado indica ação intencional
-                        if prev_landmarks is not None:
-                            movement = np.linalg.norm(
-                                np.array([landmarks['nose'].y]) - prev_landmarks)
-                            if movement < 0.04:  # Movimento suave
-                                return False, 0  # Não é queda, é deitar/sentar
-                        else:
-                            # Se já está na posição, provavelmente está deitado/sentado
-                            return False, 0
-
-        # Verificar velocidade de queda (apenas se não estiver em móvel)
-        if prev_landmarks is not None:
-            movement = np.linalg.norm(
-                np.array([landmarks['nose'].y]) - prev_landmarks)
-
-            if movement > 0.05:  # Movimento rápido para baixo
-                if not any(f['type'] in ['couch', 'bed'] for f in (nearby_furniture or [])):
-                    ground_score += 35
-
-                    # Verificar se está próximo ao chão após movimento rápido
-                    nose_height = landmarks['nose'].y
-                    ankle_height = mid_ankle[1]
-                    if abs(nose_height - ankle_height) < 0.3:
-                        ground_score += 25
-
-        # Verificar orientação do corpo
-        vertical_alignment = abs(mid_shoulder[1] - mid_hip[1])
-        is_horizontal = vertical_alignment < 0.15
-
-        if is_horizontal:
-            if not nearby_furniture:  # Apenas pontuar se não estiver em móvel
-                ground_score += 30
-
-                # Verificar altura em relação ao chão
-                avg_height = (mid_shoulder[1] + mid_hip[1]) / 2
-                if avg_height - mid_ankle[1] < 0.2:  # Muito próximo ao chão
-                    ground_score += 25
-
-        # Verificar assimetria do corpo (quedas tendem a ser assimétricas)
-        shoulder_asymmetry = abs(
-            landmarks['left_shoulder'].y - landmarks['right_shoulder'].y)
-        hip_asymmetry = abs(landmarks['left_hip'].y - landmarks['right_hip'].y)
-        if shoulder_asymmetry > 0.1 or hip_asymmetry > 0.1:
-            ground_score += 15
-
-        # Critérios mais rigorosos para queda
-        is_fall = (
-            ground_score > 70 and  # Score alto
-            body_parts_near_ground >= 2 and  # Partes próximas ao chão
-            # Não está em móvel
-            not any(f['type'] in ['couch', 'bed'] for f in (nearby_furniture or [])) and
-            # Realmente próximo ao chão
-            abs(landmarks['nose'].y - mid_ankle[1]) < 0.3
-        )
-
-        return is_fall, ground_score
-
-    def detect_fall(self, frame):
+        prev_nose = previous_nose([history] if history is not None else [])
+        rest_tops, has_furniture = furniture_features(
+            [nearby_furniture or []], frame_height or 1)
+        is_fall, score = score_falls(
+            pack_landmarks([pose_landmarks]),
+            prev_nose if len(prev_nose) else None, rest_tops, has_furniture)
+        return bool(is_fall[0]), int(score[0])
+
+    def split_detections(self, detections):
+        """Separa as deteções de uma inferência em pessoas e móveis"""
+        xyxy, conf, cls = detections
+        person_mask = (cls == 0) & (conf > 0.5)
+        furniture_mask = np.isin(cls, list(self.furniture_classes))
+
+        return (xyxy[person_mask], conf[person_mask],
+                xyxy[furniture_mask], cls[furniture_mask])
+
+    def detect_fall(self, frame, now=None):
+        """Analisa um frame; `now` permite reproduzir vídeo no seu relógio
+
+        Não desenha nada no frame: retorna um `DetectionResult` (também em
+        `last_result`) que o `OverlayRenderer` sobrepõe a cada frame.
+        """
         if frame is None:
             return frame
 
+        self.load_models()
+        now = time.time() if now is None else now
+        timings = {}
+
+        # Cena parada: reaproveitar deteções em vez de correr YOLO e pose
+        gate = None
+        if self.motion_gate is not None:
+            start = time.perf_counter()
+            gate = self.motion_gate.check(frame, now) or 'skipped'
+            timings['motion'] = time.perf_counter() - start
+            if gate == 'skipped':
+                result = self.reuse_detections(now)
+                self.finish_frame(timings, gate)
+                return result
+
+        frame_start = time.perf_counter()
+        start = frame_start
         height, width = frame.shape[:2]
-        results = self.model(frame)
-        people_detected = False  # Flag para indicar se alguma pessoa foi detectada
-
-        if len(results) > 0:
-            boxes = results[0].boxes
-            for box in boxes:
-                if box.cls.cpu().numpy()[0] == 0:  # pessoa
-                    conf = box.conf.cpu().numpy()[0]
-                    if conf > 0.5:
-                        people_detected = True  # Pessoa detectada com confiança suficiente
-                        x1, y1, x2, y2 = map(int, box.xyxy.cpu().numpy()[0])
-
-                        # Identificar pessoa
-                        person_id = self.get_person_id(
-                            (x1, y1, x2, y2), width, height)
-
-                        # Inicializar dados da pessoa se não existirem
-                        if person_id not in self.people_tracking:
-                            self.people_tracking[person_id] = {
-                                'position': ((x1 + x2)/(2*width), (y1 + y2)/(2*height)),
-                                'last_seen': time.time(),
-                                'fall_start_time': None,
-                                'is_fallen': False,
-                                'prev_nose_pos': None,
-                                'alert_sent': False
-                            }
-
-                        person_data = self.people_tracking[person_id]
-
-                        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        pose_results = self.pose.process(rgb_frame)
-
-                        if pose_results.pose_landmarks:
-                            current_nose_pos = np.array([
-                                pose_results.pose_landmarks.landmark[
-                                    self.mp_pose.PoseLandmark.NOSE].y
-                            ])
-
-                            # Detectar móveis próximos
-                            nearby_furniture = self.detect_furniture(
-                                frame, (x1, y1, x2, y2))
-
-                            is_on_ground, ground_score = self.is_falling(
-                                pose_results.pose_landmarks,
-                                person_data.get('prev_nose_pos'),
-                                nearby_furniture
-                            )
-
-                            current_time = time.time()
-                            if is_on_ground:
-                                if not person_data['fall_start_time']:
-                                    person_data['fall_start_time'] = current_time
-                                    status_text = f"Person {
-                                        person_id}: Possible fall..."
-                                    box_color = (0, 255, 255)
-                                else:
-                                    immobility_time = current_time - \
-                                        person_data['fall_start_time']
-                                    if immobility_time >= self.immobility_duration:
-                                        if not person_data['is_fallen']:
-                                            person_data['is_fallen'] = True
-                                            if not person_data['alert_sent']:
-                                                self.detections_history.append(
-                                                    datetime.now())
-                                                send_alert(
-                                                    f"Person {person_id} has fallen!")
-                                                person_data['alert_sent'] = True
-
-                                        status_text = f"Person {person_id}: FALLEN! {
-                                            int(immobility_time)}s"
-                                        box_color = (0, 0, 255)
-                                    else:
-                                        status_text = f"Person {person_id}: Analyzing... {
-                                            int(immobility_time)}s"
-                                        box_color = (0, 255, 255)
-                            else:
-                                person_data['fall_start_time'] = None
-                                person_data['is_fallen'] = False
-                                person_data['alert_sent'] = False
-                                status_text = f"Person {person_id}: Monitoring"
-                                box_color = (0, 255, 0)
-
-                            # Atualizar dados de rastreamento
-                            person_data.update({
-                                'prev_nose_pos': current_nose_pos,
-                                'last_seen': current_time
-                            })
-
-                            # Desenhar retângulo e texto
-                            cv2.rectangle(frame, (x1, y1),
-                                          (x2, y2), box_color, 2)
-                            cv2.putText(frame, status_text, (x1, y1-10),
-                                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, box_color, 2)
-
-                            # Opcional: Visualizar móveis detectados
-                            for furniture in nearby_furniture:
-                                fx1, fy1, fx2, fy2 = furniture['box']
-                                cv2.rectangle(frame, (fx1, fy1),
-                                              (fx2, fy2), (255, 255, 0), 1)
-                                cv2.putText(frame, furniture['type'], (fx1, fy1-5),
-                                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+        regions = self.roi_regions(now, width, height)
+        if regions is None:
+            # Uma única inferência por frame, partilhada por pessoas e móveis
+            detections = self.model.predict(frame, self.imgsz)
+            person_boxes, _, furniture_boxes, furniture_cls = \
+                self.split_detections(detections)
+            self._furniture = (furniture_boxes, furniture_cls)
+            self._last_full_frame = now
+        else:
+            # Recortes à volta dos tracks num só lote; móveis da última
+            # passagem completa
+            imgsz = ROI_SETTINGS['IMGSZ']
+            detections = detect_regions(self.model, frame, regions,
+                                        min(imgsz, self.imgsz or imgsz))
+            person_boxes = self.split_detections(detections)[0]
+            furniture_boxes, furniture_cls = self._furniture
+        timings['yolo'] = time.perf_counter() - start
+        if self.live:
+            DETECTION_PASSES.inc(camera=self.camera_id,
+                                 mode='full' if regions is None else 'roi')
+        nearby_per_person = match_furniture(
+            person_boxes, furniture_boxes, furniture_cls, self.furniture_classes)
+        people_detected = len(person_boxes) > 0
+        tracks = []
+        furniture = {}
+
+        # Associação de todas as caixas aos tracks numa única passagem
+        person_ids = self.tracker.update(person_boxes, width, height, now)
+        timings['detect'] = time.perf_counter() - start
+
+        # Pose de cada pessoa no seu próprio recorte, em paralelo
+        start = time.perf_counter()
+        poses = self.pose_estimator.estimate(frame, person_boxes, person_ids)
+        timings['pose'] = time.perf_counter() - start
+        start = time.perf_counter()
+
+        # Pontuação de todas as pessoas com pose numa única chamada
+        scored = [i for i, pose in enumerate(poses) if pose]
+        histories = [self.people_tracking[person_ids[i]].history
+                     for i in scored]
+        landmarks = pack_landmarks([poses[i] for i in scored])
+        rest_tops, has_furniture = furniture_features(
+            [nearby_per_person[i] for i in scored], height)
+        on_ground, scores = score_falls(landmarks, previous_nose(histories),
+                                   rest_tops, has_furniture)
+        timings['is_falling'] = time.perf_counter() - start
+
+        for i, history, person_landmarks, is_on_ground, score in zip(
+                scored, histories, landmarks, on_ground, scores):
+            person_id = person_ids[i]
+            track = self.people_tracking[person_id]
+
+            track.on_ground = bool(is_on_ground)
+            label = self.update_fall_state(person_id, track, now)
+
+            # Atualizar dados de rastreamento
+            history.append(person_landmarks)
+            track.last_seen = now
+
+            tracks.append(TrackResult(
+                person_id, tuple(map(int, person_boxes[i])),
+                track_state(track), label, int(score)))
+            # Móveis próximos (um só registo por móvel)
+            for item in nearby_per_person[i]:
+                furniture[tuple(map(int, item['box']))] = item['type']
 
         # Se nenhuma pessoa foi detectada, limpar todos os estados
         if not people_detected:
-            self.people_tracking.clear()  # Limpar rastreamento
-            # Desenhar status de "No people detected"
-            cv2.putText(frame, "No people detected", (10, 30),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-
-        return frame
-
-    def detect_furniture(self, frame, person_box):
-        """Detecta móveis próximos à pessoa"""
-        results = self.model(frame)
-        x1_person, y1_person, x2_person, y2_person = person_box
-        person_bottom = y2_person
-        person_center = (x1_person + x2_person) / 2
-
-        nearby_furniture = []
-
-        if len(results) > 0:
-            boxes = results[0].boxes
-            for box in boxes:
-                cls_id = int(box.cls.cpu().numpy()[0])
-                if cls_id in self.furniture_classes:
-                    x1, y1, x2, y2 = map(int, box.xyxy.cpu().numpy()[0])
-                    furniture_center = (x1 + x2) / 2
-
-                    # Verificar proximidade horizontal
-                    horizontal_distance = abs(person_center - furniture_center)
-                    is_near_horizontally = horizontal_distance < (
-                        x2 - x1) * 0.7
-
-                    # Verificar relação vertical
-                    vertical_relation = abs(person_bottom - y1)
-                    is_near_vertically = vertical_relation < 50  # Ajustável
-
-                    if is_near_horizontally and is_near_vertically:
-                        nearby_furniture.append({
-                            'type': self.furniture_classes[cls_id],
-                            'box': (x1, y1, x2, y2),
-                            'height': y2 - y1,
-                            'class_id': cls_id,
-                            'distance': horizontal_distance
-                        })
-
-        return sorted(nearby_furniture, key=lambda x: x['distance'])
-
-
-# Instância global do detector
-fall_detector = FallDetector()
+            self.tracker.clear()  # Limpar rastreamento
+
+        # Devolver ao pool as instâncias Pose de tracks expirados
+        self.pose_estimator.release_missing(self.people_tracking)
+
+        # Troca atómica: os frames desenhados até à próxima deteção usam este
+        # resultado
+        result = self.last_result = DetectionResult(
+            now, len(person_boxes), tuple(tracks), tuple(furniture.items()))
+        self.publish_changes(now)
+        timings['rules'] = time.perf_counter() - start
+        # Custo médio de um frame analisado, para estimar a poupança
+        cost = time.perf_counter() - frame_start
+        self._full_cost = (cost if not self._full_cost
+                           else 0.9 * self._full_cost + 0.1 * cost)
+        self.finish_frame(timings, gate)
+        return result
+
+    def roi_regions(self, now, width, height):
+        """Recortes para este frame, ou None para uma passagem completa
+
+        O frame inteiro é analisado sem tracks, a cada FULL_FRAME_INTERVAL
+        (para apanhar quem entra na cena) e quando os recortes cobririam
+        quase todo o frame.
+        """
+        if not ROI_SETTINGS['ENABLED'] or not self.people_tracking:
+            return None
+        if self._last_full_frame is None or \
+                now - self._last_full_frame >= \
+                ROI_SETTINGS['FULL_FRAME_INTERVAL']:
+            return None
+        return plan_regions([track.box for track in
+                             self.people_tracking.values()], width, height)
+
+    def update_fall_state(self, person_id, track, now):
+        """Avança a máquina de estados de queda; retorna o texto do track"""
+        if not track.on_ground:
+            track.fall_start_time = None
+            track.is_fallen = False
+            track.alert_sent = False
+            return f"Person {person_id}: Monitoring"
+
+        if track.fall_start_time is None:
+            track.fall_start_time = now
+            return f"Person {person_id}: Possible fall..."
+
+        immobility_time = now - track.fall_start_time
+        if immobility_time < self.immobility_duration:
+            return f"Person {person_id}: Analyzing... {int(immobility_time)}s"
+
+        if not track.is_fallen:
+            track.is_fallen = True
+            if not track.alert_sent:
+                # Só enfileira; a entrega é assíncrona
+                if self.live:
+                    send_alert(f"Person {person_id} has fallen!",
+                               self.camera_id, person_id)
+                track.alert_sent = True
+                self._last_alert = (person_id, now)
+
+        return f"Person {person_id}: FALLEN! {int(immobility_time)}s"
+
+    def reuse_detections(self, now):
+        """Frame sem movimento: mantém caixas e estados do último frame analisado
+
+        Os temporizadores de imobilidade continuam a avançar, pelo que uma
+        pessoa caída e imóvel é confirmada sem voltar a correr os modelos.
+        """
+        tracks = []
+        for previous in self.last_result.tracks:
+            track = self.people_tracking.get(previous.id)
+            if track is None:
+                continue
+            track.last_seen = now
+            label = self.update_fall_state(previous.id, track, now)
+            tracks.append(previous._replace(state=track_state(track),
+                                            label=label))
+        result = self.last_result = self.last_result._replace(
+            time=now, people=len(tracks), tracks=tuple(tracks))
+        self.publish_changes(now, analysed=False)
+        return result
+
+    def finish_frame(self, timings, gate):
+        """Guarda as durações do frame e exporta-as (e a decisão do filtro)"""
+        self.last_timings = timings
+        if not self.live:
+            return
+        for stage, seconds in timings.items():
+            observe_stage(self.camera_id, stage, seconds)
+        if gate is not None:
+            MOTION_GATE.inc(camera=self.camera_id, decision=gate)
+            if gate == 'skipped' and self._full_cost:
+                SAVED_SECONDS.inc(self._full_cost, camera=self.camera_id)
+
+    def annotate(self, frame):
+        """Desenha o último resultado no próprio frame (ver OverlayRenderer)"""
+        return draw_overlay(frame, self.last_result)
+
+
+FALL_STATES = ('possible_fall', 'fallen')
+
+# Resultado estruturado de um frame: pessoas com caixa, estado, texto e
+# pontuação, e móveis próximos como (caixa, tipo)
+TrackResult = namedtuple('TrackResult', ['id', 'box', 'state', 'label',
+                                         'score'])
+DetectionResult = namedtuple('DetectionResult', ['time', 'people', 'tracks',
+                                                 'furniture'])
+EMPTY_RESULT = DetectionResult(None, 0, (), ())
+
+# Estado de uma câmera num frame; `tracks` são pares (id, estado) e
+# `last_alert` é (id, instante) do último alerta ou None
+StatusSnapshot = namedtuple('StatusSnapshot', [
+    'camera_id', 'time', 'people', 'fall_detected', 'alert_sent', 'tracks',
+    'fps', 'last_alert'])
+
+
+def empty_snapshot(camera_id=None):
+    return StatusSnapshot(camera_id, None, 0, False, False, (), 0.0, None)
+
+
+def status_dict(snapshot):
+    """Snapshot em formato JSON (/status, push)"""
+    last_alert = snapshot.last_alert
+    return {
+        'camera_id': snapshot.camera_id,
+        'time': snapshot.time,
+        'people': snapshot.people,
+        'fall_detected': snapshot.fall_detected,
+        'alert_sent': snapshot.alert_sent,
+        'tracks': [{'id': person_id, 'state': state}
+                   for person_id, state in snapshot.tracks],
+        'fps': snapshot.fps,
+        'last_alert': ({'person_id': last_alert[0], 'time': last_alert[1]}
+                       if last_alert else None)
+    }
+
+
+def track_state(track):
+    """Estado de queda de um track: 'monitoring', 'possible_fall' ou 'fallen'"""
+    if track.is_fallen:
+        return 'fallen'
+    if track.fall_start_time is not None:
+        return 'possible_fall'
+    return 'monitoring'
+
+
+def match_furniture(person_boxes, furniture_boxes, furniture_cls,
+                    furniture_classes, vertical_threshold=50):
+    """Associa móveis próximos a cada pessoa numa única operação vetorizada
+
+    Retorna, para cada pessoa, a lista de móveis próximos ordenada pela
+    distância horizontal (mesmo formato do antigo detect_furniture).
+    """
+    if len(person_boxes) == 0:
+        return []
+    if len(furniture_boxes) == 0:
+        return [[] for _ in range(len(person_boxes))]
+
+    pboxes = np.asarray(person_boxes).astype(np.int64)
+    fboxes = np.asarray(furniture_boxes).astype(np.int64)
+
+    # Matrizes (pessoas, móveis)
+    person_center = (pboxes[:, 0] + pboxes[:, 2]) / 2
+    furniture_center = (fboxes[:, 0] + fboxes[:, 2]) / 2
+    furniture_width = fboxes[:, 2] - fboxes[:, 0]
+    horizontal_distance = np.abs(
+        person_center[:, None] - furniture_center[None, :])
+    vertical_relation = np.abs(
+        pboxes[:, 3][:, None] - fboxes[:, 1][None, :])
+
+    near = ((horizontal_distance < furniture_width[None, :] * 0.7) &
+            (vertical_relation < vertical_threshold))
+
+    nearby_per_person = []
+    for i in range(len(pboxes)):
+        idx = np.flatnonzero(near[i])
+        idx = idx[np.argsort(horizontal_distance[i, idx], kind='stable')]
+        nearby_per_person.append([{
+            'type': furniture_classes[int(furniture_cls[j])],
+            'box': tuple(int(v) for v in fboxes[j]),
+            'height': int(fboxes[j, 3] - fboxes[j, 1]),
+            'class_id': int(furniture_cls[j]),
+            'distance': float(horizontal_distance[i, j])
+        } for j in idx])
+
+    return nearby_per_person
+
+
+_fall_detector = None
+_fall_detector_lock = threading.Lock()
+
+
+def get_fall_detector():
+    """Instância partilhada do detector (criada sem carregar modelos)"""
+    global _fall_detector
+    with _fall_detector_lock:
+        if _fall_detector is None:
+            _fall_detector = FallDetector(default_camera_id())
+        return _fall_detector
 
 
 def process_frame(frame):
     if frame is None:
         return None
-    return fall_detector.detect_fall(frame)
+    # Mantém o contrato antigo: o frame volta com as anotações desenhadas
+    detector = get_fall_detector()
+    detector.detect_fall(frame)
+    return detector.annotate(frame)
@@ -1,40 +1,60 @@
 import cv2
 import os
-from config import VIDEO_SETTINGS, VIDEO_SOURCE
+import threading
+import time
+from config import CAPTURE_SETTINGS, VIDEO_SETTINGS, VIDEO_SOURCE
+from .metrics import SOURCE_RECONNECTS, observe_stage
 
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+STREAM_SCHEMES = ('rtsp', 'rtsps', 'rtmp', 'http', 'https')
 
-def get_video_capture():
-    """Inicializa e configura a captura de vídeo"""
+
+def get_video_capture(source=None):
+    """Inicializa e configura a captura de vídeo
+
+    Sem `source`, usa VIDEO_SOURCE e, se essa câmera não abrir,
+    VIDEO_SETTINGS['FALLBACK_SOURCE'] (quando configurada).
+    """
+    if source is not None and source != VIDEO_SOURCE:
+        return open_video_capture(source)
+
+    fallback = VIDEO_SETTINGS.get('FALLBACK_SOURCE')
+    try:
+        return open_video_capture(VIDEO_SOURCE)
+    except Exception:
+        if fallback is None or fallback == VIDEO_SOURCE:
+            raise
+        print(f"Camera {VIDEO_SOURCE} not found, "
+              f"falling back to camera {fallback}")
+        return open_video_capture(fallback)
+
+
+def open_video_capture(source):
+    """Abre e configura uma fonte de vídeo concreta"""
     max_attempts = 3
     cap = None
 
     for attempt in range(max_attempts):
         try:
-            cap = cv2.VideoCapture(VIDEO_SOURCE)
+            cap = cv2.VideoCapture(source)
             if not cap.isOpened():
                 if attempt < max_attempts - 1:
                     print(f"Attempt {attempt + 1} failed, retrying...")
                     continue
-                raise Exception(f"Could not open camera {VIDEO_SOURCE}")
+                raise Exception(f"Could not open camera {source}")
 
             # Configurar propriedades da câmera
             cap.set(cv2.CAP_PROP_FRAME_WIDTH, VIDEO_SETTINGS['WIDTH'])
             cap.set(cv2.CAP_PROP_FRAME_HEIGHT, VIDEO_SETTINGS['HEIGHT'])
             cap.set(cv2.CAP_PROP_FPS, VIDEO_SETTINGS['FPS'])
 
-            # Verificar configurações
+            # Verificar configurações (o primeiro frame é lido pelo grabber)
             frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
             frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             fps = int(cap.get(cv2.CAP_PROP_FPS))
 
-            # Testar frames
-            for _ in range(3):
-                ret, frame = cap.read()
-                if not ret:
-                    raise Exception("Failed to grab test frames")
-
-            print(f"Camera initialized: {frame_width}x{
-                  frame_height} @ {fps}fps")
+            print(f"Camera initialized: {frame_width}x{frame_height} "
+                  f"@ {fps}fps")
             return cap
 
         except Exception as e:
@@ -44,3 +64,274 @@ def get_video_capture():
                 cap.release()
 
     return None
+
+
+class VideoSource:
+    """Fonte de frames aberta e lida pela thread de um `FrameGrabber`
+
+    `open` lança uma exceção se a fonte não estiver disponível; `read`
+    retorna (ok, frame) como o cv2.VideoCapture. Uma leitura falhada com
+    `finished` a False é tratada como uma quebra e a fonte é reaberta.
+    """
+
+    kind = None
+
+    def __init__(self, target, settings=None):
+        self.target = target
+        self.settings = dict(CAPTURE_SETTINGS, **(settings or {}))
+        self.finished = False
+        self._next_frame = None
+
+    def open(self):
+        raise NotImplementedError
+
+    def read(self):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    def pace(self, fps):
+        """Espera pelo instante do próximo frame (REALTIME)
+
+        Se a leitura se atrasar mais do que um frame, o relógio recomeça
+        em vez de despejar os frames em atraso de uma só vez.
+        """
+        if not self.settings['REALTIME'] or not fps:
+            return
+        now = time.time()
+        if self._next_frame is None or now - self._next_frame > 1.0 / fps:
+            self._next_frame = now
+        elif self._next_frame > now:
+            time.sleep(self._next_frame - now)
+        self._next_frame += 1.0 / fps
+
+
+class CaptureSource(VideoSource):
+    """Base das fontes lidas por um cv2.VideoCapture"""
+
+    def __init__(self, target, settings=None):
+        super().__init__(target, settings)
+        self.cap = None
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class DeviceSource(CaptureSource):
+    """Câmera local (índice ou /dev/video*) com o fallback do config"""
+
+    kind = 'device'
+
+    def open(self):
+        self.cap = get_video_capture(self.target)
+
+
+class FileSource(CaptureSource):
+    """Ficheiro de vídeo, ao ritmo do vídeo ou o mais rápido possível
+
+    Com LOOP recomeça no fim (uma câmera simulada); sem LOOP termina.
+    """
+
+    kind = 'file'
+
+    def open(self):
+        if not os.path.exists(self.target):
+            raise FileNotFoundError(f"Video file not found: {self.target}")
+        self.cap = cv2.VideoCapture(self.target)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video file {self.target}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or VIDEO_SETTINGS['FPS']
+
+    def read(self):
+        self.pace(self.fps)
+        ret, frame = self.cap.read()
+        if not ret and self.settings['LOOP']:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        elif not ret:
+            self.finished = True
+        return ret, frame
+
+
+class StreamSource(CaptureSource):
+    """Stream de rede (RTSP, RTMP, HTTP) descodificado pelo FFmpeg"""
+
+    kind = 'stream'
+
+    def open(self):
+        if self.settings['RTSP_TCP']:
+            # Lido pelo OpenCV ao abrir streams FFmpeg
+            os.environ.setdefault('OPENCV_FFMPEG_CAPTURE_OPTIONS',
+                                  'rtsp_transport;tcp')
+        params = []
+        # Timeouts só existem no OpenCV >= 4.6
+        if hasattr(cv2, 'CAP_PROP_OPEN_TIMEOUT_MSEC'):
+            params = [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC,
+                int(self.settings['OPEN_TIMEOUT'] * 1000),
+                cv2.CAP_PROP_READ_TIMEOUT_MSEC,
+                int(self.settings['READ_TIMEOUT'] * 1000)
+            ]
+        self.cap = cv2.VideoCapture(self.target, cv2.CAP_FFMPEG, params)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open stream {self.target}")
+        # Só o frame mais recente interessa
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+
+class ImageDirectorySource(VideoSource):
+    """Pasta de imagens lidas por ordem de nome a IMAGE_FPS"""
+
+    kind = 'images'
+
+    def open(self):
+        self.paths = sorted(
+            os.path.join(self.target, name)
+            for name in os.listdir(self.target)
+            if name.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.paths:
+            raise IOError(f"No images in {self.target}")
+        self._index = 0
+
+    def read(self):
+        self.pace(self.settings['IMAGE_FPS'])
+        # Imagens ilegíveis são saltadas (no máximo uma volta à pasta)
+        for _ in range(len(self.paths)):
+            if self._index == len(self.paths):
+                if not self.settings['LOOP']:
+                    break
+                self._index = 0
+            frame = cv2.imread(self.paths[self._index])
+            self._index += 1
+            if frame is not None:
+                return True, frame
+        self.finished = self._index == len(self.paths) and \
+            not self.settings['LOOP']
+        return False, None
+
+
+def create_source(source, settings=None):
+    """Fonte de vídeo para um SOURCE do registo de câmeras
+
+    Inteiros (ou texto só com dígitos) e /dev/video* são câmeras locais;
+    rtsp://, rtmp:// e http(s):// são streams; pastas são sequências de
+    imagens; o resto é um ficheiro de vídeo.
+    """
+    if isinstance(source, int) or str(source).isdigit():
+        return DeviceSource(int(source), settings)
+    source = str(source)
+    if source.split('://', 1)[0].lower() in STREAM_SCHEMES and \
+            '://' in source:
+        return StreamSource(source, settings)
+    if source.startswith('/dev/video'):
+        return DeviceSource(source, settings)
+    if os.path.isdir(source):
+        return ImageDirectorySource(source, settings)
+    return FileSource(source, settings)
+
+
+class FrameGrabber:
+    """Thread de captura que guarda apenas o frame mais recente
+
+    Abre e lê continuamente a fonte (descodificação e rede ficam fora do
+    ciclo de deteção) para que nenhum buffer acumule frames antigos. Cada
+    frame recebe um número de sequência e o instante da captura; quem lê
+    pode saltar frames (drop-to-latest). Se a fonte falhar ou cair, é
+    reaberta com backoff exponencial; `failed` só fica True quando a
+    fonte termina (ficheiro sem LOOP).
+    """
+
+    def __init__(self, source, camera_id=None):
+        self.source = source
+        self.camera_id = camera_id
+        self._condition = threading.Condition()
+        self._frame = None
+        self._timestamp = None
+        self._seq = 0
+        self.failed = False
+        self.connected = False
+        self.reconnects = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f'frame-grabber-{camera_id}', daemon=True)
+        self._thread.start()
+
+    def _reconnect(self, delay, reason):
+        """Fecha a fonte e espera antes de a reabrir; retorna a nova espera"""
+        self.source.release()
+        self.connected = False
+        self.reconnects += 1
+        SOURCE_RECONNECTS.inc(camera=self.camera_id)
+        print(f"Camera {self.camera_id} ({self.source.kind}): {reason}, "
+              f"reconnecting in {delay:.0f}s")
+        self._stop.wait(delay)
+        return min(delay * 2, self.source.settings['MAX_RECONNECT_DELAY'])
+
+    def _run(self):
+        initial_delay = self.source.settings['RECONNECT_DELAY']
+        delay = initial_delay
+        while not self._stop.is_set():
+            if not self.connected:
+                try:
+                    self.source.open()
+                except Exception as e:
+                    delay = self._reconnect(delay, f"unavailable ({e})")
+                    continue
+                self.connected = True
+
+            start = time.perf_counter()
+            try:
+                ret, frame = self.source.read()
+            except Exception as e:
+                # Uma exceção do descodificador não pode matar a captura
+                delay = self._reconnect(delay, f"read failed ({e})")
+                continue
+            timestamp = time.time()
+            observe_stage(self.camera_id, 'capture',
+                          time.perf_counter() - start)
+            if not ret:
+                if self.source.finished:
+                    print(f"Camera {self.camera_id}: source finished")
+                    with self._condition:
+                        self.failed = True
+                        self._condition.notify_all()
+                    return
+                delay = self._reconnect(delay, "lost")
+                continue
+            delay = initial_delay
+            with self._condition:
+                self._frame = frame
+                self._timestamp = timestamp
+                self._seq += 1
+                self._condition.notify_all()
+
+    def read(self, last_seq=0, timeout=5.0):
+        """Retorna (seq, frame, timestamp) mais recente que `last_seq`
+
+        frame é None se a captura falhar ou expirar o timeout.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._seq > last_seq or self.failed, timeout)
+            if self._seq <= last_seq:
+                return last_seq, None, None
+            return self._seq, self._frame, self._timestamp
+
+    def stats(self):
+        return {
+            'kind': self.source.kind,
+            'connected': self.connected,
+            'reconnects': self.reconnects,
+            'finished': self.failed
+        }
+
+    def release(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self.source.release()
@@ -16,25 +16,56 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     }
 
-    // Atualizar status
+    // Mostrar estado de queda da câmera
+    function showStatus(data) {
+        if (data.fall_detected) {
+            statusElement.textContent = 'QUEDA DETECTADA!';
+            statusElement.className = 'text-danger';
+        } else {
+            statusElement.textContent = 'Monitorando';
+            statusElement.className = 'text-success';
+        }
+    }
+
+    // Atualizar status (fallback por polling sem Socket.IO)
     function updateStatus() {
         fetch('/status')
             .then(response => response.json())
             .then(data => {
-                if (data.fall_detected) {
-                    statusElement.textContent = 'QUEDA DETECTADA!';
-                    statusElement.className = 'text-danger';
-                    if (data.alert_sent) {
-                        addLogEntry('Alerta enviado: Queda detectada!', true);
-                    }
-                } else {
-                    statusElement.textContent = 'Monitorando';
-                    statusElement.className = 'text-success';
+                showStatus(data);
+                if (data.fall_detected && data.alert_sent) {
+                    addLogEntry('Alerta enviado: Queda detectada!', true);
                 }
             })
             .catch(error => console.error('Error:', error));
     }
 
+    // Mensagens das transições de queda enviadas pelo servidor
+    const fallMessages = {
+        possible_fall: 'Possível queda',
+        fallen: 'Queda detectada!',
+        monitoring: 'Pessoa recuperou',
+        lost: 'Pessoa saiu de vista'
+    };
+
+    // Canal de push: o servidor envia transições, tracks e estatísticas
+    function connectPush() {
+        const socket = io();
+
+        socket.on('connect', () => socket.emit('subscribe', {}));
+        socket.on('status', showStatus);
+        socket.on('tracks', showStatus);
+        socket.on('fall_state', data => {
+            const message = `Pessoa ${data.person_id}: ${fallMessages[data.state] || data.state}`;
+            addLogEntry(message, data.state === 'fallen');
+        });
+        socket.on('stats', data => {
+            if (data.detection_fps !== undefined) {
+                document.getElementById('currentFps').textContent = `${data.detection_fps} FPS`;
+            }
+        });
+    }
+
     // Salvar configurações
     document.getElementById('saveSettings').addEventListener('click', function () {
         const settings = {
@@ -64,12 +95,27 @@ document.addEventListener('DOMContentLoaded', function () {
         addLogEntry('Logs limpos');
     });
 
-    // Atualizar status periodicamente
-    setInterval(updateStatus, 1000);
+    // Push quando o cliente Socket.IO está disponível; senão, polling
+    if (typeof io !== 'undefined') {
+        connectPush();
+    } else {
+        setInterval(updateStatus, 1000);
+    }
 
     // Adicionar log inicial
     addLogEntry('Sistema iniciado');
 
+    // Eventos recentes guardados no servidor (quedas, recuperações, alertas)
+    fetch('/get_logs?type=fall,recovery,alert&limit=20')
+        .then(response => response.json())
+        .then(data => {
+            data.logs.reverse().forEach(event => {
+                const time = new Date(event.time * 1000).toLocaleTimeString();
+                addLogEntry(`[${time}] ${event.message}`, event.type === 'fall');
+            });
+        })
+        .catch(error => console.error('Error:', error));
+
     // Inicializar gráfico com opções responsivas
     const ctx = document.getElementById('detectionChart').getContext('2d');
     const detectionChart = new Chart(ctx, {
@@ -1,35 +1,30 @@
-from flask import Blueprint, render_template, Response, jsonify, request
-import cv2
-from app.detection.utils import process_frame
-from app.detection import fall_detector
-from app.detection.video import get_video_capture
+from flask import (Blueprint, render_template, Response, jsonify, request,
+                   current_app, abort)
+from app.detection import get_fall_detector
+from app.detection.alert import get_alert_dispatcher
+from app.detection.batching import get_inference_server
+from app.detection.cameras import get_camera, get_cameras
+from app.detection.memory import memory_report
+from app.detection.metrics import REGISTRY, sample_profile
+from app.detection.store import EVENT_TYPES, get_event_store, parse_cursor
+from config import CAMERA_SETTINGS, INFERENCE_SETTINGS, STREAM_SETTINGS
+import os
 import psutil
-from datetime import datetime, timedelta
+from datetime import datetime
 
 main = Blueprint('main', __name__)
 
 
-def gen_frames():
-    cap = get_video_capture()
-    if cap is None:
-        return
-
+def camera_or_404(camera_id):
     try:
-        while True:
-            success, frame = cap.read()
-            if not success:
-                break
-            else:
-                # Processar o frame com a detecção
-                processed_frame = process_frame(frame)
-
-                # Converter para formato JPEG para streaming
-                ret, buffer = cv2.imencode('.jpg', processed_frame)
-                frame = buffer.tobytes()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-    finally:
-        cap.release()
+        return get_camera(camera_id)
+    except KeyError:
+        abort(404, description=f"Unknown camera '{camera_id}'")
+
+
+def gen_frames(camera_id=None, tier=None, max_fps=None):
+    # Todos os clientes partilham o mesmo pipeline de captura e deteção
+    return camera_or_404(camera_id).frames(tier, max_fps)
 
 
 @main.route('/')
@@ -38,55 +33,179 @@ def index():
 
 
 @main.route('/video_feed')
-def video_feed():
-    return Response(gen_frames(),
+@main.route('/video_feed/<camera_id>')
+def video_feed(camera_id=None):
+    # ?tier=low|medium|high (resolução/qualidade) e ?fps= (limite do cliente)
+    tier = request.args.get('tier')
+    if tier is not None and tier not in STREAM_SETTINGS['TIERS']:
+        abort(400, description=f"Unknown tier '{tier}'")
+    max_fps = query_float('fps')
+    if max_fps is not None:
+        if max_fps <= 0:
+            abort(400, description=f"Invalid fps '{request.args['fps']}'")
+        max_fps = min(max_fps, STREAM_SETTINGS['MAX_CLIENT_FPS'])
+    return Response(gen_frames(camera_id, tier, max_fps),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
 
+@main.route('/pipeline_stats')
+@main.route('/pipeline_stats/<camera_id>')
+def pipeline_stats(camera_id=None):
+    # Taxas de captura/deteção e latência captura -> decisão de alerta
+    return jsonify(camera_or_404(camera_id).stats())
+
+
+@main.route('/inference_stats')
+def inference_stats():
+    # Ocupação dos lotes, espera na fila e latência do servidor de inferência
+    if not INFERENCE_SETTINGS['BATCHING']:
+        return jsonify({'batching': False})
+    return jsonify(dict(get_inference_server().metrics(), batching=True))
+
+
+@main.route('/metrics')
+def metrics():
+    # Métricas em formato de texto Prometheus (inclui processos de câmera)
+    snapshots = []
+    if CAMERA_SETTINGS['MODE'] == 'processes':
+        from app.detection.supervisor import get_supervisor
+        snapshots = get_supervisor().metrics_snapshots()
+    return Response(REGISTRY.render(snapshots),
+                    mimetype='text/plain; version=0.0.4')
+
+
+@main.route('/memory_stats')
+def memory_stats():
+    # RSS/PSS/USS do processo web e dos processos das câmeras; com pesos
+    # partilhados a soma dos PSS fica perto de um só modelo
+    processes = {'web': os.getpid()}
+    if CAMERA_SETTINGS['MODE'] == 'processes':
+        from app.detection.supervisor import get_supervisor
+        supervisor = get_supervisor()
+        for camera_id, camera in supervisor.cameras.items():
+            if camera.process is not None and camera.alive:
+                processes[f"camera:{camera_id}"] = camera.process.pid
+        report = memory_report(processes)
+        report['shared_weights'] = supervisor.model is not None
+        return jsonify(report)
+    return jsonify(memory_report(processes))
+
+
+@main.route('/metrics/profile')
+def profile():
+    # Perfil por amostragem sob pedido: ?seconds=5&thread=inference
+    # &format=collapsed (pilhas para flamegraph) ou JSON com as mais quentes
+    seconds = request.args.get('seconds', 5, type=float)
+    result = sample_profile(seconds, thread_filter=request.args.get('thread'))
+    if request.args.get('format') == 'collapsed':
+        return Response(result['collapsed'] + '\n', mimetype='text/plain')
+    return jsonify(result)
+
+
+@main.route('/cameras')
+def list_cameras():
+    # Câmeras registadas e respetivo estado
+    return jsonify({'cameras': [camera_or_404(camera_id).status()
+                                for camera_id in get_cameras()]})
+
+
+@main.route('/ready')
+def ready():
+    # Prontidão: 503 enquanto os modelos ainda estão a carregar
+    if current_app.config['CAMERA_SETTINGS']['MODE'] == 'processes':
+        cameras = {camera_id: camera_or_404(camera_id).ready
+                   for camera_id in get_cameras()}
+        is_ready = all(cameras.values())
+        return jsonify({
+            'ready': is_ready,
+            'cameras': cameras,
+            'startup_seconds': current_app.config.get('STARTUP_SECONDS')
+        }), 200 if is_ready else 503
+
+    fall_detector = get_fall_detector()
+    if not fall_detector.is_ready:
+        fall_detector.warmup()
+    return jsonify({
+        'ready': fall_detector.is_ready,
+        'model_load_seconds': fall_detector.load_seconds,
+        'startup_seconds': current_app.config.get('STARTUP_SECONDS'),
+        'error': fall_detector.load_error
+    }), 200 if fall_detector.is_ready else 503
+
+
 @main.route('/status')
-def get_status():
-    # Verificar se alguma pessoa está caída
-    any_fallen = any(person_data.get('is_fallen', False)
-                     for person_data in fall_detector.people_tracking.values())
+@main.route('/status/<camera_id>')
+def get_status(camera_id=None):
+    # Snapshot do último frame: pessoas, estados, FPS e último alerta
+    return jsonify(camera_or_404(camera_id).status())
 
-    # Verificar se algum alerta foi enviado
-    any_alert = any(person_data.get('alert_sent', False)
-                    for person_data in fall_detector.people_tracking.values())
 
-    return {
-        'fall_detected': any_fallen,
-        'alert_sent': any_alert
-    }
+@main.route('/alert_stats')
+def alert_stats():
+    # Alertas enfileirados, entregues, filtrados e latência de entrega
+    return jsonify(get_alert_dispatcher().stats())
 
 
 @main.route('/update_settings', methods=['POST'])
 def update_settings():
     settings = request.json
     # Atualizar configurações do detector
-    fall_detector.update_settings(settings)
+    get_fall_detector().update_settings(settings)
     return jsonify({'status': 'success'})
 
 
+def query_float(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        abort(400, description=f"Invalid {name} '{value}'")
+
+
 @main.route('/get_logs')
 def get_logs():
-    # Implementar recuperação de logs se necessário
-    return jsonify({'logs': fall_detector.get_logs()})
+    # Eventos paginados (mais recentes primeiro): ?camera_id=&type=fall,alert
+    # &since=&until=&cursor=&limit=
+    types = request.args.get('type')
+    types = types.split(',') if types else None
+    if types and not set(types) <= set(EVENT_TYPES):
+        abort(400, description=f"Unknown event type in '{request.args['type']}'")
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            cursor = parse_cursor(cursor)
+        except ValueError:
+            abort(400, description=f"Invalid cursor '{cursor}'")
+    page = get_event_store().query(
+        camera_id=request.args.get('camera_id'), types=types,
+        since=query_float('since'), until=query_float('until'),
+        cursor=cursor,
+        limit=request.args.get('limit', 50, type=int))
+    return jsonify({'logs': page['events'],
+                    'next_cursor': page['next_cursor']})
 
 
 @main.route('/system_stats')
 def system_stats():
     # Coletar estatísticas do sistema
     cpu_usage = psutil.cpu_percent()
+    camera_id = request.args.get('camera_id')
+    hours = max(1, min(request.args.get('hours', 24, type=int), 24 * 7))
 
-    # Obter FPS atual
-    current_fps = fall_detector.get_fps()
+    # FPS atual da câmera (snapshot do detector)
+    current_fps = camera_or_404(camera_id).status()['fps']
 
-    # Coletar estatísticas de detecção
-    stats = fall_detector.get_stats()
+    # Quedas registadas, pelos totais por hora do registo de eventos
+    store = get_event_store()
+    midnight = datetime.now().replace(hour=0, minute=0, second=0,
+                                      microsecond=0).timestamp()
 
     return jsonify({
         'cpu_usage': cpu_usage,
         'fps': current_fps,
-        'total_detections': stats['total_detections'],
-        'detections_per_hour': stats['detections_per_hour']
+        'total_detections': store.count_since('fall', midnight, camera_id),
+        'detections_per_hour': store.per_hour('fall', hours, camera_id),
+        'fps_per_hour': store.per_hour('fps', hours, camera_id)
     })
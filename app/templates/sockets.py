@@ -0,0 +1,60 @@
+from flask_socketio import SocketIO, emit, join_room, leave_room
+
+from app.detection.cameras import default_camera_id, get_camera, get_cameras
+from app.detection.events import get_event_bus
+from config import PUSH_SETTINGS
+
+socketio = SocketIO()
+
+
+def camera_room(camera_id):
+    return f"camera:{camera_id}"
+
+
+def emit_event(event, data):
+    # Um único emit por evento para a sala da câmera, seja qual for o
+    # número de dashboards ligados
+    socketio.emit(event, data, to=camera_room(data['camera_id']))
+
+
+def stats_deltas(last):
+    """(câmera, campos de estatísticas que mudaram desde `last`)"""
+    for camera_id in get_cameras():
+        stats = get_camera(camera_id).stats()
+        previous = last.get(camera_id, {})
+        delta = {key: value for key, value in stats.items()
+                 if previous.get(key) != value}
+        last[camera_id] = stats
+        if delta:
+            yield camera_id, dict(delta, camera_id=camera_id)
+
+
+def stats_loop():
+    """Envia apenas os campos de estatísticas que mudaram desde o último envio"""
+    last = {}
+    while True:
+        socketio.sleep(PUSH_SETTINGS['STATS_INTERVAL'])
+        for camera_id, delta in stats_deltas(last):
+            socketio.emit('stats', delta, to=camera_room(camera_id))
+
+
+@socketio.on('subscribe')
+def subscribe(data=None):
+    # O cliente escolhe a câmera; recebe logo o estado atual
+    camera_id = str((data or {}).get('camera_id') or default_camera_id())
+    if camera_id not in get_cameras():
+        emit('error', {'message': f"Unknown camera '{camera_id}'"})
+        return
+    for other in get_cameras():
+        leave_room(camera_room(other))
+    join_room(camera_room(camera_id))
+    emit('status', get_camera(camera_id).status())
+    emit('stats', get_camera(camera_id).stats())
+
+
+def init_push(app):
+    """Liga o Socket.IO à app e o barramento de eventos aos clientes"""
+    socketio.init_app(app, async_mode=PUSH_SETTINGS['ASYNC_MODE'])
+    get_event_bus().subscribe(emit_event)
+    socketio.start_background_task(stats_loop)
+    return socketio
@@ -0,0 +1,30 @@
+"""Ponto de entrada ASGI (streams e push sem uma thread por cliente)
+
+Uso:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+    python asgi.py
+"""
+import os
+import sys
+
+# Adicionar o diretório raiz e o diretório app ao PYTHONPATH
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+sys.path.append(os.path.join(current_dir, 'app'))
+
+from app.asgi import create_asgi_app  # noqa: E402
+
+
+def __getattr__(name):
+    # `app` só é criada quando o servidor a pede (uvicorn asgi:app), nunca
+    # ao importar o módulo: os processos filhos (spawn) reimportam-no
+    if name == 'app':
+        global app
+        app = create_asgi_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(create_asgi_app(), host='127.0.0.1', port=5000)
@@ -6,11 +6,26 @@ VIDEO_SETTINGS = {
     'HEIGHT': 480,
     'FPS': 30,
     'SOURCE': 0,  # 0 para webcam padrão
+    'DETECTION_FPS': 0,  # 0 = o máximo que o hardware suportar
 }
 
 # Configuração da fonte de vídeo
 VIDEO_SOURCE = VIDEO_SETTINGS['SOURCE']
 
+# Fontes de vídeo (ver app/detection/video.py): SOURCE pode ser o índice de
+# uma câmera, um ficheiro, um URL rtsp:// ou http(s):// ou uma pasta de
+# imagens; cada câmera do registo pode substituir estes valores com 'CAPTURE'
+CAPTURE_SETTINGS = {
+    'REALTIME': True,           # ficheiros/pastas ao ritmo do vídeo
+    'LOOP': True,               # recomeçar ficheiros/pastas no fim
+    'IMAGE_FPS': 10,            # ritmo das pastas de imagens
+    'OPEN_TIMEOUT': 10.0,       # segundos para abrir um stream de rede
+    'READ_TIMEOUT': 5.0,        # segundos sem frames até reconectar
+    'RTSP_TCP': True,           # RTSP sobre TCP (sem perdas de pacotes UDP)
+    'RECONNECT_DELAY': 1.0,     # espera inicial antes de reabrir a fonte
+    'MAX_RECONNECT_DELAY': 30.0
+}
+
 # Configurações de detecção
 FALL_DETECTION_SETTINGS = {
     'CONFIDENCE_THRESHOLD': 0.5,
@@ -20,3 +35,177 @@ FALL_DETECTION_SETTINGS = {
     'FETAL_POSITION_THRESHOLD': 0.2,    # distância máxima entre joelho e quadril
     'HISTORY_SIZE': 10                  # frames para análise
 }
+
+# Configurações da estimativa de pose (um recorte por pessoa)
+POSE_SETTINGS = {
+    'MODEL_COMPLEXITY': 1,
+    'MIN_DETECTION_CONFIDENCE': 0.5,
+    'MIN_TRACKING_CONFIDENCE': 0.5,
+    'CROP_PADDING': 0.1,        # margem à volta da caixa YOLO (fração)
+    'MAX_WORKERS': 4,           # threads para recortes em paralelo
+    'MAX_IDLE_INSTANCES': 4     # instâncias Pose guardadas no pool
+}
+
+# Configurações do tracker multi-pessoa
+TRACKER_SETTINGS = {
+    'TIMEOUT': 30,              # segundos sem ver a pessoa até expirar
+    'MAX_DISTANCE': 0.3,        # distância máxima entre centros (normalizada)
+    'IOU_WEIGHT': 1.0,
+    'DISTANCE_WEIGHT': 1.0,
+    'MATCHING': 'hungarian'     # 'hungarian' (requer scipy) ou 'greedy'
+}
+
+# Configurações dos modelos (carregados no primeiro frame ou em warmup)
+MODEL_SETTINGS = {
+    'BACKEND': 'ultralytics',   # 'ultralytics', 'onnxruntime' ou 'openvino'
+    'TIER': 'x',                # tamanho do YOLO11: 'n', 's', 'm', 'l', 'x'
+    'PRECISION': 'fp32',        # 'fp32' ou 'int8' (apenas grafos exportados)
+    'IMGSZ': 640,               # tamanho de entrada da inferência
+    'EXPORT_DIR': 'models',     # grafos gerados por scripts/export_models.py
+    'THREADS': 0,               # threads do runtime (0 = automático)
+    'WEIGHTS': None,            # caminho explícito (ignora tier/precisão)
+    'SHARE_WEIGHTS': True,      # processos de câmera partilham os pesos
+    'WARMUP_ON_START': True     # carregar em segundo plano ao criar a app
+}
+
+# Filtro de movimento antes do YOLO/pose (ver app/detection/motion.py)
+MOTION_SETTINGS = {
+    'ENABLED': True,
+    'WIDTH': 160,               # largura do frame reduzido comparado
+    'PIXEL_THRESHOLD': 25,      # diferença de cinza para contar um pixel
+    'AREA_THRESHOLD': 0.002,    # fração de pixels alterados = movimento
+    'BACKGROUND_ALPHA': 0.5,    # peso do frame novo na média de fundo
+    'MAX_SKIP_SECONDS': 2.0     # deteção completa pelo menos a este ritmo
+}
+
+# Deteção só à volta dos tracks entre passagens no frame inteiro (ROI)
+ROI_SETTINGS = {
+    'ENABLED': True,
+    'FULL_FRAME_INTERVAL': 1.0, # segundos entre deteções no frame inteiro
+    'PADDING': 0.5,             # margem à volta de cada track (fração)
+    'MIN_SIZE': 128,            # lado mínimo de cada recorte (px)
+    'IMGSZ': 320,               # entrada do detetor para os recortes
+    'MAX_COVERAGE': 0.5         # acima desta fração do frame, frame inteiro
+}
+
+# Controlo adaptativo de qualidade (ver app/detection/quality.py); cada
+# câmera do registo pode substituir estes valores com a chave 'QUALITY'
+QUALITY_SETTINGS = {
+    'ENABLED': True,
+    'TARGET_FPS': 10,           # orçamento de um frame analisado = 1/TARGET_FPS
+    'MAX_LATENCY': 0.5,         # segundos captura -> decisão
+    'IMGSZ_STEPS': (512, 416, 320),
+    'TIERS': ('l', 'm', 's', 'n'),
+    'DETECTION_FPS_STEPS': (5, 2),  # ritmo, julgado pela fração de CPU
+    'MAX_CPU_SHARE': 1.0,       # custo x ritmo por câmera (< 1 para limitar)
+    'SMOOTHING': 0.2,           # peso de cada frame na média do custo
+    'DEGRADE_MARGIN': 0.1,      # acima do orçamento + 10% -> baixar
+    'UPGRADE_MARGIN': 0.3,      # subir só com 30% de folga prevista
+    'DEGRADE_SECONDS': 2.0,     # tempo acima do orçamento antes de baixar
+    'UPGRADE_SECONDS': 10.0,    # tempo com folga antes de subir
+    'COOLDOWN': 3.0,            # segundos sem decisões após cada mudança
+    'HISTORY': 20               # decisões guardadas por câmera
+}
+
+# Inferência em micro-lotes partilhada pelas câmeras (app/detection/batching.py)
+INFERENCE_SETTINGS = {
+    'BATCHING': False,          # agrupar frames de todas as câmeras
+    'MAX_BATCH_SIZE': 8,        # frames por passagem do modelo
+    'MAX_WAIT_MS': 10           # espera máxima para encher um lote
+}
+
+# Entrega assíncrona de alertas (ver app/detection/alert.py)
+ALERT_SETTINGS = {
+    'SINKS': ['console'],       # 'console', 'webhook', 'twilio', 'fake'
+    'QUEUE_SIZE': 100,          # alertas pendentes antes de descartar
+    'WORKERS': 2,               # threads de entrega
+    'MAX_RETRIES': 3,           # novas tentativas por sink
+    'RETRY_BACKOFF': 1.0,       # segundos (duplica a cada tentativa)
+    'DEDUP_WINDOW': 60,         # segundos entre alertas da mesma pessoa
+    'CAMERA_RATE_LIMIT': 5,     # alertas por câmera em RATE_WINDOW
+    'RATE_WINDOW': 60,          # segundos
+    'WEBHOOK_URL': None,
+    'WEBHOOK_TIMEOUT': 5,
+    'RECORD_EVENTS': True       # guardar cada entrega no registo de eventos
+}
+
+# Clips antes/depois de cada queda (ver app/detection/recorder.py); cada
+# câmera do registo pode substituir estes valores com a chave 'RECORDING'
+RECORDING_SETTINGS = {
+    'ENABLED': True,
+    'PRE_SECONDS': 15,          # segundos guardados antes da queda
+    'POST_SECONDS': 5,          # segundos gravados depois da queda
+    'MAX_FPS': 15,              # amostragem do anel (0 = VIDEO_FPS)
+    'MAX_MB': 64,               # memória máxima do anel por câmera
+    'MAX_PENDING_CLIPS': 8      # clips à espera do processo de escrita
+}
+
+# Registo de eventos (ver app/detection/store.py)
+STORE_SETTINGS = {
+    'PATH': 'data/events.db',   # SQLite partilhado pelos processos
+    'RING_SIZE': 1000,          # eventos recentes mantidos em memória
+    'QUEUE_SIZE': 10000,        # eventos pendentes de escrita
+    'ID_BLOCK': 1000,           # ids reservados de cada vez por processo
+    'FLUSH_INTERVAL': 0.5,      # segundos entre escritas em lote
+    'MAX_PAGE_SIZE': 500,       # limite de eventos por página
+    'FPS_SAMPLE_INTERVAL': 10,  # segundos entre amostras de FPS por câmera
+    'RETENTION_DAYS': 30,       # eventos individuais
+    'FPS_RETENTION_HOURS': 24,  # amostras de FPS individuais
+    'HOURLY_RETENTION_DAYS': 365,  # totais por hora
+    'COMPACT_INTERVAL': 3600    # segundos entre aplicações da retenção
+}
+
+# Métricas e perfis (ver app/detection/metrics.py, rota /metrics)
+METRICS_SETTINGS = {
+    'ENABLED': True,
+    # Limites dos histogramas de duração (segundos)
+    'BUCKETS': (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                1.0, 2.5, 5.0),
+    'PROFILE_INTERVAL': 0.01,   # segundos entre amostras do perfil
+    'PROFILE_MAX_SECONDS': 60
+}
+
+# Stream MJPEG: tiers de resolução/qualidade pedidos em /video_feed?tier=
+# (ver app/detection/encoding.py); WIDTH None = resolução da câmera
+STREAM_SETTINGS = {
+    'TIERS': {
+        'high': {'WIDTH': None, 'QUALITY': 90},
+        'medium': {'WIDTH': 640, 'QUALITY': 75},
+        'low': {'WIDTH': 320, 'QUALITY': 60}
+    },
+    'DEFAULT_TIER': 'high',     # codificado sempre (clips e processos)
+    'TURBOJPEG': True,          # usar PyTurboJPEG se estiver instalado
+    'MAX_CLIENT_FPS': 30        # limite de ?fps= por cliente
+}
+
+# Servidor de desenvolvimento (python run.py); em produção, usar asgi.py.
+# O reloader corre a app em dois processos (modelos e câmeras em dobro)
+SERVER_SETTINGS = {
+    'HOST': '127.0.0.1',
+    'PORT': 5000,
+    'DEBUG': False,
+    'USE_RELOADER': False,
+    'ALLOW_UNSAFE_WERKZEUG': False  # Werkzeug fora de um terminal interativo
+}
+
+# Canal de push (Socket.IO) para o dashboard (ver app/templates/sockets.py)
+PUSH_SETTINGS = {
+    'ASYNC_MODE': 'threading',  # modo do Flask-SocketIO
+    'QUEUE_SIZE': 1000,         # eventos pendentes antes de descartar
+    'STATS_INTERVAL': 1.0       # segundos entre diferenças de estatísticas
+}
+
+# Registo de câmeras e supervisor (ver app/detection/cameras.py)
+CAMERA_SETTINGS = {
+    'MODE': 'threads',          # 'threads' (um processo) ou 'processes'
+    'FILE': 'cameras.json',     # registo opcional; substitui CAMERAS
+    'CAMERAS': [
+        {'ID': 'default', 'SOURCE': VIDEO_SOURCE}
+    ],
+    'START_METHOD': 'spawn',    # método de arranque dos processos
+    'MAX_JPEG_BYTES': 2 * 1024 * 1024,  # tamanho do slot partilhado
+    'STATUS_INTERVAL': 0.5,     # segundos entre envios de estado
+    'RESTART_BACKOFF': 1.0,     # espera inicial antes de reiniciar
+    'MAX_RESTART_BACKOFF': 30.0,
+    'STOP_TIMEOUT': 15.0        # espera ao parar (clips ainda por gravar)
+}
@@ -1,4 +1,3 @@
-from app import create_app
 import sys
 import os
 
@@ -7,8 +6,20 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 sys.path.append(os.path.join(current_dir, 'app'))
 
+from app import create_app  # noqa: E402
+
+
+def main():
+    # A app (e o supervisor das câmeras) só é criada aqui: os processos
+    # filhos arrancados com spawn reimportam este módulo como __mp_main__
+    from app.templates.sockets import socketio
+    app = create_app()
+    settings = app.config['SERVER_SETTINGS']
+    socketio.run(app, host=settings['HOST'], port=settings['PORT'],
+                 debug=settings['DEBUG'],
+                 use_reloader=settings['USE_RELOADER'],
+                 allow_unsafe_werkzeug=settings['ALLOW_UNSAFE_WERKZEUG'])
 
-app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    main()
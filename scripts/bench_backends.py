@@ -0,0 +1,162 @@
+"""Compara backends/tiers do detetor em FPS e concordância com a referência
+
+Cada configuração é 'backend:tier:precisão'. A referência (por omissão
+ultralytics:x:fp32, o modelo atual) define as deteções "verdadeiras";
+para cada configuração reporta-se precisão/recall de pessoas e móveis
+contra essa referência, a diferença de F1 e a velocidade.
+
+Uso:
+    python scripts/bench_backends.py --source video.mp4 --frames 200 \\
+        --configs ultralytics:n:fp32 onnxruntime:s:fp32 openvino:s:int8
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Permitir executar a partir da raiz do repositório
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from app.detection.backends import create_backend  # noqa: E402
+from app.detection.tracker import box_iou  # noqa: E402
+
+PERSON_CLASS = 0
+FURNITURE_CLASSES = (56, 57, 59, 60)
+
+
+def load_frames(source, limit):
+    """Descodifica os frames antes de medir, para não contar o decode"""
+    if os.path.isdir(source):
+        paths = sorted(glob.glob(os.path.join(source, '*.jpg')) +
+                       glob.glob(os.path.join(source, '*.png')))[:limit]
+        return [cv2.imread(p) for p in paths]
+
+    cap = cv2.VideoCapture(source)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def parse_config(text):
+    backend, tier, precision = text.split(':')
+    return {'BACKEND': backend, 'TIER': tier, 'PRECISION': precision}
+
+
+def select(detections, classes, min_conf):
+    xyxy, conf, cls = detections
+    mask = np.isin(cls, classes) & (conf > min_conf)
+    return xyxy[mask]
+
+
+def match_counts(predicted, reference, iou_threshold=0.5):
+    """Verdadeiros positivos por associação gulosa com IoU >= limiar"""
+    if len(predicted) == 0 or len(reference) == 0:
+        return 0
+    iou = box_iou(predicted, reference)
+    matches = 0
+    while iou.size and iou.max() >= iou_threshold:
+        r, c = np.unravel_index(iou.argmax(), iou.shape)
+        matches += 1
+        iou[r, :] = -1
+        iou[:, c] = -1
+    return matches
+
+
+def agreement(outputs, reference, classes, min_conf):
+    tp = fp = fn = 0
+    for predicted, expected in zip(outputs, reference):
+        predicted = select(predicted, classes, min_conf)
+        expected = select(expected, classes, min_conf)
+        matched = match_counts(predicted, expected)
+        tp += matched
+        fp += len(predicted) - matched
+        fn += len(expected) - matched
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    f1 = (2 * precision * recall / (precision + recall)
+          if precision + recall else 0.0)
+    return {'precision': round(precision, 3), 'recall': round(recall, 3),
+            'f1': round(f1, 3)}
+
+
+def run_backend(config, frames, warmup):
+    backend = create_backend(config)
+    for frame in frames[:warmup]:
+        backend.predict(frame)
+
+    outputs, latencies = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        outputs.append(backend.predict(frame))
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return outputs, {
+        'fps': round(1000 / latencies.mean(), 2),
+        'latency_ms_mean': round(float(latencies.mean()), 1),
+        'latency_ms_p95': round(float(np.percentile(latencies, 95)), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', required=True,
+                        help='ficheiro de vídeo ou pasta de imagens')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--reference', default='ultralytics:x:fp32')
+    parser.add_argument('--configs', nargs='+', required=True)
+    parser.add_argument('--min-conf', type=float, default=0.5)
+    parser.add_argument('--json', help='guardar o relatório neste ficheiro')
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames)
+    if not frames:
+        raise SystemExit(f"No frames read from {args.source}")
+
+    print(f"Reference {args.reference} on {len(frames)} frames...")
+    reference, reference_speed = run_backend(
+        parse_config(args.reference), frames, args.warmup)
+
+    report = {'reference': dict(config=args.reference, **reference_speed),
+              'results': []}
+    for text in args.configs:
+        print(f"Running {text}...")
+        outputs, speed = run_backend(parse_config(text), frames, args.warmup)
+        person = agreement(outputs, reference, [PERSON_CLASS], args.min_conf)
+        furniture = agreement(outputs, reference, FURNITURE_CLASSES,
+                              args.min_conf)
+        report['results'].append(dict(
+            config=text, **speed, person=person, furniture=furniture,
+            person_f1_delta=round(person['f1'] - 1.0, 3),
+            speedup=round(speed['fps'] / reference_speed['fps'], 2)))
+
+    print(f"\n{'config':<24} {'fps':>8} {'p95 ms':>8} {'speedup':>8} "
+          f"{'person P':>9} {'person R':>9} {'furn. F1':>9}")
+    print(f"{args.reference:<24} {reference_speed['fps']:>8.2f} "
+          f"{reference_speed['latency_ms_p95']:>8.1f} {1.0:>8.2f} "
+          f"{1.0:>9.3f} {1.0:>9.3f} {1.0:>9.3f}")
+    for result in report['results']:
+        print(f"{result['config']:<24} {result['fps']:>8.2f} "
+              f"{result['latency_ms_p95']:>8.1f} {result['speedup']:>8.2f} "
+              f"{result['person']['precision']:>9.3f} "
+              f"{result['person']['recall']:>9.3f} "
+              f"{result['furniture']['f1']:>9.3f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
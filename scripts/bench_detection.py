@@ -0,0 +1,160 @@
+"""Benchmark da latência por frame em função do número de pessoas
+
+O pipeline completo corre sem alertas, registo de eventos nem clips
+(`live=False`) e, por omissão, sem o filtro de movimento nem o modo ROI,
+cuja poupança depende do movimento na cena e não do número de pessoas;
+`--motion-gate` e `--roi` ligam-nos para os medir à parte.
+
+Uso:
+    python scripts/bench_detection.py                 # apenas associação de móveis
+    python scripts/bench_detection.py --source video.mp4 --frames 300
+    python scripts/bench_detection.py --source video.mp4 --motion-gate --roi
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+# Permitir executar a partir da raiz do repositório
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from app.detection.utils import match_furniture  # noqa: E402
+
+FURNITURE_CLASSES = {56: 'chair', 57: 'couch', 59: 'bed', 60: 'dining table'}
+
+
+def random_boxes(rng, n, width=640, height=480):
+    x1 = rng.integers(0, width - 100, n)
+    y1 = rng.integers(0, height - 100, n)
+    w = rng.integers(40, 100, n)
+    h = rng.integers(60, 100, n)
+    return np.stack([x1, y1, x1 + w, y1 + h], axis=1).astype(np.float32)
+
+
+def legacy_match(person_boxes, furniture_boxes, furniture_cls):
+    """Associação original: um laço Python por pessoa e por móvel"""
+    result = []
+    for px1, py1, px2, py2 in person_boxes.astype(int):
+        person_center = (px1 + px2) / 2
+        nearby = []
+        for (x1, y1, x2, y2), cls_id in zip(furniture_boxes.astype(int),
+                                            furniture_cls):
+            distance = abs(person_center - (x1 + x2) / 2)
+            if distance < (x2 - x1) * 0.7 and abs(py2 - y1) < 50:
+                nearby.append({'type': FURNITURE_CLASSES[int(cls_id)],
+                               'distance': distance})
+        result.append(sorted(nearby, key=lambda x: x['distance']))
+    return result
+
+
+def bench_matching(people_counts, furniture_count, repeats):
+    rng = np.random.default_rng(0)
+    furniture_boxes = random_boxes(rng, furniture_count)
+    furniture_cls = rng.choice(list(FURNITURE_CLASSES), furniture_count)
+
+    print(f"\nFurniture matching ({furniture_count} furniture boxes, "
+          f"{repeats} repeats)")
+    print(f"{'people':>8} {'legacy ms':>12} {'vectorized ms':>15}")
+    for n in people_counts:
+        person_boxes = random_boxes(rng, n)
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            legacy_match(person_boxes, furniture_boxes, furniture_cls)
+        legacy = (time.perf_counter() - start) / repeats * 1000
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            match_furniture(person_boxes, furniture_boxes, furniture_cls,
+                            FURNITURE_CLASSES)
+        vectorized = (time.perf_counter() - start) / repeats * 1000
+
+        print(f"{n:>8} {legacy:>12.3f} {vectorized:>15.3f}")
+
+
+def bench_pipeline(source, max_frames, motion_gate=False, roi=False):
+    """Corre o detector completo e agrupa a latência pelo nº de pessoas"""
+    import cv2
+    from app.detection.utils import ROI_SETTINGS, FallDetector
+
+    ROI_SETTINGS['ENABLED'] = roi
+    detector = FallDetector('bench', live=False)
+    if not motion_gate:
+        detector.motion_gate = None
+    detector.load_models()
+
+    # Contar inferências YOLO por frame: passagens no frame inteiro
+    # (predict) e nos recortes dos tracks (predict_batch). O predict base
+    # chama predict_batch; essa chamada interna não conta outra vez
+    calls = {'count': 0, 'depth': 0}
+
+    def counted(method):
+        def wrapper(*args, **kwargs):
+            if not calls['depth']:
+                calls['count'] += 1
+            calls['depth'] += 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                calls['depth'] -= 1
+        return wrapper
+
+    detector.model.predict = counted(detector.model.predict)
+    detector.model.predict_batch = counted(detector.model.predict_batch)
+
+    cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    latencies = defaultdict(list)
+    inferences = defaultdict(list)
+    frames = 0
+
+    while frames < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        calls['count'] = 0
+        start = time.perf_counter()
+        detector.detect_fall(frame)
+        elapsed = (time.perf_counter() - start) * 1000
+        people = sum(1 for track in detector.people_tracking.values()
+                     if time.time() - track.last_seen < 1.0)
+        latencies[people].append(elapsed)
+        inferences[people].append(calls['count'])
+        frames += 1
+
+    cap.release()
+
+    print(f"\nFull pipeline on {source} ({frames} frames, motion gate "
+          f"{'on' if motion_gate else 'off'}, ROI {'on' if roi else 'off'})")
+    print(f"{'people':>8} {'frames':>8} {'mean ms':>10} {'p95 ms':>10} "
+          f"{'yolo/frame':>12}")
+    for people in sorted(latencies):
+        values = np.array(latencies[people])
+        print(f"{people:>8} {len(values):>8} {values.mean():>10.1f} "
+              f"{np.percentile(values, 95):>10.1f} "
+              f"{np.mean(inferences[people]):>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', help='ficheiro de vídeo ou índice da câmara')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--furniture', type=int, default=6)
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--motion-gate', action='store_true',
+                        help='saltar frames parados (MOTION_SETTINGS)')
+    parser.add_argument('--roi', action='store_true',
+                        help='detetar só à volta dos tracks (ROI_SETTINGS)')
+    args = parser.parse_args()
+
+    bench_matching([1, 2, 3, 5, 10, 20], args.furniture, args.repeats)
+
+    if args.source:
+        bench_pipeline(args.source, args.frames, args.motion_gate, args.roi)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Benchmark da pontuação de quedas com 1, 10 e 50 tracks
+
+Compara o antigo FallDetector.is_falling (landmarks um a um, aritmética
+escalar por pessoa) com features.score_falls sobre landmarks sintéticos,
+e confirma que ambos dão o mesmo veredicto e a mesma pontuação.
+
+Uso:
+    python scripts/bench_scoring.py --frames 500
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Permitir executar a partir da raiz do repositório
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from app.detection.features import (  # noqa: E402
+    LEFT_ANKLE, LEFT_HIP, LEFT_SHOULDER, NOSE, NUM_LANDMARKS, RIGHT_ANKLE,
+    RIGHT_HIP, RIGHT_SHOULDER, furniture_features, score_falls)
+from app.detection.pose import Landmark, PoseLandmarks  # noqa: E402
+
+HEIGHT = 480
+
+
+def legacy_is_falling(pose_landmarks, prev_nose=None, nearby_furniture=None):
+    """Reprodução do antigo is_falling (com a altura do frame definida)"""
+    lm = pose_landmarks.landmark
+    nose, ls, rs = lm[NOSE], lm[LEFT_SHOULDER], lm[RIGHT_SHOULDER]
+    lh, rh = lm[LEFT_HIP], lm[RIGHT_HIP]
+    mid_shoulder = (ls.y + rs.y) / 2
+    mid_hip = (lh.y + rh.y) / 2
+    mid_ankle = (lm[LEFT_ANKLE].y + lm[RIGHT_ANKLE].y) / 2
+    on_rest = any(f['type'] in ['couch', 'bed'] for f in (nearby_furniture or []))
+
+    ground_score = 0
+    near = 0
+    for part in (nose, ls, rs):
+        if abs(part.y - mid_ankle) < 0.3:
+            near += 1
+            ground_score += 20
+
+    for furniture in nearby_furniture or []:
+        if furniture['type'] in ['couch', 'bed']:
+            if abs(mid_hip - furniture['box'][1] / HEIGHT) < 0.2:
+                if prev_nose is None or abs(nose.y - prev_nose) < 0.04:
+                    return False, 0
+
+    if prev_nose is not None and abs(nose.y - prev_nose) > 0.05 and \
+            not on_rest:
+        ground_score += 35
+        if abs(nose.y - mid_ankle) < 0.3:
+            ground_score += 25
+
+    if abs(mid_shoulder - mid_hip) < 0.15 and not nearby_furniture:
+        ground_score += 30
+        if (mid_shoulder + mid_hip) / 2 - mid_ankle < 0.2:
+            ground_score += 25
+
+    if abs(ls.y - rs.y) > 0.1 or abs(lh.y - rh.y) > 0.1:
+        ground_score += 15
+
+    is_fall = (ground_score > 70 and near >= 2 and not on_rest and
+               abs(nose.y - mid_ankle) < 0.3)
+    return is_fall, ground_score
+
+
+def random_scene(rng, count):
+    """Landmarks, nariz anterior e móveis de `count` pessoas (metade caída)"""
+    landmarks = rng.uniform(0, 1, (count, NUM_LANDMARKS, 4)).astype(np.float32)
+    lying = rng.random(count) < 0.5
+    landmarks[lying, :, 1] = rng.uniform(0.7, 0.9, (lying.sum(), NUM_LANDMARKS))
+    prev_nose = np.where(rng.random(count) < 0.8,
+                         landmarks[:, NOSE, 1] - rng.normal(0, 0.1, count),
+                         np.nan).astype(np.float32)
+    furniture = []
+    for _ in range(count):
+        nearby = []
+        if rng.random() < 0.3:
+            nearby.append({'type': rng.choice(['couch', 'bed', 'chair']),
+                           'box': (0, rng.uniform(0, HEIGHT), 100, HEIGHT)})
+        furniture.append(nearby)
+    return landmarks, prev_nose, furniture
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'tracks':>8} {'legacy ms':>12} {'vector ms':>12} {'agree':>8}")
+    for count in (1, 10, 50):
+        rng = np.random.default_rng(count)
+        scenes = [random_scene(rng, count) for _ in range(args.frames)]
+        legacy_time = vector_time = 0.0
+        agree = True
+        for landmarks, prev_nose, furniture in scenes:
+            poses = [PoseLandmarks([Landmark(*lm) for lm in person])
+                     for person in landmarks]
+            start = time.perf_counter()
+            legacy = [legacy_is_falling(
+                pose, None if np.isnan(prev) else float(prev), nearby)
+                for pose, prev, nearby in zip(poses, prev_nose, furniture)]
+            legacy_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            rest_tops, has_furniture = furniture_features(furniture, HEIGHT)
+            is_fall, score = score_falls(landmarks, prev_nose, rest_tops,
+                                         has_furniture)
+            vector_time += time.perf_counter() - start
+
+            agree &= [f for f, _ in legacy] == is_fall.tolist() and \
+                [s for _, s in legacy] == score.tolist()
+        print(f"{count:>8} {legacy_time / args.frames * 1000:>12.3f} "
+              f"{vector_time / args.frames * 1000:>12.3f} {str(agree):>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+"""Avaliação offline do detetor de quedas sobre vídeos gravados
+
+Corre cada vídeo (ou pasta de imagens) pelo mesmo pipeline do servidor,
+no relógio do próprio vídeo e mais rápido que o tempo real, em processos
+paralelos. Reporta precisão/recall de eventos de queda, tempo até ao
+alerta e latência por etapa (decode, detect, pose, rules, encode) em JSON.
+
+Rótulos (por ordem de prioridade):
+  * --labels ficheiro CSV `nome,inicio_s,fim_s` (sem tempos = sem queda)
+    ou JSON {"nome": [[inicio_s, fim_s], ...]};
+  * anotação Le2i ao lado do vídeo (<nome>.txt ou
+    ../Annotation_files/<nome>.txt): frames de início e fim nas 2 linhas;
+  * --name-labels: nomes começados por 'fall' são quedas sem intervalo
+    (UR Fall: fall-01-cam0-rgb vs adl-01-cam0-rgb).
+
+Uso:
+    python scripts/evaluate.py datasets/le2i/*/Videos --workers 4 \\
+        --json results/eval.json
+    python scripts/evaluate.py datasets/urfall --name-labels --fps 30
+"""
+import argparse
+import csv
+import glob
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import numpy as np
+
+# Permitir executar a partir da raiz do repositório
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+# 'yolo' faz parte de 'detect' e 'is_falling' de 'rules'
+STAGES = ('decode', 'detect', 'yolo', 'pose', 'rules', 'is_falling', 'encode')
+
+
+def find_inputs(paths):
+    """Vídeos e pastas de imagens (uma sequência por pasta)"""
+    inputs = []
+    for path in paths:
+        if os.path.isfile(path):
+            inputs.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            files = sorted(files)
+            inputs.extend(os.path.join(root, f) for f in files
+                          if f.lower().endswith(VIDEO_EXTENSIONS))
+            if any(f.lower().endswith(IMAGE_EXTENSIONS) for f in files):
+                inputs.append(root)
+    return inputs
+
+
+def sequence_name(path):
+    return os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+
+
+def load_label_file(path):
+    if path.endswith('.json'):
+        with open(path) as f:
+            return {name: [tuple(i) for i in intervals]
+                    for name, intervals in json.load(f).items()}
+    labels = {}
+    with open(path) as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith('#') or row[0] == 'name':
+                continue
+            intervals = labels.setdefault(row[0], [])
+            if len(row) >= 3 and row[1] and row[2]:
+                intervals.append((float(row[1]), float(row[2])))
+    return labels
+
+
+def le2i_label(path, fps):
+    """Intervalo de queda das anotações Le2i (frames -> segundos)"""
+    name = sequence_name(path)
+    folder = os.path.dirname(path)
+    for candidate in (os.path.join(folder, f"{name}.txt"),
+                      os.path.join(folder, '..', 'Annotation_files',
+                                   f"{name}.txt")):
+        if os.path.exists(candidate):
+            with open(candidate) as f:
+                lines = [line.strip() for line in f]
+            try:
+                start, end = int(lines[0]), int(lines[1])
+            except (IndexError, ValueError):
+                return None
+            return [] if start == end == 0 else [(start / fps, end / fps)]
+    return None
+
+
+def iter_frames(path, fps):
+    """(tempo_s, frame, segundos de decode) no relógio do vídeo"""
+    import cv2
+
+    if os.path.isdir(path):
+        images = sorted(p for p in glob.glob(os.path.join(path, '*'))
+                        if p.lower().endswith(IMAGE_EXTENSIONS))
+        for index, image in enumerate(images):
+            start = time.perf_counter()
+            frame = cv2.imread(image)
+            yield index / fps, frame, time.perf_counter() - start
+        return
+
+    cap = cv2.VideoCapture(path)
+    index = 0
+    try:
+        while True:
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            elapsed = time.perf_counter() - start
+            if not ret:
+                return
+            yield index / fps, frame, elapsed
+            index += 1
+    finally:
+        cap.release()
+
+
+def video_fps(path, default):
+    if os.path.isdir(path):
+        return default
+    import cv2
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    return fps if fps and fps < 1000 else default
+
+
+_detector = None
+
+
+def init_worker():
+    """Modelos carregados uma vez por processo e reutilizados entre vídeos"""
+    global _detector
+    from app.detection.utils import FallDetector
+    _detector = FallDetector('evaluation', live=False)
+    _detector.load_models()
+
+
+def run_sequence(job):
+    from app.detection.encoding import encode_default_tier
+    from app.detection.render import OverlayRenderer
+
+    path, fps, encode = job
+    detector = _detector
+    detector.reset()
+    renderer = OverlayRenderer()
+    alerts = []
+    current = {'time': 0.0}
+
+    def listener(person_id):
+        alerts.append(current['time'])
+
+    detector.fall_listeners.append(listener)
+
+    timings = {stage: [] for stage in STAGES}
+    frames = 0
+    error = None
+    started = time.perf_counter()
+    try:
+        for video_time, frame, decode in iter_frames(path, fps):
+            if frame is None:
+                continue
+            current['time'] = video_time
+            detector.detect_fall(frame, now=video_time)
+            timings['decode'].append(decode)
+            for stage, value in detector.last_timings.items():
+                timings.setdefault(stage, []).append(value)
+            if encode:
+                start = time.perf_counter()
+                encode_default_tier(
+                    renderer.render(frame, detector.last_result))
+                timings['encode'].append(time.perf_counter() - start)
+            frames += 1
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        detector.fall_listeners.remove(listener)
+
+    return {
+        'path': path,
+        'name': sequence_name(path),
+        'frames': frames,
+        'duration_s': round(frames / fps, 2),
+        'wall_s': round(time.perf_counter() - started, 3),
+        'alerts_s': [round(t, 2) for t in alerts],
+        'timings': {stage: values for stage, values in timings.items()
+                    if values},
+        'error': error
+    }
+
+
+def score(result, intervals, tolerance):
+    """Associa alertas a intervalos de queda: (tp, fp, fn, tempos até alerta)
+
+    `intervals` None = rótulo desconhecido (não pontuado); intervalos
+    (None, None) = queda sem tempos (apenas conta se houve alerta).
+    """
+    if intervals is None:
+        return None
+    alerts = list(result['alerts_s'])
+    tp, delays = 0, []
+    for start, end in intervals:
+        if start is None:
+            hit = alerts[0] if alerts else None
+        else:
+            hit = next((t for t in alerts
+                        if start - tolerance <= t <= end + tolerance), None)
+        if hit is None:
+            continue
+        tp += 1
+        alerts.remove(hit)
+        if start is not None:
+            delays.append(hit - start)
+    fn = len(intervals) - tp
+    return tp, len(alerts), fn, delays
+
+
+def summary(values):
+    values = np.array(values) * 1000
+    if not len(values):
+        return None
+    return {'mean': round(float(values.mean()), 2),
+            'p95': round(float(np.percentile(values, 95)), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+',
+                        help='vídeos, pastas de imagens ou pastas a percorrer')
+    parser.add_argument('--labels', help='rótulos CSV ou JSON')
+    parser.add_argument('--name-labels', action='store_true',
+                        help="sequências 'fall*' são quedas (UR Fall)")
+    parser.add_argument('--fps', type=float, default=30.0,
+                        help='FPS das pastas de imagens ou vídeos sem FPS')
+    parser.add_argument('--workers', type=int, default=max(1, os.cpu_count() // 2))
+    parser.add_argument('--tolerance', type=float, default=10.0,
+                        help='segundos aceites fora do intervalo rotulado')
+    parser.add_argument('--no-encode', action='store_true',
+                        help='não medir a codificação JPEG')
+    parser.add_argument('--json', help='guardar o relatório neste ficheiro')
+    args = parser.parse_args()
+
+    inputs = find_inputs(args.paths)
+    if not inputs:
+        raise SystemExit("No videos or image folders found")
+    labels = load_label_file(args.labels) if args.labels else {}
+
+    jobs, fps_by_path = [], {}
+    for path in inputs:
+        fps = fps_by_path[path] = video_fps(path, args.fps)
+        jobs.append((path, fps, not args.no_encode))
+
+    print(f"Evaluating {len(jobs)} sequences with {args.workers} workers...")
+    started = time.perf_counter()
+    ctx = mp.get_context('spawn')
+    with ctx.Pool(args.workers, initializer=init_worker) as pool:
+        results = []
+        for result in pool.imap_unordered(run_sequence, jobs):
+            status = result['error'] or f"alerts at {result['alerts_s']}"
+            print(f"  {result['name']}: {result['frames']} frames in "
+                  f"{result['wall_s']:.1f}s, {status}")
+            results.append(result)
+    wall = time.perf_counter() - started
+    results.sort(key=lambda r: r['path'])
+
+    tp = fp = fn = 0
+    delays, unlabeled = [], 0
+    stage_values = {stage: [] for stage in STAGES}
+    for result in results:
+        name = result['name']
+        if name in labels:
+            intervals = labels[name]
+        else:
+            intervals = le2i_label(result['path'], fps_by_path[result['path']])
+            if intervals is None and args.name_labels:
+                intervals = ([(None, None)] if name.lower().startswith('fall')
+                             else [])
+        scored = score(result, intervals, args.tolerance)
+        for stage, values in result.pop('timings').items():
+            stage_values.setdefault(stage, []).extend(values)
+        if scored is None:
+            unlabeled += 1
+            result['label'] = None
+            continue
+        result['label'] = intervals
+        result['tp'], result['fp'], result['fn'], file_delays = scored
+        tp, fp, fn = tp + result['tp'], fp + result['fp'], fn + result['fn']
+        delays.extend(file_delays)
+
+    precision = tp / (tp + fp) if tp + fp else None
+    recall = tp / (tp + fn) if tp + fn else None
+    f1 = (2 * precision * recall / (precision + recall)
+          if precision and recall else None)
+    frames = sum(r['frames'] for r in results)
+    duration = sum(r['duration_s'] for r in results)
+    report = {
+        'sequences': len(results),
+        'unlabeled': unlabeled,
+        'errors': sum(1 for r in results if r['error']),
+        'frames': frames,
+        'wall_s': round(wall, 2),
+        'fps': round(frames / wall, 2) if wall else None,
+        'realtime_factor': round(duration / wall, 2) if wall else None,
+        'tp': tp, 'fp': fp, 'fn': fn,
+        'precision': round(precision, 3) if precision is not None else None,
+        'recall': round(recall, 3) if recall is not None else None,
+        'f1': round(f1, 3) if f1 is not None else None,
+        'time_to_alert_s': {
+            'mean': round(float(np.mean(delays)), 2),
+            'p50': round(float(np.percentile(delays, 50)), 2),
+            'p95': round(float(np.percentile(delays, 95)), 2)
+        } if delays else None,
+        'latency_ms': {stage: summary(values)
+                       for stage, values in stage_values.items()}
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or '.', exist_ok=True)
+        with open(args.json, 'w') as f:
+            json.dump({'summary': report, 'sequences': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
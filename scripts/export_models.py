@@ -0,0 +1,138 @@
+"""Exporta e quantiza o detetor YOLO11 para ONNX Runtime e OpenVINO
+
+Gera, em MODEL_SETTINGS['EXPORT_DIR'], os ficheiros esperados por
+app.detection.backends.model_path para cada tier/backend/precisão.
+
+Uso:
+    python scripts/export_models.py --tiers n s m x --backends onnxruntime openvino
+    python scripts/export_models.py --tiers s --int8 --calib datasets/calib_images
+    python scripts/export_models.py --tiers s --dynamic  # lotes > 1 (batching)
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+
+import cv2
+import numpy as np
+
+# Permitir executar a partir da raiz do repositório
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from config import MODEL_SETTINGS  # noqa: E402
+from app.detection.backends import (  # noqa: E402
+    MODEL_TIERS, letterbox, model_path)
+
+IMAGE_PATTERNS = ('*.jpg', '*.jpeg', '*.png', '*.bmp')
+
+
+def calibration_images(folder, imgsz, limit):
+    """Imagens de calibração já no formato de entrada do grafo"""
+    paths = sorted(p for pattern in IMAGE_PATTERNS
+                   for p in glob.glob(os.path.join(folder, pattern)))[:limit]
+    if not paths:
+        raise SystemExit(f"No calibration images found in {folder}")
+    for path in paths:
+        image, _, _ = letterbox(cv2.imread(path), imgsz)
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        yield (image.transpose(2, 0, 1)[None].astype(np.float32) / 255.0)
+
+
+def export_onnx(yolo, tier, imgsz, export_dir, dynamic=False):
+    exported = yolo.export(format='onnx', imgsz=imgsz, dynamic=dynamic,
+                           simplify=True)
+    target = model_path('onnxruntime', tier, 'fp32', export_dir)
+    shutil.move(exported, target)
+    print(f"  onnxruntime fp32 -> {target}")
+    return target
+
+
+def quantize_onnx(tier, fp32_path, imgsz, export_dir, calib, calib_limit):
+    """INT8 estático (com calibração) ou dinâmico (sem imagens)"""
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic,
+        quantize_static)
+
+    target = model_path('onnxruntime', tier, 'int8', export_dir)
+    if calib:
+        class Reader(CalibrationDataReader):
+            def __init__(self):
+                import onnxruntime as ort
+                session = ort.InferenceSession(
+                    fp32_path, providers=['CPUExecutionProvider'])
+                self.input_name = session.get_inputs()[0].name
+                self.images = calibration_images(calib, imgsz, calib_limit)
+
+            def get_next(self):
+                image = next(self.images, None)
+                return None if image is None else {self.input_name: image}
+
+        quantize_static(fp32_path, target, Reader(),
+                        quant_format=QuantFormat.QDQ,
+                        activation_type=QuantType.QUInt8,
+                        weight_type=QuantType.QInt8)
+    else:
+        quantize_dynamic(fp32_path, target, weight_type=QuantType.QUInt8)
+    print(f"  onnxruntime int8 -> {target}")
+
+
+def export_openvino(yolo, tier, imgsz, export_dir, int8, data,
+                    dynamic=False):
+    precision = 'int8' if int8 else 'fp32'
+    kwargs = {'format': 'openvino', 'imgsz': imgsz, 'dynamic': dynamic}
+    if int8:
+        # O ultralytics calibra com o NNCF usando o dataset YAML indicado
+        kwargs.update(int8=True, data=data)
+    exported = yolo.export(**kwargs)
+    target = os.path.dirname(model_path('openvino', tier, precision,
+                                        export_dir))
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    shutil.move(exported, target)
+    print(f"  openvino {precision} -> {target}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tiers', nargs='+', default=['n', 's', 'm', 'x'],
+                        choices=MODEL_TIERS)
+    parser.add_argument('--backends', nargs='+',
+                        default=['onnxruntime', 'openvino'],
+                        choices=['onnxruntime', 'openvino'])
+    parser.add_argument('--imgsz', type=int, default=MODEL_SETTINGS['IMGSZ'])
+    parser.add_argument('--export-dir', default=MODEL_SETTINGS['EXPORT_DIR'])
+    parser.add_argument('--int8', action='store_true',
+                        help='gerar também as variantes INT8')
+    parser.add_argument('--dynamic', action='store_true',
+                        help='eixo de lote dinâmico (inferência em lotes)')
+    parser.add_argument('--calib',
+                        help='pasta de imagens para calibração INT8 do ONNX')
+    parser.add_argument('--calib-limit', type=int, default=200)
+    parser.add_argument('--data', default='coco128.yaml',
+                        help='dataset YAML para calibração INT8 do OpenVINO')
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    os.makedirs(args.export_dir, exist_ok=True)
+    for tier in args.tiers:
+        print(f"yolo11{tier}:")
+        yolo = YOLO(model_path('ultralytics', tier))
+        if 'onnxruntime' in args.backends:
+            fp32_path = export_onnx(yolo, tier, args.imgsz, args.export_dir,
+                                    args.dynamic)
+            if args.int8:
+                quantize_onnx(tier, fp32_path, args.imgsz, args.export_dir,
+                              args.calib, args.calib_limit)
+        if 'openvino' in args.backends:
+            export_openvino(yolo, tier, args.imgsz, args.export_dir,
+                            False, args.data, args.dynamic)
+            if args.int8:
+                export_openvino(yolo, tier, args.imgsz, args.export_dir,
+                                True, args.data, args.dynamic)
+
+
+if __name__ == '__main__':
+    main()
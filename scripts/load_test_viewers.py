@@ -0,0 +1,139 @@
+"""Teste de carga do /video_feed com centenas de viewers simultâneos
+
+Abre `--viewers` ligações MJPEG (asyncio, sem uma thread por viewer no
+cliente), conta os frames recebidos por cada uma durante `--duration`
+segundos e amostra /pipeline_stats no servidor. Serve para comparar o
+servidor Flask (run.py) com o modo ASGI (asgi.py).
+
+Uso:
+    uvicorn asgi:app --port 5000 &
+    python scripts/load_test_viewers.py --viewers 300 --duration 20
+    python scripts/load_test_viewers.py --url http://127.0.0.1:5000/video_feed?tier=low
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+BOUNDARY = b'--frame'
+
+
+class Viewer:
+    __slots__ = ('frames', 'bytes', 'error', 'first_frame')
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+        self.error = None
+        self.first_frame = None
+
+
+async def http_get(url, stream=False):
+    """GET simples sobre asyncio; retorna (reader, writer, status)"""
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname,
+                                                   parts.port or 80)
+    path = parts.path + ('?' + parts.query if parts.query else '')
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+                 f"Connection: {'keep-alive' if stream else 'close'}"
+                 f"\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    while (await reader.readline()) not in (b'\r\n', b''):
+        pass
+    return reader, writer, status
+
+
+async def watch(url, viewer, deadline, start):
+    try:
+        reader, writer, status = await http_get(url, stream=True)
+        if status != 200:
+            raise RuntimeError(f"HTTP {status}")
+        tail = b''
+        while time.monotonic() < deadline:
+            chunk = await asyncio.wait_for(
+                reader.read(65536), deadline - time.monotonic())
+            if not chunk:
+                raise RuntimeError('connection closed')
+            viewer.bytes += len(chunk)
+            # A fronteira pode vir partida entre dois blocos
+            data = tail + chunk
+            found = data.count(BOUNDARY)
+            if found and viewer.first_frame is None:
+                viewer.first_frame = time.monotonic() - start
+            viewer.frames += found
+            tail = data[-(len(BOUNDARY) - 1):]
+        writer.close()
+    except asyncio.TimeoutError:
+        pass
+    except (OSError, RuntimeError, ValueError, IndexError) as e:
+        viewer.error = str(e) or type(e).__name__
+
+
+async def sample_stats(url, deadline, samples):
+    while time.monotonic() < deadline:
+        try:
+            reader, writer, status = await http_get(url)
+            body = await reader.read()
+            writer.close()
+            if status == 200:
+                samples.append(json.loads(body))
+        except (OSError, ValueError):
+            pass
+        await asyncio.sleep(1.0)
+
+
+async def run(args):
+    parts = urlsplit(args.url)
+    stats_url = f"{parts.scheme}://{parts.netloc}/pipeline_stats"
+    start = time.monotonic()
+    deadline = start + args.duration
+    viewers = [Viewer() for _ in range(args.viewers)]
+    samples = []
+    tasks = []
+    for viewer in viewers:
+        tasks.append(asyncio.create_task(watch(args.url, viewer, deadline,
+                                               start)))
+        # Ligações escalonadas para não rebentar o backlog do socket
+        await asyncio.sleep(args.ramp / max(1, args.viewers))
+    tasks.append(asyncio.create_task(sample_stats(stats_url, deadline,
+                                                  samples)))
+    await asyncio.gather(*tasks)
+    return viewers, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000/video_feed')
+    parser.add_argument('--viewers', type=int, default=300)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--ramp', type=float, default=2.0,
+                        help='seconds to open all connections')
+    args = parser.parse_args()
+
+    viewers, samples = asyncio.run(run(args))
+    ok = [v for v in viewers if v.error is None and v.frames]
+    failed = [v for v in viewers if v not in ok]
+    fps = sorted(v.frames / args.duration for v in ok)
+
+    print(f"viewers: {len(ok)} streaming, {len(failed)} failed")
+    if failed:
+        errors = {v.error or 'no frames' for v in failed}
+        print(f"  errors: {', '.join(sorted(errors)[:5])}")
+    if fps:
+        print(f"fps per viewer: mean {statistics.mean(fps):.1f}, "
+              f"p5 {fps[len(fps) // 20]:.1f}, max {fps[-1]:.1f}")
+        print(f"time to first frame: "
+              f"max {max(v.first_frame for v in ok):.2f}s")
+        total = sum(v.bytes for v in viewers)
+        print(f"throughput: {total / args.duration / 1e6:.1f} MB/s")
+    if samples:
+        print(f"server: clients max {max(s.get('clients', 0) for s in samples)}"
+              f", detection fps {samples[-1].get('detection_fps')}"
+              f", capture fps {samples[-1].get('capture_fps')}")
+
+
+if __name__ == '__main__':
+    main()
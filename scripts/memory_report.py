@@ -0,0 +1,99 @@
+"""Memória de N processos de deteção com pesos partilhados ou privados
+
+Arranca `--workers` processos (spawn, como o supervisor das câmeras) que
+correm o detetor configurado em MODEL_SETTINGS sobre um frame e ficam
+parados, e mostra RSS, PSS e USS de cada processo e do pai. Com
+`--mode shared` o pai carrega os pesos uma vez e envia-os aos filhos em
+memória partilhada; com `--mode private` cada filho carrega os seus. A
+soma dos PSS é a RAM realmente ocupada: partilhados, N processos devem
+custar pouco mais do que um modelo. A memória de cada filho antes de
+carregar o modelo (`bootstrap`) mostra o custo do arranque do processo,
+que não deve incluir outra cópia da app nem dos modelos.
+
+Uso:
+    python scripts/memory_report.py --workers 4 --mode shared
+    python scripts/memory_report.py --workers 4 --mode private --json mem.json
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+
+import numpy as np
+
+# Permitir executar a partir da raiz do repositório
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from app.detection.backends import (  # noqa: E402
+    create_backend, create_shared_backend)
+from app.detection.memory import (  # noqa: E402
+    memory_report, process_memory)
+
+
+def worker(model, ready, stop, bootstrap):
+    bootstrap.put(process_memory()['rss_mb'])
+    if model is None:
+        model = create_backend()
+    # Uma inferência materializa tudo o que o modelo aloca em uso
+    model.predict(np.zeros((480, 640, 3), dtype=np.uint8))
+    ready.set()
+    stop.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--mode', choices=('shared', 'private'),
+                        default='shared')
+    parser.add_argument('--json', help='save the report to this file')
+    args = parser.parse_args()
+
+    model = None
+    if args.mode == 'shared':
+        model = create_shared_backend({'SHARE_WEIGHTS': True})
+        if model is None:
+            print("Configured backend cannot share weights between "
+                  "processes; using private copies")
+
+    ctx = mp.get_context('spawn')
+    stop = ctx.Event()
+    bootstrap = ctx.Queue()
+    workers = []
+    for i in range(args.workers):
+        ready = ctx.Event()
+        process = ctx.Process(target=worker, args=(model, ready, stop, bootstrap),
+                              name=f'worker-{i}', daemon=True)
+        process.start()
+        workers.append((process, ready))
+    for process, ready in workers:
+        ready.wait()
+    bootstrap_rss = [bootstrap.get(timeout=10) for _ in workers]
+
+    processes = {'parent': os.getpid()}
+    processes.update({process.name: process.pid
+                      for process, _ in workers})
+    report = memory_report(processes)
+    stop.set()
+    for process, _ in workers:
+        process.join(timeout=10)
+
+    print(f"{'process':>10} {'rss MB':>10} {'pss MB':>10} {'uss MB':>10}")
+    for name, memory in report['processes'].items():
+        print(f"{name:>10} {memory['rss_mb']:>10} {memory['pss_mb']!s:>10} "
+              f"{memory['uss_mb']!s:>10}")
+    print(f"{'total':>10} {report['total_rss_mb']:>10} "
+          f"{report['total_pss_mb']!s:>10} {report['total_uss_mb']!s:>10}")
+    print(f"Worker RSS before loading the model: "
+          f"{max(bootstrap_rss):.1f} MB (max of {len(bootstrap_rss)})")
+
+    if args.json:
+        report.update(mode=args.mode, workers=args.workers,
+                      bootstrap_rss_mb=bootstrap_rss)
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import numpy as np
+
+from app.detection.utils import EMPTY_RESULT
+from app.detection.video import VideoSource
+
+
+class FakeSource(VideoSource):
+    """Fonte sintética; `open_errors`/`read_errors` são lançados por ordem"""
+
+    kind = 'fake'
+
+    def __init__(self, frames=None, fps=100, settings=None):
+        super().__init__('fake', dict({'RECONNECT_DELAY': 0.01,
+                                       'MAX_RECONNECT_DELAY': 0.04},
+                                      **(settings or {})))
+        self.frames = frames
+        self.fps = fps
+        self.opened = 0
+        self.read_errors = []
+        self.open_errors = []
+        self.count = 0
+
+    def open(self):
+        self.opened += 1
+        if self.open_errors:
+            raise self.open_errors.pop(0)
+
+    def read(self):
+        time.sleep(1.0 / self.fps)
+        if self.read_errors:
+            raise self.read_errors.pop(0)
+        if self.frames is not None and self.count >= self.frames:
+            self.finished = True
+            return False, None
+        self.count += 1
+        return True, np.full((48, 64, 3), self.count % 256, np.uint8)
+
+
+class FakeDetector:
+    """O mínimo de um FallDetector que o FrameBroadcaster usa
+
+    Só um em cada `analyse_every` frames corre os "modelos"; os restantes
+    são reaproveitados como pelo filtro de movimento.
+    """
+
+    def __init__(self, errors=0, analyse_every=1):
+        self.errors = errors
+        self.analyse_every = analyse_every
+        self.calls = 0
+        self.fall_listeners = []
+        self.last_result = EMPTY_RESULT
+        self.last_timings = {}
+        self._lock = threading.Lock()
+
+    def detect_fall(self, frame):
+        with self._lock:
+            self.calls += 1
+            if self.errors:
+                self.errors -= 1
+                raise RuntimeError('boom')
+            if self.calls % self.analyse_every:
+                self.last_timings = {'motion': 0.0}
+            else:
+                self.last_timings = {'motion': 0.0, 'detect': 0.0}
+
+    def get_status(self):
+        return {}
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
@@ -0,0 +1,120 @@
+import threading
+import time
+
+from app.detection.alert import AlertDispatcher
+
+from .helpers import wait_until
+
+
+class RecordingSink:
+    name = 'recording'
+
+    def __init__(self, failures=0, gate=None):
+        self.failures = failures
+        self.gate = gate
+        self.sent = []
+        self.attempts = 0
+
+    def send(self, alert):
+        self.attempts += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('sink down')
+        self.sent.append((alert, time.time()))
+
+
+def make_dispatcher(sinks, **settings):
+    settings = dict({'RECORD_EVENTS': False, 'WORKERS': 2,
+                     'RETRY_BACKOFF': 0.05}, **settings)
+    return AlertDispatcher(settings, sinks=sinks)
+
+
+def test_duplicates_and_rate_limit():
+    sink = RecordingSink()
+    dispatcher = make_dispatcher([sink], CAMERA_RATE_LIMIT=2)
+    try:
+        assert dispatcher.dispatch('fall', 'cam', 1)
+        assert not dispatcher.dispatch('fall again', 'cam', 1)
+        assert dispatcher.dispatch('fall', 'cam', 2)
+        assert not dispatcher.dispatch('fall', 'cam', 3)
+        # Limite por câmera: outra câmera não é afetada
+        assert dispatcher.dispatch('fall', 'other', 3)
+        assert dispatcher.join(timeout=5)
+        stats = dispatcher.stats()
+        assert stats['deduplicated'] == 1
+        assert stats['rate_limited'] == 1
+        assert stats['delivered'] == 3
+        assert len(sink.sent) == 3
+    finally:
+        dispatcher.stop()
+
+
+def test_dropped_alert_is_not_deduplicated():
+    gate = threading.Event()
+    sink = RecordingSink(gate=gate)
+    dispatcher = make_dispatcher([sink], QUEUE_SIZE=1)
+    try:
+        assert dispatcher.dispatch('first', 'cam', 1)
+        # Fila cheia: o alerta da pessoa 2 é descartado...
+        assert not dispatcher.dispatch('second', 'cam', 2)
+        assert dispatcher.stats()['dropped'] == 1
+        gate.set()
+        assert dispatcher.join(timeout=5)
+        # ...e pode voltar a ser enviado logo que houver lugar
+        assert dispatcher.dispatch('second', 'cam', 2)
+        assert dispatcher.join(timeout=5)
+        assert [alert.person_id for alert, _ in sink.sent] == [1, 2]
+        assert dispatcher.stats()['deduplicated'] == 0
+    finally:
+        dispatcher.stop()
+
+
+def test_dedup_state_is_pruned():
+    dispatcher = make_dispatcher([RecordingSink()], DEDUP_WINDOW=0.05,
+                                 CAMERA_RATE_LIMIT=10)
+    try:
+        for person_id in range(5):
+            assert dispatcher.dispatch('fall', 'cam', person_id)
+        time.sleep(0.1)
+        assert dispatcher.dispatch('fall', 'cam', 99)
+        assert list(dispatcher._last_alert) == [('cam', 99)]
+    finally:
+        dispatcher.stop()
+
+
+def test_failing_sink_does_not_block_other_sinks():
+    failing = RecordingSink(failures=100)
+    healthy = RecordingSink()
+    dispatcher = make_dispatcher([failing, healthy], WORKERS=1,
+                                 MAX_RETRIES=3, RETRY_BACKOFF=0.3)
+    try:
+        start = time.time()
+        for person_id in range(3):
+            assert dispatcher.dispatch('fall', 'cam', person_id)
+        # Com uma só thread, as retentativas (0.3 + 0.6 + 1.2 s) não
+        # atrasam as entregas ao sink que funciona
+        assert wait_until(lambda: len(healthy.sent) == 3, timeout=1.0)
+        assert max(sent for _, sent in healthy.sent) - start < 0.3
+        assert dispatcher.join(timeout=10)
+        stats = dispatcher.stats()
+        assert failing.attempts == 3 * 4
+        assert stats['retries'] == 3 * 3
+        assert stats['failed'] == 3
+        assert stats['queue_depth'] == 0
+    finally:
+        dispatcher.stop()
+
+
+def test_retry_recovers():
+    sink = RecordingSink(failures=2)
+    dispatcher = make_dispatcher([sink], MAX_RETRIES=3)
+    try:
+        assert dispatcher.dispatch('fall', 'cam', 1)
+        assert dispatcher.join(timeout=5)
+        stats = dispatcher.stats()
+        assert (stats['delivered'], stats['failed'], stats['retries']) == \
+            (1, 0, 2)
+    finally:
+        dispatcher.stop()
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from app.detection import backends, utils
+from app.detection.backends import SharedBackend
+from app.detection.memory import process_memory
+from app.detection.utils import FallDetector
+
+from .helpers import wait_until
+
+WEIGHTS_MB = 64
+
+
+class FakeBackend:
+    """Backend com "pesos" de WEIGHTS_MB (páginas já escritas)"""
+
+    name = 'fake'
+
+    def __init__(self, settings=None):
+        self.tier = (settings or {}).get('TIER', 'x')
+        self.weights = np.ones(WEIGHTS_MB * 1024 * 1024, np.uint8)
+
+    def predict(self, frame, imgsz=None):
+        return self.predict_batch([frame], imgsz)[0]
+
+    def predict_batch(self, frames, imgsz=None):
+        return [backends.empty_detections() for _ in frames]
+
+
+@pytest.fixture
+def created(monkeypatch):
+    created = []
+
+    def create_backend(settings=None):
+        created.append(FakeBackend(settings))
+        return created[-1]
+
+    monkeypatch.setattr(backends, 'create_backend', create_backend)
+    monkeypatch.setattr(utils, 'create_backend', create_backend)
+    monkeypatch.setattr(backends, '_shared_backend', None)
+    return created
+
+
+def test_threads_mode_cameras_share_one_model(created):
+    before = process_memory()['rss_mb']
+    detectors = [FallDetector(f'test-share-{i}', live=False)
+                 for i in range(4)]
+    models = [detector.create_model() for detector in detectors]
+    grown = process_memory()['rss_mb'] - before
+
+    assert len(created) == 1
+    assert all(model is models[0] for model in models)
+    assert models[0].users == 4
+    # Quatro câmeras custam um modelo, não quatro
+    assert grown < 1.5 * WEIGHTS_MB
+    assert models[0].predict(np.zeros((8, 8, 3), np.uint8))[0].shape == (0, 4)
+
+
+def test_tier_switch_replaces_the_shared_model(created):
+    detector = FallDetector('test-tier', live=False)
+    detector.model = detector.create_model()
+    assert detector.can_switch_tier
+
+    detector.switch_tier('n')
+    assert wait_until(lambda: not detector.switching_tier)
+    assert detector.tier == 'n'
+    # O mesmo objeto serve a câmera; o modelo antigo deixa de ser usado
+    assert isinstance(detector.model, SharedBackend)
+    assert detector.model.backend is created[-1]
+    assert created[-1].tier == 'n'
+
+    other = FallDetector('test-tier-other', live=False)
+    other.model = other.create_model()
+    # Partilhado por duas câmeras, o tier já não muda
+    assert not detector.can_switch_tier
+    detector.switch_tier('s')
+    assert detector.tier == 'n' and len(created) == 2
@@ -0,0 +1,125 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.detection.batching import InferenceServer
+
+
+class FakeBackend:
+    """Uma caixa por frame, com o valor do próprio frame"""
+
+    name = 'fake'
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def predict_batch(self, frames, imgsz=None):
+        with self._lock:
+            self.calls.append((len(frames), imgsz))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('model failed')
+        return [(np.full((1, 4), frame[0, 0], np.float32),
+                 np.array([0.9], np.float32), np.array([0], np.int64))
+                for frame in frames]
+
+
+def frame(value):
+    return np.full((4, 4), value, np.float32)
+
+
+def value(result):
+    return float(result[0][0, 0])
+
+
+@pytest.fixture
+def make_server():
+    servers = []
+
+    def make(backend, **settings):
+        server = InferenceServer(backend, dict(
+            {'MAX_BATCH_SIZE': 8, 'MAX_WAIT_MS': 10}, **settings))
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.stop()
+
+
+def test_concurrent_callers_get_their_own_results(make_server):
+    backend = FakeBackend(delay=0.002)
+    server = make_server(backend)
+    errors = []
+
+    def camera(index):
+        for i in range(25):
+            expected = index * 1000 + i
+            result = server.predict(frame(expected))
+            if value(result) != expected:
+                errors.append((expected, value(result)))
+
+    threads = [threading.Thread(target=camera, args=(index,))
+               for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert errors == []
+    assert server.frames == 200
+    # Os pedidos das várias câmeras foram mesmo agrupados
+    assert max(size for size, _ in backend.calls) > 1
+    assert all(size <= 8 for size, _ in backend.calls)
+
+
+def test_partial_batch_is_flushed_after_max_wait(make_server):
+    backend = FakeBackend()
+    server = make_server(backend, MAX_WAIT_MS=50)
+    start = time.perf_counter()
+    results = server.predict_batch([frame(1), frame(2), frame(3)])
+    elapsed = time.perf_counter() - start
+
+    assert [value(r) for r in results] == [1, 2, 3]
+    assert backend.calls == [(3, None)]
+    assert 0.04 <= elapsed < 1.0
+    assert server.metrics()['batch_fill'] == pytest.approx(3 / 8)
+
+
+def test_full_batch_does_not_wait(make_server):
+    backend = FakeBackend()
+    server = make_server(backend, MAX_BATCH_SIZE=4, MAX_WAIT_MS=5000)
+    start = time.perf_counter()
+    results = server.predict_batch([frame(i) for i in range(4)])
+
+    assert time.perf_counter() - start < 1.0
+    assert [value(r) for r in results] == [0, 1, 2, 3]
+    assert backend.calls == [(4, None)]
+
+
+def test_input_sizes_are_batched_separately(make_server):
+    backend = FakeBackend()
+    server = make_server(backend, MAX_WAIT_MS=50)
+    futures = [server.submit(frame(i), 320 if i % 2 else None)
+               for i in range(6)]
+
+    assert [value(f.result(timeout=2)) for f in futures] == list(range(6))
+    assert sorted(backend.calls, key=str) == [(3, 320), (3, None)]
+
+
+def test_backend_errors_reach_every_caller(make_server):
+    backend = FakeBackend(fail=True)
+    server = make_server(backend)
+    futures = [server.submit(frame(i)) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match='model failed'):
+            future.result(timeout=2)
+
+    # O serviço continua a responder depois da falha
+    backend.fail = False
+    assert value(server.predict(frame(7))) == 7
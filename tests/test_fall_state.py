@@ -0,0 +1,16 @@
+from app.detection.tracker import Track
+from app.detection.utils import FallDetector, track_state
+
+
+def test_fall_timer_started_at_time_zero():
+    # Vídeos avaliados no próprio relógio começam em 0.0
+    detector = FallDetector('test-fall-state', live=False)
+    track = Track(0, (0, 0, 60, 120), (30, 60), 0.0)
+    track.on_ground = True
+    assert detector.update_fall_state(0, track, 0.0) == \
+        'Person 0: Possible fall...'
+    assert track_state(track) == 'possible_fall'
+    labels = [detector.update_fall_state(0, track, now) for now in (1.0, 5.0)]
+    assert labels == ['Person 0: Analyzing... 1s', 'Person 0: FALLEN! 5s']
+    assert track.fall_start_time == 0.0
+    assert track_state(track) == 'fallen'
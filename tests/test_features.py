@@ -0,0 +1,85 @@
+import importlib.util
+import os
+
+import numpy as np
+import pytest
+
+from app.detection.features import (
+    NOSE, NUM_LANDMARKS, LandmarkHistory, furniture_features, pack_landmarks,
+    previous_nose, score_falls)
+from app.detection.pose import Landmark, PoseLandmarks
+
+# As regras antigas, pessoa a pessoa, estão reproduzidas no benchmark
+_spec = importlib.util.spec_from_file_location(
+    'bench_scoring', os.path.join(os.path.dirname(__file__), os.pardir,
+                                  'scripts', 'bench_scoring.py'))
+bench_scoring = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(bench_scoring)
+
+
+def legacy_scores(landmarks, prev_nose, furniture):
+    poses = [PoseLandmarks([Landmark(*lm) for lm in person])
+             for person in landmarks]
+    return [bench_scoring.legacy_is_falling(
+        pose, None if np.isnan(prev) else float(prev), nearby)
+        for pose, prev, nearby in zip(poses, prev_nose, furniture)]
+
+
+@pytest.mark.parametrize('count', [1, 10, 50])
+def test_score_falls_matches_legacy_rules(count):
+    rng = np.random.default_rng(count)
+    falls = 0
+    for _ in range(200):
+        landmarks, prev_nose, furniture = bench_scoring.random_scene(
+            rng, count)
+        legacy = legacy_scores(landmarks, prev_nose, furniture)
+        rest_tops, has_furniture = furniture_features(
+            furniture, bench_scoring.HEIGHT)
+        is_fall, score = score_falls(landmarks, prev_nose, rest_tops,
+                                     has_furniture)
+
+        assert is_fall.tolist() == [fall for fall, _ in legacy]
+        assert score.tolist() == [score for _, score in legacy]
+        falls += int(is_fall.sum())
+    # As cenas sintéticas exercitam os dois veredictos
+    assert 0 < falls < 200 * count
+
+
+def test_score_falls_without_history_or_furniture():
+    rng = np.random.default_rng(0)
+    landmarks, _, _ = bench_scoring.random_scene(rng, 5)
+    no_history = np.full(5, np.nan, dtype=np.float32)
+    legacy = legacy_scores(landmarks, no_history, [[]] * 5)
+
+    is_fall, score = score_falls(landmarks)
+    assert is_fall.tolist() == [fall for fall, _ in legacy]
+    assert score.tolist() == [score for _, score in legacy]
+
+
+def test_score_falls_empty_frame():
+    is_fall, score = score_falls(pack_landmarks([]))
+    assert is_fall.shape == score.shape == (0,)
+
+
+def test_landmark_history_ring():
+    history = LandmarkHistory(size=3)
+    assert len(history) == 0 and history.last() is None
+    for i in range(5):
+        history.append(np.full((NUM_LANDMARKS, 4), i, dtype=np.float32))
+    assert len(history) == 3
+    assert history.last()[NOSE, 1] == 4
+
+    empty = LandmarkHistory(size=3)
+    prev = previous_nose([history, empty])
+    assert prev[0] == 4 and np.isnan(prev[1])
+
+
+def test_furniture_features_pads_rest_furniture():
+    nearby = [[{'type': 'bed', 'box': (0, 240, 10, 480)},
+               {'type': 'couch', 'box': (0, 120, 10, 480)}],
+              [{'type': 'chair', 'box': (0, 48, 10, 480)}],
+              []]
+    rest_tops, has_furniture = furniture_features(nearby, 480)
+    np.testing.assert_allclose(rest_tops[0], [0.5, 0.25])
+    assert np.isnan(rest_tops[1:]).all()
+    assert has_furniture.tolist() == [True, True, False]
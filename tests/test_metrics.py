@@ -0,0 +1,88 @@
+import pytest
+
+from app.detection import metrics
+from app.detection.metrics import Counter, Gauge, Histogram, Registry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = Registry()
+    monkeypatch.setattr(metrics, 'REGISTRY', registry)
+    return registry
+
+
+def test_counter_and_gauge_lines(registry):
+    frames = Counter('test_frames_total', 'Frames seen', ('camera',))
+    fps = Gauge('test_fps', 'Frames per second', ('camera',))
+    frames.inc(camera='a')
+    frames.inc(2, camera='a')
+    frames.track(lambda: 7, camera='b')
+    fps.set(12.5, camera='a')
+
+    assert registry.render().splitlines() == [
+        '# HELP test_frames_total Frames seen',
+        '# TYPE test_frames_total counter',
+        'test_frames_total{camera="a"} 3.0',
+        'test_frames_total{camera="b"} 7.0',
+        '# HELP test_fps Frames per second',
+        '# TYPE test_fps gauge',
+        'test_fps{camera="a"} 12.5',
+    ]
+
+
+def test_label_values_are_escaped(registry):
+    errors = Counter('test_errors_total', 'Errors', ('camera',))
+    errors.inc(camera='hall "b"\\\nnorth')
+    line = registry.render().splitlines()[-1]
+    assert line == 'test_errors_total{camera="hall \\"b\\"\\\\\\nnorth"} 1.0'
+
+
+def test_failing_tracked_function_is_skipped(registry):
+    depth = Gauge('test_depth', 'Depth', ('queue',))
+    depth.track(lambda: 1 / 0, queue='broken')
+    depth.set(4, queue='ok')
+    assert registry.render().splitlines()[2:] == ['test_depth{queue="ok"} 4.0']
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    seconds = Histogram('test_seconds', 'Durations', ('stage',),
+                        buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        seconds.observe(value, stage='yolo')
+
+    assert registry.render().splitlines()[2:] == [
+        'test_seconds_bucket{stage="yolo",le="0.1"} 1',
+        'test_seconds_bucket{stage="yolo",le="1.0"} 3',
+        'test_seconds_bucket{stage="yolo",le="+Inf"} 4',
+        'test_seconds_sum{stage="yolo"} 4.05',
+        'test_seconds_count{stage="yolo"} 4',
+    ]
+
+
+def test_snapshots_from_other_processes_are_summed(registry):
+    frames = Counter('test_frames_total', 'Frames seen', ('camera',))
+    seconds = Histogram('test_seconds', 'Durations', (), buckets=(1.0,))
+    frames.inc(camera='a')
+    seconds.observe(0.5)
+    worker = {
+        'test_frames_total': {('a',): 2.0, ('b',): 5.0},
+        'test_seconds': {(): [[1], 0.25, 2]},
+        'unknown_metric': {(): 1.0},
+    }
+
+    lines = registry.render([worker]).splitlines()
+    assert 'test_frames_total{camera="a"} 3.0' in lines
+    assert 'test_frames_total{camera="b"} 5.0' in lines
+    assert 'test_seconds_bucket{le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 3' in lines
+    assert 'test_seconds_sum 0.75' in lines
+    assert not any('unknown_metric' in line for line in lines)
+    # A recolha não altera os valores do próprio processo
+    assert registry.snapshot()['test_frames_total'] == {('a',): 1}
+
+
+def test_dropped_frames_is_a_counter():
+    assert isinstance(metrics.DROPPED_FRAMES, Counter)
+    assert metrics.DROPPED_FRAMES.name == 'fall_dropped_frames_total'
+    text = metrics.REGISTRY.render()
+    assert '# TYPE fall_dropped_frames_total counter' in text
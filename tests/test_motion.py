@@ -0,0 +1,77 @@
+import numpy as np
+
+from app.detection.motion import MotionGate
+from app.detection.utils import FallDetector
+
+SETTINGS = {'WIDTH': 160, 'PIXEL_THRESHOLD': 25, 'AREA_THRESHOLD': 0.002,
+            'BACKGROUND_ALPHA': 0.5, 'MAX_SKIP_SECONDS': 2.0}
+
+
+def scene(person_x=None, noise=0, seed=0):
+    """Sala cinzenta; opcionalmente uma "pessoa" clara em `person_x`"""
+    frame = np.full((480, 640, 3), 90, np.uint8)
+    frame[300:] = 60
+    if person_x is not None:
+        frame[150:390, person_x:person_x + 60] = 220
+    if noise:
+        rng = np.random.default_rng(seed)
+        frame = np.clip(frame + rng.integers(-noise, noise + 1, frame.shape),
+                        0, 255).astype(np.uint8)
+    return frame
+
+
+def test_static_scene_is_skipped():
+    gate = MotionGate(SETTINGS)
+    assert gate.check(scene(200), 0.0) == 'motion'
+    # Ruído do sensor não é movimento
+    decisions = [gate.check(scene(200, noise=6, seed=i), i * 0.1)
+                 for i in range(1, 15)]
+    assert decisions == [None] * 14
+    assert gate.last_change < SETTINGS['AREA_THRESHOLD']
+
+
+def test_moving_person_runs_the_models():
+    gate = MotionGate(SETTINGS)
+    gate.check(scene(200), 0.0)
+    assert gate.check(scene(200), 0.1) is None
+    assert gate.check(scene(240), 0.2) == 'motion'
+    assert gate.last_change >= SETTINGS['AREA_THRESHOLD']
+
+
+def test_full_pass_forced_after_max_skip():
+    gate = MotionGate(SETTINGS)
+    gate.check(scene(), 0.0)
+    decisions = {}
+    for i in range(1, 50):
+        decisions[round(i * 0.1, 1)] = gate.check(scene(), i * 0.1)
+    forced = [now for now, decision in decisions.items() if decision]
+    assert forced == [2.0, 4.0]
+    assert {decisions[now] for now in forced} == {'forced'}
+    # Movimento reinicia o intervalo (o fundo leva uns frames a assentar)
+    last_motion = None
+    for i in range(50, 60):
+        if gate.check(scene(300), i * 0.1) == 'motion':
+            last_motion = i * 0.1
+    assert last_motion is not None and last_motion > 4.0
+    assert gate.check(scene(300), last_motion + 1.9) is None
+    assert gate.check(scene(300), last_motion + 2.05) == 'forced'
+
+
+def test_reset_restarts_the_background():
+    gate = MotionGate(SETTINGS)
+    gate.check(scene(), 0.0)
+    gate.reset()
+    assert gate.check(scene(), 0.1) == 'motion'
+
+
+def test_detector_fps_counts_only_analysed_frames():
+    detector = FallDetector('test-motion', live=False)
+    # 10 frames por segundo, dos quais só um em cada cinco é analisado
+    for i in range(21):
+        now = i / 10
+        if i % 5:
+            detector.reuse_detections(now)
+        else:
+            detector.publish_changes(now)
+    assert detector.snapshot.fps == 2.0
+    assert detector.snapshot.time == 2.0
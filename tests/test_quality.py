@@ -0,0 +1,130 @@
+import pytest
+
+from app.detection import quality
+from app.detection.quality import QualityController
+
+SETTINGS = {
+    'ENABLED': True, 'TARGET_FPS': 10, 'MAX_LATENCY': 10.0,
+    'IMGSZ_STEPS': (512, 320), 'TIERS': ('m', 'n'),
+    'DETECTION_FPS_STEPS': (5, 2), 'MAX_CPU_SHARE': 1.0, 'SMOOTHING': 1.0,
+    'DEGRADE_MARGIN': 0.1, 'UPGRADE_MARGIN': 0.3, 'DEGRADE_SECONDS': 1.0,
+    'UPGRADE_SECONDS': 2.0, 'COOLDOWN': 1.0, 'HISTORY': 20
+}
+
+
+class FakePose:
+    complexity = None
+
+    def set_complexity(self, value):
+        self.complexity = value
+
+
+class QualityDetector:
+    """Os knobs do FallDetector que o controlo de qualidade usa"""
+
+    can_resize = True
+    can_switch_tier = True
+    switching_tier = False
+
+    def __init__(self, tier_loads=True):
+        self.tier = 'x'
+        self.imgsz = None
+        self.tier_loads = tier_loads
+        self.pose_estimator = FakePose()
+
+    def switch_tier(self, tier):
+        if self.tier_loads:
+            self.tier = tier
+
+
+@pytest.fixture(autouse=True)
+def no_events(monkeypatch):
+    monkeypatch.setattr(quality, 'record_event', lambda *a, **k: None)
+
+
+def make(detector=None, camera_id='test-quality', **settings):
+    return QualityController(detector or QualityDetector(), camera_id,
+                             dict(SETTINGS, **settings))
+
+
+def run(controller, seconds, yolo, pose=0.0, start=0.0, fps=10):
+    """Frames analisados a `fps` durante `seconds`; retorna as decisões"""
+    decisions = []
+    for i in range(int(seconds * fps)):
+        timings = {'detect': yolo, 'yolo': yolo, 'pose': pose}
+        decision = controller.update(timings, yolo + pose,
+                                     now=start + i / fps)
+        if decision is not None:
+            decisions.append((decision['knob'], decision['to'],
+                              decision['direction']))
+    return decisions
+
+
+def test_degrades_the_most_expensive_stage_first():
+    yolo_bound = make()
+    assert run(yolo_bound, 1.5, yolo=0.2, pose=0.05)[0] == \
+        ('imgsz', 512, 'down')
+
+    pose_bound = make()
+    assert run(pose_bound, 1.5, yolo=0.05, pose=0.2)[0] == \
+        ('pose_complexity', 0, 'down')
+    assert pose_bound.detector.pose_estimator.complexity == 0
+
+
+def test_cooldown_between_decisions():
+    controller = make()
+    decisions = run(controller, 4.0, yolo=0.3)
+    # Descer, 1 s de pausa, 1 s acima do orçamento, descer de novo...
+    assert [knob for knob, _, _ in decisions] == ['imgsz', 'imgsz']
+    times = [d['time'] for d in controller.decisions]
+    assert times[1] - times[0] >= SETTINGS['COOLDOWN'] + \
+        SETTINGS['DEGRADE_SECONDS'] - 0.1
+
+
+def test_upgrades_once_the_measured_gain_leaves_slack():
+    controller = make()
+    assert run(controller, 1.5, yolo=0.2) == [('imgsz', 512, 'down')]
+    # O degrau baixou o custo para 0.05: a previsão no degrau de cima
+    # (0.05 * 0.2 / 0.05 = 0.2) não cabe; com a carga a descer, cabe
+    assert run(controller, 3.0, yolo=0.05, start=2.0) == []
+    assert controller.index['IMGSZ'] == 1
+    decisions = run(controller, 5.0, yolo=0.01, start=5.0)
+    assert decisions == [('imgsz', 640, 'up')]
+    assert controller.detector.imgsz == 640
+
+
+def test_failed_tier_switch_is_forgotten():
+    detector = QualityDetector(tier_loads=False)
+    controller = make(detector, IMGSZ_STEPS=())
+    assert run(controller, 1.5, yolo=0.3) == [('tier', 'm', 'down')]
+    # O modelo não carregou: o tier sai da escada e o degrau é desfeito
+    controller.update({'detect': 0.3, 'yolo': 0.3}, 0.3, now=3.0)
+    assert controller.steps['TIER'] == ['x', 'n']
+    assert controller.index['TIER'] == 0
+    assert controller._stack == []
+    assert controller.level()['tier'] == 'x'
+
+
+def test_slow_hardware_keeps_the_detection_rate():
+    controller = make()
+    # Nunca cabe no orçamento: os modelos descem até ao fim, o ritmo não
+    decisions = run(controller, 30.0, yolo=0.5, fps=2)
+    assert {knob for knob, _, _ in decisions} == \
+        {'imgsz', 'tier', 'pose_complexity'}
+    assert controller.level()['detection_fps'] == 0
+
+
+def test_detection_rate_follows_the_cpu_share():
+    controller = make(MAX_CPU_SHARE=0.5, IMGSZ_STEPS=(), TIERS=(),
+                      TARGET_FPS=1)
+    # 0.15 s por frame a 5 fps = 75% de um núcleo
+    controller.detection_fps = 5
+    controller._configured_fps = 5
+    decisions = run(controller, 3.0, yolo=0.15, fps=5)
+    assert decisions == [('detection_fps', 2, 'down')]
+    assert controller.detection_fps == 2
+    # A 2 fps são 30%; voltar a 5 fps daria 75%, acima do limite
+    assert run(controller, 10.0, yolo=0.15, fps=2, start=3.0) == []
+    # Frames mais baratos: 5 fps x 0.05 s = 25% cabe com folga
+    assert run(controller, 10.0, yolo=0.05, fps=2, start=13.0) == \
+        [('detection_fps', 5, 'up')]
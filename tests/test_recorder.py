@@ -0,0 +1,94 @@
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from app.detection import recorder
+from app.detection.recorder import ClipRecorder, ClipWriter
+
+from .helpers import wait_until
+
+
+def jpeg(value, size=(48, 64)):
+    ok, data = cv2.imencode('.jpg', np.full(size + (3,), value, np.uint8))
+    return data.tobytes()
+
+
+def loaded_modules(results):
+    """Alvo do filho: o que importar o módulo do escritor de clips carrega"""
+    import app.detection.recorder  # noqa: F401
+    results.put(sorted(name for name in ('flask', 'flask_socketio', 'torch',
+                                         'ultralytics', 'mediapipe')
+                       if name in sys.modules))
+
+
+def test_writer_process_imports_no_app_or_models():
+    ctx = mp.get_context(recorder.CAMERA_SETTINGS['START_METHOD'])
+    results = ctx.Queue()
+    process = ctx.Process(target=loaded_modules, args=(results,))
+    process.start()
+    try:
+        assert results.get(timeout=60) == []
+    finally:
+        process.join(timeout=10)
+
+
+def test_ring_is_sampled_and_bounded():
+    clips = ClipRecorder('cam', {'MAX_FPS': 2, 'PRE_SECONDS': 5,
+                                 'MAX_MB': 1})
+    for i in range(100):
+        clips.add(i / 4, jpeg(i))
+    stats = clips.stats()
+    # 4 fps amostrados a 2 fps, com no máximo 5 s guardados
+    assert stats['frames'] == 10
+    assert [t for t, _ in clips._ring] == [20 + i / 2 for i in range(10)]
+    assert stats['bytes'] == sum(len(data) for _, data in clips._ring)
+
+    small = ClipRecorder('cam', {'MAX_FPS': 10, 'PRE_SECONDS': 10,
+                                 'MAX_MB': 3 * len(jpeg(0)) / 1024 / 1024})
+    for i in range(20):
+        small.add(i / 10, jpeg(0))
+    assert small.stats()['frames'] == 3
+
+
+def test_fall_clip_is_written(tmp_path, monkeypatch):
+    monkeypatch.setattr(recorder, 'VIDEO_DIR', str(tmp_path))
+    monkeypatch.setattr(recorder, 'record_event', lambda *a, **k: None)
+    clips = ClipRecorder('cam', {'MAX_FPS': 20, 'PRE_SECONDS': 1,
+                                 'POST_SECONDS': 0.2})
+    now = time.time()
+    for i in range(20):
+        clips.add(now - 1 + i / 20, jpeg(i * 10))
+    clips.trigger(person_id=3)
+    assert clips.stats()['recording']
+    for i in range(6):
+        clips.add(now + (i + 1) / 20, jpeg(200))
+
+    assert clips.stats() == dict(clips.stats(), recording=False, clips=1)
+    assert wait_until(lambda: any(
+        os.path.getsize(tmp_path / name) > 0
+        for name in os.listdir(tmp_path)), timeout=30)
+    name, = os.listdir(tmp_path)
+    assert name.startswith('cam_')
+
+
+def test_writer_skips_undecodable_frames(tmp_path):
+    writer = ClipWriter()
+    path = str(tmp_path / 'clip.avi')
+    try:
+        assert writer.submit(path, 10, [b'not a jpeg'] +
+                             [jpeg(i) for i in range(5)])
+        assert wait_until(lambda: os.path.exists(path) and
+                          os.path.getsize(path) > 0, timeout=30)
+    finally:
+        writer.jobs.put(None)
+        writer.process.join(timeout=10)
+    capture = cv2.VideoCapture(path)
+    frames = 0
+    while capture.read()[0]:
+        frames += 1
+    capture.release()
+    assert frames == 5
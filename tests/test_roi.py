@@ -0,0 +1,93 @@
+import numpy as np
+
+from app.detection.backends import empty_detections
+from app.detection.roi import detect_regions, plan_regions
+
+WIDTH, HEIGHT = 640, 480
+SETTINGS = {'PADDING': 0.5, 'MIN_SIZE': 128, 'MAX_COVERAGE': 0.5}
+
+
+def test_region_is_padded_around_the_box():
+    # 60x120 com 50%: 30 px de cada lado (mínimo de 128 px) e 60 px em y
+    regions = plan_regions([(200, 100, 260, 220)], WIDTH, HEIGHT, SETTINGS)
+    assert regions == [(166, 40, 294, 280)]
+
+
+def test_overlapping_regions_are_merged():
+    boxes = [(100, 100, 160, 220), (180, 120, 240, 240),
+             (500, 300, 540, 380)]
+    regions = plan_regions(boxes, WIDTH, HEIGHT, SETTINGS)
+    # As duas primeiras sobrepõem-se depois da margem; a terceira não
+    assert regions == [(66, 40, 274, 300), (456, 260, 584, 420)]
+
+
+def test_merging_repeats_until_no_region_overlaps():
+    # C não toca em A nem em B, só na união das duas
+    boxes = [(40, 40, 60, 80), (100, 120, 120, 160), (200, 0, 220, 4)]
+    regions = plan_regions(boxes, WIDTH, HEIGHT,
+                           dict(SETTINGS, MAX_COVERAGE=1.0))
+    assert regions == [(0, 0, 274, 204)]
+
+
+def test_regions_are_clipped_to_the_frame():
+    boxes = [(0, 0, 40, 80), (600, 400, 640, 480)]
+    regions = plan_regions(boxes, WIDTH, HEIGHT, SETTINGS)
+    assert regions == [(0, 0, 84, 120), (556, 360, 640, 480)]
+    for x1, y1, x2, y2 in regions:
+        assert 0 <= x1 < x2 <= WIDTH and 0 <= y1 < y2 <= HEIGHT
+
+
+def test_full_frame_when_regions_cover_most_of_it():
+    assert plan_regions([], WIDTH, HEIGHT, SETTINGS) is None
+    big = [(100, 50, 500, 430)]
+    assert plan_regions(big, WIDTH, HEIGHT, SETTINGS) is None
+    assert plan_regions(big, WIDTH, HEIGHT,
+                        dict(SETTINGS, MAX_COVERAGE=1.0)) is not None
+
+
+class CropBackend:
+    """Uma caixa por recorte, em coordenadas do recorte"""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_batch(self, crops, imgsz=None):
+        self.calls.append(([crop.shape[:2] for crop in crops], imgsz))
+        results = []
+        for crop in crops:
+            height, width = crop.shape[:2]
+            # O valor do pixel (0, 0) identifica o recorte
+            results.append((np.array([[1, 2, width - 1, height - 2]],
+                                     dtype=np.float32),
+                            np.array([crop[0, 0, 0] / 255], dtype=np.float32),
+                            np.array([0], dtype=np.int64)))
+        return results
+
+
+def test_detect_regions_maps_boxes_to_frame_coordinates():
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    regions = [(66, 40, 274, 300), (556, 360, 640, 480)]
+    for i, (x1, y1, _, _) in enumerate(regions):
+        frame[y1, x1] = 100 * (i + 1)
+    backend = CropBackend()
+
+    boxes, confs, classes = detect_regions(backend, frame, regions, imgsz=320)
+
+    # Uma só chamada em lote, com os recortes do tamanho de cada região
+    assert backend.calls == [([(260, 208), (120, 84)], 320)]
+    np.testing.assert_allclose(boxes, [[67, 42, 273, 298],
+                                       [557, 362, 639, 478]])
+    np.testing.assert_allclose(confs, [100 / 255, 200 / 255], rtol=1e-6)
+    assert classes.tolist() == [0, 0]
+
+
+def test_detect_regions_without_detections():
+    class EmptyBackend:
+        def predict_batch(self, crops, imgsz=None):
+            return [empty_detections() for _ in crops]
+
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    boxes, confs, classes = detect_regions(EmptyBackend(), frame,
+                                           [(0, 0, 128, 128)])
+    assert boxes.shape == (0, 4) and confs.shape == (0,)
+    assert classes.dtype == np.int64
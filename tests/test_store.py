@@ -0,0 +1,127 @@
+import pytest
+
+from app.detection.store import (Event, EventStore, format_cursor,
+                                 parse_cursor)
+
+from .helpers import wait_until
+
+HOUR = 3600
+
+
+@pytest.fixture
+def store():
+    return EventStore(':memory:', {'FLUSH_INTERVAL': 0.01},
+                      single_writer=False)
+
+
+def write(store, *events):
+    store._write([Event(t, camera, type, None, None, value, None)
+                  for t, camera, type, value in events])
+
+
+def all_pages(store, limit, **filters):
+    pages, cursor = [], None
+    while True:
+        page = store.query(cursor=cursor, limit=limit, **filters)
+        pages.append(page['events'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def test_paging_does_not_skip_events_with_the_same_time(store):
+    # Rajada de três câmeras no mesmo instante, escrita num só lote
+    write(store, *[(100.0, f'cam-{i % 3}', 'fall', None) for i in range(7)])
+    write(store, *[(99.0, 'cam-0', 'fall', None) for _ in range(3)])
+
+    pages = all_pages(store, limit=4)
+    events = [event for page in pages for event in page]
+    assert [len(page) for page in pages] == [4, 4, 2]
+    assert len({event['id'] for event in events}) == 10
+    keys = [(event['time'], event['id']) for event in events]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_filters_and_until(store):
+    write(store, (10.0, 'a', 'fall', None), (20.0, 'b', 'fall', None),
+          (30.0, 'a', 'alert', 1.0), (40.0, 'a', 'fall', None))
+    page = store.query(camera_id='a', types=['fall'], until=40.0)
+    assert [event['time'] for event in page['events']] == [10.0]
+    page = store.query(since=20.0)
+    assert [event['time'] for event in page['events']] == [40.0, 30.0, 20.0]
+
+
+def test_ring_page_continues_into_the_database():
+    store = EventStore(':memory:', {'FLUSH_INTERVAL': 0.01},
+                       single_writer=True)
+    recorded = [store.record('fall', 'cam', person_id)
+                for person_id in range(5)]
+    # Primeira página do anel, já com ids, antes de o lote ser gravado
+    first = store.query(limit=2)
+    assert [event['person_id'] for event in first['events']] == [4, 3]
+
+    def written():
+        with store._db_lock:
+            return store._db.execute(
+                'SELECT COUNT(*) FROM events').fetchone()[0] == 5
+    assert wait_until(written)
+    rest = all_pages(store, limit=2)
+    # A continuação a partir do cursor do anel não repete nem salta nada
+    second = store.query(cursor=first['next_cursor'], limit=10)
+    assert [event['person_id'] for event in second['events']] == [2, 1, 0]
+    assert [event['id'] for page in rest for event in page] == \
+        [event.id for event in reversed(recorded)]
+
+
+def test_cursor_round_trip():
+    cursor = format_cursor(1700000000.123456, 42)
+    assert parse_cursor(cursor) == (1700000000.123456, 42)
+    with pytest.raises(ValueError):
+        parse_cursor('1700000000.5')
+
+
+def test_hourly_rollup_and_count_since(store):
+    base = 1000 * HOUR
+    write(store,
+          (base + 100, 'cam', 'fall', None),
+          (base + 200, 'other', 'fall', None),
+          (base + 1800, 'cam', 'fall', None),
+          (base + HOUR + 5, 'cam', 'fall', None),
+          (base + HOUR + 10, 'cam', 'fps', 10.0),
+          (base + HOUR + 20, 'cam', 'fps', 20.0))
+
+    # Só os eventos a partir de `since`, mesmo a meio de uma hora
+    assert store.count_since('fall', base + 1000) == 2
+    assert store.count_since('fall', base + 1000, camera_id='cam') == 2
+    assert store.count_since('fall', base) == 4
+    assert store.count_since('fall', base + HOUR) == 1
+
+    hours = store.per_hour('fall', hours=3, now=base + HOUR + 30)
+    assert [hour['count'] for hour in hours] == [0, 3, 1]
+    fps = store.per_hour('fps', hours=1, camera_id='cam',
+                         now=base + HOUR + 30)
+    assert fps[0]['count'] == 2 and fps[0]['mean'] == 15.0
+
+
+def test_stores_sharing_a_file_never_reuse_ids(tmp_path):
+    path = str(tmp_path / 'events.db')
+    settings = {'FLUSH_INTERVAL': 0.01, 'ID_BLOCK': 3}
+    # Dois processos (p.ex. a app e um script) com a mesma base
+    first = EventStore(path, settings, single_writer=True)
+    second = EventStore(path, settings, single_writer=True)
+    recorded = []
+    for i in range(10):
+        recorded.append(first.record('fall', 'a', i))
+        recorded.append(second.record('fall', 'b', i))
+    write(first, (1.0, 'c', 'fall', None))
+
+    def written(store):
+        with store._db_lock:
+            return store._db.execute(
+                'SELECT COUNT(*) FROM events').fetchone()[0] == 21
+    assert wait_until(lambda: written(first))
+    assert len({event.id for event in recorded}) == 20
+    page = first.query(limit=100)
+    assert len(page['events']) == 21
+    assert {event['id'] for event in page['events']} >= \
+        {event.id for event in recorded}
@@ -0,0 +1,159 @@
+import threading
+
+import numpy as np
+
+from app.detection import encoding
+from app.detection.metrics import PIPELINE_ERRORS
+from app.detection.stream import FrameBroadcaster, FrameSlot
+
+from .helpers import FakeDetector, FakeSource, wait_until
+
+
+def make_broadcaster(detector, source=None, camera_id='test'):
+    source = source or FakeSource()
+    return FrameBroadcaster(
+        camera_id, 'fake', capture_factory=lambda: source, detector=detector,
+        recording={'ENABLED': False}, quality={'ENABLED': False})
+
+
+def test_inference_thread_survives_detector_errors():
+    detector = FakeDetector(errors=3)
+    broadcaster = make_broadcaster(detector, camera_id='test-errors')
+    broadcaster.start()
+    try:
+        # Depois das falhas a deteção retoma sobre frames novos
+        assert wait_until(lambda: detector.calls >= 6)
+        assert broadcaster.inference_errors == 3
+        assert broadcaster.stats()['inference_errors'] == 3
+        samples = PIPELINE_ERRORS.samples()
+        assert samples[('test-errors', 'inference')] == 3
+        assert all(thread.is_alive() for thread in broadcaster._threads)
+    finally:
+        broadcaster.stop()
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.encoder = encoding.JpegEncoder()
+        self.widths = []
+
+    def encode(self, image, quality):
+        self.widths.append(image.shape[1])
+        return self.encoder.encode(image, quality)
+
+    def decode(self, jpeg):
+        return self.encoder.decode(jpeg)
+
+
+def test_publish_encodes_each_watched_tier_once(monkeypatch):
+    encoder = CountingEncoder()
+    monkeypatch.setattr(encoding, 'get_jpeg_encoder', lambda: encoder)
+    slot = FrameSlot('test-tiers')
+    slot.add_client('low')
+    slot.add_client('low')
+    slot.add_client('medium')
+    slot.remove_client('medium')
+
+    image = np.zeros((480, 960, 3), np.uint8)
+    slot.publish(encoding.encode_default_tier(image), image)
+    seq, frame = slot.wait_for_frame(0, timeout=1)
+
+    # Só o tier com clientes é codificado, uma vez para os dois clientes
+    assert encoder.widths == [960, 320]
+    assert frame.camera_id == 'test-tiers'
+    assert frame.cached('low') is not None
+    assert frame.cached('medium') is None
+    assert frame.jpeg('low') is frame.cached('low')
+    assert encoder.widths == [960, 320]
+
+
+def test_publish_while_clients_come_and_go():
+    slot = FrameSlot('test-churn')
+    image = np.zeros((48, 64, 3), np.uint8)
+    jpeg = encoding.encode_default_tier(image)
+    errors = []
+    done = threading.Event()
+
+    def churn():
+        tiers = ['low', 'medium', 'high']
+        try:
+            while not done.is_set():
+                for tier in tiers:
+                    slot.remove_client(slot.add_client(tier))
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=churn)
+    thread.start()
+    try:
+        for _ in range(500):
+            slot.publish(jpeg, image)
+    finally:
+        done.set()
+        thread.join()
+    assert not errors
+    assert slot.clients == 0
+    assert slot.wait_for_frame(0)[0] == 500
+
+
+def test_recorder_gets_raw_frames_while_watched():
+    source = FakeSource()
+    broadcaster = FrameBroadcaster(
+        'test-record', 'fake', capture_factory=lambda: source,
+        detector=FakeDetector(), recording={'ENABLED': True, 'MAX_FPS': 100},
+        quality={'ENABLED': False})
+    # Anotação visível: o frame desenhado é todo branco
+    broadcaster.renderer.render = lambda frame, result: np.full_like(
+        frame, 255)
+    broadcaster.add_client()
+    broadcaster.start()
+    try:
+        assert wait_until(lambda: broadcaster.recorder.stats()['frames'] >= 5)
+        seq, frame = broadcaster.wait_for_frame(0)
+        ring = list(broadcaster.recorder._ring)
+    finally:
+        broadcaster.stop()
+
+    decode = encoding.get_jpeg_encoder().decode
+    assert decode(frame.jpeg()).min() > 250
+    # Os frames sintéticos têm o valor do seu número (< 255)
+    assert all(decode(jpeg).mean() < 200 for _, jpeg in ring)
+    assert all(jpeg is not frame.jpeg() for _, jpeg in ring)
+
+
+def test_output_thread_survives_render_errors():
+    broadcaster = make_broadcaster(FakeDetector(), camera_id='test-output')
+    calls = []
+
+    def render(frame, result):
+        calls.append(1)
+        if len(calls) <= 3:
+            raise ValueError('bad overlay')
+        return frame
+
+    broadcaster.renderer.render = render
+    broadcaster.add_client()
+    broadcaster.start()
+    try:
+        assert wait_until(lambda: len(calls) >= 6)
+        assert broadcaster.wait_for_frame(0)[1] is not None
+        assert broadcaster.stats()['output_errors'] == 3
+        assert PIPELINE_ERRORS.samples()[('test-output', 'output')] == 3
+        assert all(thread.is_alive() for thread in broadcaster._threads)
+    finally:
+        broadcaster.stop()
+
+
+def test_gated_frames_are_not_counted_as_detections():
+    detector = FakeDetector(analyse_every=4)
+    broadcaster = make_broadcaster(detector, camera_id='test-gated')
+    broadcaster.start()
+    try:
+        assert wait_until(lambda: detector.calls >= 60)
+        stats = broadcaster.stats()
+        # Um em cada quatro frames corre os modelos
+        assert stats['detection_fps'] > 0
+        ratio = stats['gated_fps'] / stats['detection_fps']
+        assert 2 < ratio < 4.5
+    finally:
+        broadcaster.stop()
@@ -0,0 +1,190 @@
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from app.detection import supervisor
+from app.detection.supervisor import RemoteCamera, SharedFrameSlot
+
+from .helpers import FakeDetector, wait_until
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Corre run.py como o `python run.py` documentado, mas em vez de servir
+# arranca um processo com o contexto do supervisor (spawn), que reimporta
+# run.py como __mp_main__
+DRIVER = '''
+import multiprocessing as mp
+import runpy
+import sys
+import threading
+
+import flask_socketio
+
+import config
+from tests.test_supervisor import probe_worker
+
+config.MODEL_SETTINGS['WARMUP_ON_START'] = False
+
+
+def serve(socketio, app, **kwargs):
+    ctx = mp.get_context(config.CAMERA_SETTINGS['START_METHOD'])
+    results = ctx.Queue()
+    process = ctx.Process(target=probe_worker, args=(results,))
+    process.start()
+    print('worker', results.get(timeout=60))
+    process.join(timeout=30)
+    print('exitcode', process.exitcode)
+
+
+flask_socketio.SocketIO.run = serve
+sys.argv = ['run.py']
+runpy.run_path('run.py', run_name='__main__')
+'''
+
+
+MODEL_MODULES = ('torch', 'ultralytics', 'onnxruntime', 'openvino',
+                 'mediapipe')
+
+
+def probe_worker(results):
+    """Alvo do processo filho: o que ficou criado depois do bootstrap"""
+    import app.detection.supervisor as supervisor
+    import app.detection.utils as utils
+    from app.detection.memory import process_memory
+    main = sys.modules.get('__mp_main__')
+    results.put({
+        'app_created': hasattr(main, 'app'),
+        'supervisor_started': supervisor._supervisor is not None,
+        'detector_created': utils._fall_detector is not None,
+        'model_modules': [name for name in MODEL_MODULES
+                          if name in sys.modules],
+        'memory': process_memory()
+    })
+
+
+def test_spawned_worker_does_not_recreate_the_app():
+    result = subprocess.run(
+        [sys.executable, '-c', DRIVER], cwd=ROOT, capture_output=True,
+        text=True, timeout=120)
+    output = result.stdout + result.stderr
+    assert result.returncode == 0, output
+    assert "'app_created': False" in output, output
+    assert "'supervisor_started': False" in output, output
+    # Nem o aquecimento da app: o processo só carrega o seu modelo (ou
+    # mapeia os pesos partilhados) dentro de run_camera_worker
+    assert "'detector_created': False" in output, output
+    assert "'model_modules': []" in output, output
+    assert 'exitcode 0' in output, output
+    # Só o processo principal cria a app
+    assert output.count('App created') == 1, output
+
+
+def test_shared_slot_read_does_not_block_on_a_held_lock():
+    ctx = mp.get_context('spawn')
+    slot = SharedFrameSlot(ctx, 1024)
+    try:
+        slot.write(b'jpeg')
+        assert slot.read(0) == (1, b'jpeg')
+        slot.write(b'next')
+        # Lock preso (p.ex. por um processo que morreu a meio da escrita)
+        slot.lock.acquire()
+        start = time.time()
+        assert slot.read(1, timeout=0.1) == (1, None)
+        assert time.time() - start < 1.0
+        slot.lock.release()
+        assert slot.read(1) == (2, b'next')
+    finally:
+        slot.close(unlink=True)
+
+
+class FallingDetector(FakeDetector):
+    """Detector falso que confirma uma queda ao fim de alguns frames"""
+
+    def __init__(self, camera_id=None, live=True, model=None):
+        super().__init__()
+
+    def load_models(self):
+        pass
+
+    def detect_fall(self, frame):
+        super().detect_fall(frame)
+        if self.calls == 10:
+            for listener in self.fall_listeners:
+                listener(1)
+
+
+def falling_camera_worker(camera, *args):
+    """run_camera_worker com o detector falso e clips em camera['VIDEO_DIR']"""
+    from app.detection import recorder, utils
+    utils.FallDetector = FallingDetector
+    recorder.VIDEO_DIR = camera['VIDEO_DIR']
+    recorder.record_event = lambda *args, **kwargs: None
+    supervisor.run_camera_worker(camera, *args)
+
+
+def test_camera_process_records_a_clip(tmp_path, monkeypatch):
+    images = tmp_path / 'images'
+    images.mkdir()
+    for i in range(10):
+        cv2.imwrite(str(images / f'{i:03}.jpg'),
+                    np.full((48, 64, 3), i * 20, np.uint8))
+    clips = tmp_path / 'clips'
+    camera = {
+        'ID': 'test-clip', 'SOURCE': str(images), 'VIDEO_DIR': str(clips),
+        'CAPTURE': {'IMAGE_FPS': 50},
+        'RECORDING': {'MAX_FPS': 50, 'PRE_SECONDS': 1, 'POST_SECONDS': 0.2},
+        'QUALITY': {'ENABLED': False}
+    }
+    # O alvo é procurado no módulo a cada arranque, como o supervisor faz
+    monkeypatch.setattr(supervisor, 'run_camera_worker',
+                        falling_camera_worker)
+    ctx = mp.get_context(supervisor.CAMERA_SETTINGS['START_METHOD'])
+    remote = RemoteCamera(camera, ctx, supervisor.CAMERA_SETTINGS)
+    remote.launch()
+    try:
+        assert wait_until(lambda: clips.exists() and any(
+            path.stat().st_size for path in clips.iterdir()), timeout=60)
+        # A câmera continua a capturar depois do clip
+        assert remote.alive and remote.restarts == 0
+        assert wait_until(lambda: remote.stats()['capture_fps'], timeout=10)
+    finally:
+        remote.stop()
+    assert remote.process.exitcode == 0
+
+
+def test_supervisor_loads_the_shared_model_in_the_background(tmp_path,
+                                                             monkeypatch):
+    loading = threading.Event()
+    loaded = threading.Event()
+
+    def load_shared_model():
+        loading.set()
+        loaded.wait(timeout=30)
+        return None
+
+    monkeypatch.setattr(supervisor, 'load_shared_model', load_shared_model)
+    monkeypatch.setattr(supervisor, 'run_camera_worker',
+                        falling_camera_worker)
+    camera = {'ID': 'test-background', 'SOURCE': 'missing.mp4',
+              'VIDEO_DIR': str(tmp_path),
+              'QUALITY': {'ENABLED': False}, 'RECORDING': {'ENABLED': False}}
+    cameras = supervisor.CameraSupervisor({'test-background': camera})
+    start = time.time()
+    cameras.start_all()
+    try:
+        # start_all (chamado por create_app) não espera pelo modelo
+        assert time.time() - start < 1.0
+        assert loading.wait(timeout=5)
+        remote = cameras.get('test-background')
+        assert remote.process is None and not remote.ready
+        loaded.set()
+        assert wait_until(lambda: remote.alive, timeout=10)
+    finally:
+        loaded.set()
+        cameras.stop()
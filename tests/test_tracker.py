@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from app.detection import tracker as tracker_module
+from app.detection.tracker import Tracker, box_iou, greedy_assignment
+
+WIDTH, HEIGHT = 640, 480
+
+MATCHING = ['greedy']
+if tracker_module.linear_sum_assignment is not None:
+    MATCHING.append('hungarian')
+
+
+def box(x, y, w=60, h=120):
+    return [x, y, x + w, y + h]
+
+
+def test_box_iou():
+    a = np.array([box(0, 0, 10, 10)], dtype=np.float32)
+    b = np.array([box(0, 0, 10, 10), box(5, 0, 10, 10), box(50, 50)],
+                 dtype=np.float32)
+    np.testing.assert_allclose(box_iou(a, b), [[1.0, 50 / 150, 0.0]])
+
+
+def test_greedy_assignment_uses_each_row_and_column_once():
+    # Menor custo primeiro; pares proibidos (inf) nunca são escolhidos
+    cost = np.array([[0.1, 0.2], [0.15, np.inf], [np.inf, 0.3]])
+    rows, cols = greedy_assignment(cost)
+    assert list(zip(rows.tolist(), cols.tolist())) == [(0, 0), (2, 1)]
+
+
+@pytest.mark.parametrize('matching', MATCHING)
+def test_ids_stable_while_people_move(matching):
+    tracker = Tracker({'MATCHING': matching})
+    positions = [(50, 100), (300, 100), (500, 200)]
+    first = tracker.update([box(x, y) for x, y in positions],
+                           WIDTH, HEIGHT, now=0.0)
+    assert first == [0, 1, 2]
+    for step in range(1, 20):
+        # Caixas em ordem diferente em cada frame, a andar devagar
+        order = [2, 0, 1] if step % 2 else [1, 2, 0]
+        boxes = [box(positions[i][0] + 3 * step, positions[i][1] + step)
+                 for i in order]
+        assert tracker.update(boxes, WIDTH, HEIGHT, now=step / 30) == order
+
+
+@pytest.mark.parametrize('matching', MATCHING)
+def test_crossing_people_keep_their_ids(matching):
+    # Dois tracks próximos: cada caixa vai para o mais parecido, sem que o
+    # primeiro a ser visto roube as duas
+    tracker = Tracker({'MATCHING': matching})
+    tracker.update([box(200, 100), box(260, 100)], WIDTH, HEIGHT, now=0.0)
+    ids = tracker.update([box(265, 100), box(205, 100)], WIDTH, HEIGHT,
+                         now=0.1)
+    assert ids == [1, 0]
+
+
+def test_far_boxes_start_new_tracks():
+    tracker = Tracker({'MATCHING': 'greedy', 'MAX_DISTANCE': 0.3})
+    tracker.update([box(0, 0)], WIDTH, HEIGHT, now=0.0)
+    ids = tracker.update([box(500, 300)], WIDTH, HEIGHT, now=0.1)
+    assert ids == [1]
+    assert len(tracker) == 2
+
+
+def test_ids_never_reused_after_expiry():
+    tracker = Tracker({'MATCHING': 'greedy', 'TIMEOUT': 1.0})
+    assert tracker.update([box(0, 0), box(300, 0)], WIDTH, HEIGHT,
+                          now=0.0) == [0, 1]
+    assert tracker.update([box(0, 0)], WIDTH, HEIGHT, now=0.5) == [0]
+    # O track 1 expirou; a mesma posição recebe um ID novo
+    assert tracker.update([box(0, 0), box(300, 0)], WIDTH, HEIGHT,
+                          now=1.2) == [0, 2]
+    assert tracker.expire(10.0) == [0, 2]
+    assert tracker.update([box(0, 0)], WIDTH, HEIGHT, now=10.0) == [3]
+
+
+def test_empty_frame_keeps_tracks():
+    tracker = Tracker({'MATCHING': 'greedy'})
+    tracker.update([box(0, 0)], WIDTH, HEIGHT, now=0.0)
+    assert tracker.update(np.zeros((0, 4)), WIDTH, HEIGHT, now=0.1) == []
+    assert list(tracker.tracks) == [0]
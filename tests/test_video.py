@@ -0,0 +1,47 @@
+from app.detection.metrics import SOURCE_RECONNECTS
+from app.detection.video import FrameGrabber
+
+from .helpers import FakeSource, wait_until
+
+
+def test_grabber_reconnects_after_read_errors():
+    source = FakeSource()
+    source.read_errors = [OSError('decoder error'), ValueError('bad packet')]
+    grabber = FrameGrabber(source, 'test-read-errors')
+    try:
+        assert wait_until(lambda: grabber.read(0, timeout=0.1)[0] >= 3)
+        assert grabber.reconnects == 2
+        assert source.opened == 3
+        assert grabber.connected and not grabber.failed
+        assert grabber._thread.is_alive()
+        assert SOURCE_RECONNECTS.samples()[('test-read-errors',)] == 2
+    finally:
+        grabber.release()
+
+
+def test_grabber_retries_open_with_backoff():
+    source = FakeSource()
+    source.open_errors = [OSError('no device')] * 3
+    grabber = FrameGrabber(source, 'test-open-errors')
+    try:
+        seq, frame, timestamp = grabber.read(0, timeout=2)
+        assert frame is not None and seq == 1
+        assert grabber.reconnects == 3
+        assert source.opened == 4
+    finally:
+        grabber.release()
+
+
+def test_grabber_stops_when_source_finishes():
+    source = FakeSource(frames=3)
+    grabber = FrameGrabber(source, 'test-finished')
+    try:
+        assert wait_until(lambda: grabber.failed)
+        seq, frame, _ = grabber.read(0, timeout=0.1)
+        # O último frame continua disponível; nada mais chega
+        assert seq == 3 and frame is not None
+        assert grabber.read(seq, timeout=0.1)[1] is None
+        assert grabber.stats()['finished']
+        assert grabber.reconnects == 0
+    finally:
+        grabber.release()